@@ -0,0 +1,126 @@
+"""
+Benchmark of ``bulk_upsert`` against the ``session.merge`` loop it replaced.
+
+Synthetic pepy download statistics, one row per package, day and version,
+are written twice into an empty pypi stats database in a temporary
+directory, first as new rows, then as updates of all of them. Time and
+peak memory of both passes are measured for each method.
+
+Run with ``python benchmarks/bench_bulk_upsert.py``.
+"""
+
+import argparse
+import datetime
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import humanize
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from napari_dashboard.db_schema.pypi import PePyDownloadStat
+from napari_dashboard.db_sources import (
+    PYPI_STATS,
+    create_source_engine,
+    create_source_tables,
+)
+from napari_dashboard.db_update.util import bulk_upsert, get_writer
+
+
+def generate(
+    packages: int, days: int, versions: int, seed: int
+) -> dict[str, list[dict]]:
+    """Rows of ``PePyDownloadStat`` by package"""
+    rng = random.Random(seed)
+    start = datetime.date(2024, 1, 1)
+    return {
+        f"package{package}": [
+            {
+                "name": f"package{package}",
+                "version": f"0.{version}.0",
+                "date": start + datetime.timedelta(days=day),
+                "downloads": rng.randint(0, 10_000),
+            }
+            for day in range(days)
+            for version in range(versions)
+        ]
+        for package in range(packages)
+    }
+
+
+def save_merge(session: Session, data: dict[str, list[dict]]) -> None:
+    writer = get_writer(session)
+    for rows in data.values():
+        for row in rows:
+            writer.merge(PePyDownloadStat(**row))
+        writer.done()
+    writer.checkpoint()
+
+
+def save_bulk_upsert(session: Session, data: dict[str, list[dict]]) -> None:
+    writer = get_writer(session)
+    for rows in data.values():
+        bulk_upsert(session, PePyDownloadStat, rows)
+        writer.done()
+    writer.checkpoint()
+
+
+def measure(name: str, func, *args) -> None:
+    """Print time and peak traced memory of a single call"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(*args)
+    duration = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<40} {duration:8.3f} s {humanize.naturalsize(peak):>10}")
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--packages", type=int, default=20, help="Number of packages"
+    )
+    parser.add_argument(
+        "--days", type=int, default=180, help="Number of days per package"
+    )
+    parser.add_argument(
+        "--versions",
+        type=int,
+        default=10,
+        help="Number of versions per package and day",
+    )
+    args = parser.parse_args(args)
+
+    inserted = generate(args.packages, args.days, args.versions, seed=0)
+    updated = generate(args.packages, args.days, args.versions, seed=1)
+    expected = sum(len(rows) for rows in updated.values())
+    print(f"{expected} rows")
+
+    for name, save in (
+        ("merge", save_merge),
+        ("bulk_upsert", save_bulk_upsert),
+    ):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = Path(tmp_dir) / "dashboard.db"
+            engine = create_source_engine(db_path, PYPI_STATS)
+            create_source_tables(engine, PYPI_STATS)
+            for data, kind in ((inserted, "insert"), (updated, "update")):
+                with Session(engine) as session:
+                    measure(f"{name} {kind}", save, session, data)
+            with Session(engine) as session:
+                count, downloads = session.execute(
+                    select(func.count(), func.sum(PePyDownloadStat.downloads))
+                ).one()
+            if count != expected or downloads != sum(
+                row["downloads"] for rows in updated.values() for row in rows
+            ):
+                raise RuntimeError(f"{name} stored wrong rows")
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
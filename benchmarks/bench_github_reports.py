@@ -0,0 +1,166 @@
+"""
+Benchmark of reporting queries on GitHub data used in the webpage build.
+
+A database with synthetic pull requests and issues with long bodies
+is created in a temporary directory, then time and peak memory
+of weekly summary functions and of ``generate_pr_and_issue_time_stats``
+are measured.
+
+Run with ``python benchmarks/bench_github_reports.py``.
+"""
+
+import argparse
+import datetime
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import humanize
+from sqlalchemy.orm import Session
+
+from napari_dashboard.db_schema.github import (
+    GithubUser,
+    Issues,
+    Labels,
+    PullRequests,
+    Repository,
+)
+from napari_dashboard.db_sources import (
+    GITHUB,
+    create_databases,
+    create_reporting_engine,
+    create_source_engine,
+)
+from napari_dashboard.gen_stat.github import (
+    generate_pr_and_issue_time_stats,
+    get_last_week,
+    get_last_week_closed_issues_as_md,
+    get_last_week_closed_pr_md,
+    get_last_week_merged_pr_md,
+    get_last_week_new_issues_md,
+    get_last_week_new_pr_md,
+    get_last_week_updated_issues_md,
+    get_last_week_updated_pr_md,
+)
+
+USERS = [f"user{i}" for i in range(50)]
+LABELS = ["feature", "bugfix", "maintenance", "enhancement", "documentation"]
+
+
+def _random_times(rng: random.Random, now: datetime.datetime):
+    open_time = now - datetime.timedelta(
+        days=rng.randint(0, 5 * 365), hours=rng.randint(0, 23)
+    )
+    close_time = None
+    if rng.random() < 0.8:
+        close_time = min(
+            open_time + datetime.timedelta(days=rng.randint(0, 60)), now
+        )
+    return open_time, close_time
+
+
+def populate(db_path: Path, count: int, body_size: int) -> None:
+    """Fill the GitHub database with synthetic pull requests and issues"""
+    rng = random.Random(0)
+    now = get_last_week()[1]
+    body = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * (
+        body_size // 57 + 1
+    )
+    engine = create_source_engine(db_path, GITHUB)
+    with Session(engine) as session:
+        users = [GithubUser(username=x) for x in USERS]
+        session.add_all(users)
+        repository = Repository(user="napari", name="napari")
+        session.add(repository)
+        labels = [Labels(label=x) for x in LABELS]
+        session.add_all(labels)
+        session.flush()
+        for number in range(1, count + 1):
+            open_time, close_time = _random_times(rng, now)
+            pr = PullRequests(
+                repository_id=repository.id,
+                pull_request=number,
+                user_id=rng.choice(users).id,
+                title=f"Pull request {number}",
+                open_time=open_time,
+                close_time=close_time,
+                merge_time=close_time if rng.random() < 0.7 else None,
+                last_modification_time=close_time or open_time,
+                labels=rng.sample(labels, rng.randint(0, 2)),
+            )
+            pr.description = body[: rng.randint(body_size // 2, body_size)]
+            session.add(pr)
+            open_time, close_time = _random_times(rng, now)
+            issue = Issues(
+                repository_id=repository.id,
+                issue=number,
+                user_id=rng.choice(users).id,
+                title=f"Issue {number}",
+                open_time=open_time,
+                close_time=close_time,
+                last_modification_time=close_time or open_time,
+            )
+            issue.description = body[: rng.randint(body_size // 2, body_size)]
+            session.add(issue)
+        session.commit()
+    engine.dispose()
+
+
+def measure(name: str, func, *args) -> None:
+    """Print time and peak traced memory of a single call"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(*args)
+    duration = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<40} {duration:8.3f} s {humanize.naturalsize(peak):>10}")
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--count",
+        type=int,
+        default=10_000,
+        help="Number of pull requests and of issues",
+    )
+    parser.add_argument(
+        "--body-size",
+        type=int,
+        default=4_000,
+        help="Maximum length of pull request and issue body",
+    )
+    args = parser.parse_args(args)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = Path(tmp_dir) / "dashboard.db"
+        create_databases(db_path)
+        populate(db_path, args.count, args.body_size)
+        engine = create_reporting_engine(db_path)
+        for func in (
+            get_last_week_new_pr_md,
+            get_last_week_updated_pr_md,
+            get_last_week_merged_pr_md,
+            get_last_week_closed_pr_md,
+            get_last_week_new_issues_md,
+            get_last_week_updated_issues_md,
+            get_last_week_closed_issues_as_md,
+        ):
+            with Session(engine) as session:
+                measure(func.__name__, func, session)
+        with Session(engine) as session:
+            measure(
+                "generate_pr_and_issue_time_stats",
+                generate_pr_and_issue_time_stats,
+                "napari",
+                "napari",
+                session,
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
 from logging.config import fileConfig
 
 from alembic import context
-from sqlalchemy import engine_from_config, pool
+from sqlalchemy import engine_from_config, event, pool
+
+from napari_dashboard.db_sources import attach_sources
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -61,6 +63,12 @@ def run_migrations_online() -> None:
         poolclass=pool.NullPool,
     )
 
+    # source databases are attached, so migrations can move and
+    # modify tables stored in them
+    @event.listens_for(connectable, "connect")
+    def _attach(dbapi_connection, connection_record):
+        attach_sources(dbapi_connection, connectable.url.database)
+
     with connectable.connect() as connection:
         context.configure(
             connection=connection, target_metadata=target_metadata
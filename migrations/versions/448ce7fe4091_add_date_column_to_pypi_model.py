@@ -12,6 +12,8 @@ from typing import Union
 import sqlalchemy as sa
 from alembic import op
 
+from napari_dashboard.migration_util import rebuild_table_in_chunks
+
 # revision identifiers, used by Alembic.
 revision: str = "448ce7fe4091"
 down_revision: Union[str, None] = None
@@ -21,25 +23,7 @@ depends_on: Union[str, Sequence[str], None] = None
 
 def upgrade() -> None:
     # Read the existing schema using PRAGMA
-
-    op.add_column(
-        "pypi_downloads",
-        sa.Column(
-            "date", sa.Date(), nullable=False, server_default="1970-01-01"
-        ),
-    )
-
-    # Populate the `date` column based on `timestamp`
     conn = op.get_bind()
-    conn.execute(
-        sa.text(
-            """
-            UPDATE pypi_downloads
-            SET date = DATE(timestamp)
-            """
-        )
-    )
-
     result = conn.execute(
         sa.text("PRAGMA table_info('pypi_downloads')")
     ).fetchall()
@@ -68,31 +52,27 @@ def upgrade() -> None:
         columns_names.append(col_name)
 
     # find the `timestamp` column index
-    timestamp_index = [col[1] for col in result].index("timestamp")
+    timestamp_index = columns_names.index("timestamp")
 
     # Add the new `date` column definition
     columns.insert(timestamp_index + 1, "date DATE NOT NULL")
     columns_names.insert(timestamp_index + 1, "date")
 
-    # Create new table SQL
-    create_table_sql = f"""
-    CREATE TABLE pypi_downloads_new (
-        {', '.join(columns)}
-    )
-    """
-
-    columns_order = ", ".join(columns_names)
-    # Execute the table recreation
-    op.execute(create_table_sql)
-    op.execute(
-        f"""
-        INSERT INTO pypi_downloads_new SELECT {columns_order} FROM pypi_downloads
-        """
-    )
-
-    # Replace the old table with the new one
-    op.drop_table("pypi_downloads")
-    op.execute("ALTER TABLE pypi_downloads_new RENAME TO pypi_downloads")
+    # Populate the `date` column based on `timestamp` while copying
+    select_columns = [
+        "DATE(timestamp)" if name == "date" else name for name in columns_names
+    ]
+
+    # Copy data in chunks to new table and replace the old one
+    with op.get_context().autocommit_block():
+        rebuild_table_in_chunks(
+            conn,
+            "pypi_downloads",
+            columns,
+            columns_names,
+            select_columns=select_columns,
+            delete_source=True,
+        )
 
 
 def downgrade() -> None:
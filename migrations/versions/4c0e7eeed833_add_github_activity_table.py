@@ -0,0 +1,73 @@
+"""Add github activity table
+
+Revision ID: 4c0e7eeed833
+Revises: c001bbc69f48
+Create Date: 2026-10-18 10:41:55.120371
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "4c0e7eeed833"
+down_revision: Union[str, None] = "c001bbc69f48"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# kind, source table, source id column, number column
+ACTIVITY_SOURCES = (
+    ("pr_comment", "github_pr_comments", "id", "pr_num"),
+    ("pr_review", "github_pr_reviews", "id", "pr_num"),
+    ("pr_commit", "github_pr_commits", "sha", "pr_num"),
+    ("issue_comment", "github_issue_comments", "id", "issue"),
+)
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if not sa.inspect(conn).has_table("github_activity"):
+        op.create_table(
+            "github_activity",
+            sa.Column("kind", sa.String()),
+            sa.Column("source_id", sa.String()),
+            sa.Column("user", sa.String()),
+            sa.Column("repository_name", sa.String()),
+            sa.Column("repository_user", sa.String()),
+            sa.Column("number", sa.Integer()),
+            sa.Column("date", sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint("kind", "source_id"),
+            sa.ForeignKeyConstraint(
+                ["repository_name", "repository_user"],
+                ["github_repositories.name", "github_repositories.user"],
+            ),
+            sa.ForeignKeyConstraint(["user"], ["github_users.username"]),
+        )
+        op.create_index("ix_github_activity_date", "github_activity", ["date"])
+        op.create_index(
+            "ix_github_activity_user_date", "github_activity", ["user", "date"]
+        )
+
+    for kind, table, id_column, number_column in ACTIVITY_SOURCES:
+        if not sa.inspect(conn).has_table(table):
+            continue
+        op.execute(
+            f"""
+            INSERT OR IGNORE INTO github_activity (
+                kind, source_id, user, repository_name, repository_user,
+                number, date
+            )
+            SELECT '{kind}', CAST({id_column} AS TEXT), user,
+                repository_name, repository_user, {number_column}, date
+            FROM {table}
+            """
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_github_activity_user_date", "github_activity")
+    op.drop_index("ix_github_activity_date", "github_activity")
+    op.drop_table("github_activity")
@@ -0,0 +1,55 @@
+"""Split database into per-source files
+
+Revision ID: 5b7e2c9d1f43
+Revises: 8d3f1b2a6c57
+Create Date: 2026-10-18 13:25:10.604217
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from napari_dashboard.db_sources import MAIN, SOURCES, table_source
+from napari_dashboard.migration_util import move_table
+
+# revision identifiers, used by Alembic.
+revision: str = "5b7e2c9d1f43"
+down_revision: Union[str, None] = "8d3f1b2a6c57"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _objects(conn, schema: str) -> list[str]:
+    """Names of tables and views, tables first"""
+    return [
+        row[0]
+        for row in conn.execute(
+            sa.text(
+                f"SELECT name FROM {schema}.sqlite_master "
+                "WHERE type IN ('table', 'view') "
+                "AND name NOT LIKE 'sqlite_%' AND name != 'alembic_version' "
+                "ORDER BY type = 'view', name"
+            )
+        )
+    ]
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    # tables are moved in resumable chunks, committed one by one
+    with op.get_context().autocommit_block():
+        for name in _objects(conn, MAIN):
+            source = table_source(name)
+            if source != MAIN:
+                move_table(conn, name, MAIN, source)
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    with op.get_context().autocommit_block():
+        for source in SOURCES:
+            for name in _objects(conn, source):
+                move_table(conn, name, source, MAIN)
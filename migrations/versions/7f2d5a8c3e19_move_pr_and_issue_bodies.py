@@ -0,0 +1,161 @@
+"""Move pull request and issue bodies to compressed tables
+
+Revision ID: 7f2d5a8c3e19
+Revises: e3a9c4d1b276
+Create Date: 2026-10-18 15:12:40.517203
+
+"""
+
+import zlib
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7f2d5a8c3e19"
+down_revision: Union[str, None] = "e3a9c4d1b276"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = "github"
+CHUNK_SIZE = 1000
+
+# source table, body table, number column
+BODY_SOURCES = (
+    ("github_pull_requests", "github_pr_bodies", "pull_request"),
+    ("github_issues", "github_issue_bodies", "issue"),
+)
+
+
+def _create_body_table(table, body_table, number_column):
+    op.create_table(
+        body_table,
+        sa.Column("repository_user", sa.String()),
+        sa.Column("repository_name", sa.String()),
+        sa.Column(number_column, sa.Integer()),
+        sa.Column("body", sa.LargeBinary()),
+        sa.PrimaryKeyConstraint(
+            "repository_user", "repository_name", number_column
+        ),
+        sa.ForeignKeyConstraint(
+            ["repository_user", "repository_name", number_column],
+            [
+                f"{SCHEMA}.{table}.repository_user",
+                f"{SCHEMA}.{table}.repository_name",
+                f"{SCHEMA}.{table}.{number_column}",
+            ],
+        ),
+        schema=SCHEMA,
+    )
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    for table, body_table, number_column in BODY_SOURCES:
+        inspector = sa.inspect(conn)
+        if not inspector.has_table(table, schema=SCHEMA):
+            continue
+        if not inspector.has_table(body_table, schema=SCHEMA):
+            _create_body_table(table, body_table, number_column)
+        columns = {
+            x["name"] for x in inspector.get_columns(table, schema=SCHEMA)
+        }
+        if "description" not in columns:
+            continue
+
+        # compress in python, sqlite has no built in compression function
+        last_rowid = 0
+        while True:
+            rows = conn.execute(
+                sa.text(
+                    f"""
+                    SELECT rowid, repository_user, repository_name,
+                        {number_column}, description
+                    FROM {SCHEMA}.{table}
+                    WHERE rowid > :last_rowid AND description IS NOT NULL
+                    ORDER BY rowid
+                    LIMIT :limit
+                    """
+                ),
+                {"last_rowid": last_rowid, "limit": CHUNK_SIZE},
+            ).all()
+            if not rows:
+                break
+            conn.execute(
+                sa.text(
+                    f"""
+                    INSERT OR REPLACE INTO {SCHEMA}.{body_table} (
+                        repository_user, repository_name,
+                        {number_column}, body
+                    )
+                    VALUES (:user, :name, :number, :body)
+                    """
+                ),
+                [
+                    {
+                        "user": user,
+                        "name": name,
+                        "number": number,
+                        "body": zlib.compress(description.encode("utf-8")),
+                    }
+                    for _, user, name, number, description in rows
+                ],
+            )
+            last_rowid = rows[-1][0]
+        op.execute(f"ALTER TABLE {SCHEMA}.{table} DROP COLUMN description")
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    for table, body_table, number_column in BODY_SOURCES:
+        if not sa.inspect(conn).has_table(body_table, schema=SCHEMA):
+            continue
+        op.add_column(
+            table, sa.Column("description", sa.String()), schema=SCHEMA
+        )
+        last_key = ("", "", 0)
+        while True:
+            rows = conn.execute(
+                sa.text(
+                    f"""
+                    SELECT repository_user, repository_name,
+                        {number_column}, body
+                    FROM {SCHEMA}.{body_table}
+                    WHERE (repository_user, repository_name, {number_column})
+                        > (:user, :name, :number)
+                    ORDER BY repository_user, repository_name, {number_column}
+                    LIMIT :limit
+                    """
+                ),
+                {
+                    "user": last_key[0],
+                    "name": last_key[1],
+                    "number": last_key[2],
+                    "limit": CHUNK_SIZE,
+                },
+            ).all()
+            if not rows:
+                break
+            conn.execute(
+                sa.text(
+                    f"""
+                    UPDATE {SCHEMA}.{table} SET description = :description
+                    WHERE repository_user = :user
+                        AND repository_name = :name
+                        AND {number_column} = :number
+                    """
+                ),
+                [
+                    {
+                        "user": user,
+                        "name": name,
+                        "number": number,
+                        "description": zlib.decompress(body).decode("utf-8"),
+                    }
+                    for user, name, number, body in rows
+                ],
+            )
+            last_key = rows[-1][:3]
+        op.drop_table(body_table, schema=SCHEMA)
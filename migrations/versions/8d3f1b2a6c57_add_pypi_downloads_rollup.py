@@ -0,0 +1,70 @@
+"""Add pypi downloads rollup table
+
+Revision ID: 8d3f1b2a6c57
+Revises: 4c0e7eeed833
+Create Date: 2026-10-18 12:07:33.518204
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8d3f1b2a6c57"
+down_revision: Union[str, None] = "4c0e7eeed833"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if sa.inspect(conn).has_table("pypi_downloads_rollup"):
+        return
+    op.create_table(
+        "pypi_downloads_rollup",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("project", sa.String(), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("country_code", sa.String()),
+        sa.Column("version", sa.String()),
+        sa.Column("python_version", sa.String()),
+        sa.Column("system_name", sa.String()),
+        sa.Column("distro_name", sa.String()),
+        sa.Column("ci_install", sa.Boolean()),
+        sa.Column("count", sa.Integer(), nullable=False),
+    )
+    op.create_index(
+        "ix_pypi_downloads_rollup_project_date",
+        "pypi_downloads_rollup",
+        ["project", "date"],
+    )
+
+
+def downgrade() -> None:
+    # restore one raw row per counted download, with unknown time of day
+    op.execute(
+        """
+        WITH RECURSIVE expanded(id, n) AS (
+            SELECT id, count FROM pypi_downloads_rollup
+            UNION ALL
+            SELECT id, n - 1 FROM expanded WHERE n > 1
+        )
+        INSERT INTO pypi_downloads (
+            timestamp, date, country_code, project, version, python_version,
+            system_name, system_release, distro_name, distro_version, wheel,
+            ci_install
+        )
+        SELECT r.date || ' 00:00:00.000000', r.date, r.country_code, r.project, r.version,
+            r.python_version, r.system_name, '', r.distro_name, '', 1,
+            r.ci_install
+        FROM expanded e
+        JOIN pypi_downloads_rollup r ON r.id = e.id
+        """
+    )
+    op.drop_index(
+        "ix_pypi_downloads_rollup_project_date", "pypi_downloads_rollup"
+    )
+    op.drop_table("pypi_downloads_rollup")
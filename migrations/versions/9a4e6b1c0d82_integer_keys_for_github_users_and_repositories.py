@@ -0,0 +1,480 @@
+"""Use integer keys for GitHub users and repositories
+
+Revision ID: 9a4e6b1c0d82
+Revises: 7f2d5a8c3e19
+Create Date: 2026-10-18 16:20:07.411853
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9a4e6b1c0d82"
+down_revision: Union[str, None] = "7f2d5a8c3e19"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = "github"
+USERS = "github_users"
+REPOSITORIES = "github_repositories"
+
+# placeholders for reference to repository and user, expanded to
+# integer id columns or to the old string columns
+REPO = "<repository>"
+USER = "<user>"
+
+# table: (columns, primary key, foreign keys, unique, indexes)
+# columns are (name, type, nullable), foreign keys are
+# (columns, target table, target columns)
+TABLES = {
+    "github_stars": (
+        [("datetime", sa.DateTime(), True), ("date", sa.Date(), True)],
+        [REPO, USER],
+        [],
+        [],
+        [],
+    ),
+    "github_pull_requests": (
+        [
+            ("pull_request", sa.Integer(), False),
+            ("open_time", sa.DateTime(), False),
+            ("close_time", sa.DateTime(), True),
+            ("merge_time", sa.DateTime(), True),
+            ("last_modification_time", sa.DateTime(), False),
+            ("title", sa.String(), True),
+        ],
+        [REPO, "pull_request"],
+        [],
+        [],
+        [],
+    ),
+    "github_pr_bodies": (
+        [
+            ("pull_request", sa.Integer(), False),
+            ("body", sa.LargeBinary(), True),
+        ],
+        [REPO, "pull_request"],
+        [
+            (
+                [REPO, "pull_request"],
+                "github_pull_requests",
+                [REPO, "pull_request"],
+            )
+        ],
+        [],
+        [],
+    ),
+    "github_pr_to_labels_table": (
+        [
+            ("github_labels", sa.String(), False),
+            ("pull_request_num", sa.Integer(), False),
+        ],
+        ["github_labels", "pull_request_num", REPO],
+        [
+            (["github_labels"], "github_labels", ["label"]),
+            (
+                ["pull_request_num", REPO],
+                "github_pull_requests",
+                ["pull_request", REPO],
+            ),
+        ],
+        [],
+        [],
+    ),
+    "github_pr_commits": (
+        [
+            ("sha", sa.String(), False),
+            ("date", sa.DateTime(), False),
+            ("pr_num", sa.Integer(), True),
+        ],
+        ["sha"],
+        [([REPO, "pr_num"], "github_pull_requests", [REPO, "pull_request"])],
+        [],
+        [],
+    ),
+    "github_pr_comments": (
+        [
+            ("id", sa.Integer(), False),
+            ("date", sa.DateTime(), False),
+            ("pr_num", sa.Integer(), True),
+        ],
+        ["id"],
+        [([REPO, "pr_num"], "github_pull_requests", [REPO, "pull_request"])],
+        [],
+        [],
+    ),
+    "github_pr_reviews": (
+        [
+            ("state", sa.String(), True),
+            ("id", sa.Integer(), False),
+            ("date", sa.DateTime(), False),
+            ("pr_num", sa.Integer(), True),
+        ],
+        ["id"],
+        [([REPO, "pr_num"], "github_pull_requests", [REPO, "pull_request"])],
+        [],
+        [],
+    ),
+    "github_issues": (
+        [
+            ("issue", sa.Integer(), False),
+            ("open_time", sa.DateTime(), False),
+            ("close_time", sa.DateTime(), True),
+            ("last_modification_time", sa.DateTime(), False),
+            ("title", sa.String(), True),
+        ],
+        [REPO, "issue"],
+        [],
+        [],
+        [],
+    ),
+    "github_issue_bodies": (
+        [("issue", sa.Integer(), False), ("body", sa.LargeBinary(), True)],
+        [REPO, "issue"],
+        [([REPO, "issue"], "github_issues", [REPO, "issue"])],
+        [],
+        [],
+    ),
+    "github_issues_to_labels_table": (
+        [("label", sa.String(), False), ("issue_num", sa.Integer(), False)],
+        ["label", "issue_num", REPO],
+        [
+            (["label"], "github_labels", ["label"]),
+            (["issue_num", REPO], "github_issues", ["issue", REPO]),
+        ],
+        [],
+        [],
+    ),
+    "github_issue_comments": (
+        [
+            ("date", sa.DateTime(), False),
+            ("id", sa.Integer(), False),
+            ("issue", sa.Integer(), True),
+        ],
+        ["id"],
+        [([REPO, "issue"], "github_issues", [REPO, "issue"])],
+        [],
+        [],
+    ),
+    "github_activity": (
+        [
+            ("kind", sa.String(), False),
+            ("source_id", sa.String(), False),
+            ("number", sa.Integer(), True),
+            ("date", sa.DateTime(), False),
+        ],
+        ["kind", "source_id"],
+        [],
+        [],
+        [
+            ("ix_github_activity_date", ["date"]),
+            ("ix_github_activity_user_date", [USER, "date"]),
+        ],
+    ),
+    "github_search_documents": (
+        [
+            ("id", sa.Integer(), False),
+            ("kind", sa.String(), False),
+            ("number", sa.Integer(), False),
+        ],
+        ["id"],
+        [],
+        [["kind", REPO, "number"]],
+        [],
+    ),
+    "github_releases": (
+        [("release_tag", sa.String(), False)],
+        [REPO, "release_tag"],
+        [],
+        [],
+        [],
+    ),
+    "github_artifact_downloads": (
+        [
+            ("release_tag", sa.String(), False),
+            ("download_count", sa.Integer(), True),
+            ("artifact_name", sa.String(), False),
+            ("platform", sa.String(), True),
+        ],
+        [REPO, "release_tag", "artifact_name"],
+        [([REPO, "release_tag"], "github_releases", [REPO, "release_tag"])],
+        [],
+        [],
+    ),
+}
+
+# tables with reference to user
+USER_TABLES = {
+    "github_stars",
+    "github_pull_requests",
+    "github_pr_commits",
+    "github_pr_comments",
+    "github_pr_reviews",
+    "github_issues",
+    "github_issue_comments",
+    "github_activity",
+}
+
+
+def _expand(columns, integer_keys):
+    res = []
+    for name in columns:
+        if name == REPO:
+            res.extend(
+                ["repository_id"]
+                if integer_keys
+                else ["repository_name", "repository_user"]
+            )
+        elif name == USER:
+            res.append("user_id" if integer_keys else "user")
+        else:
+            res.append(name)
+    return res
+
+
+def _reference_columns(table, integer_keys):
+    """Columns referring to repository and user"""
+    _, primary_key, _, unique, _ = TABLES[table]
+    # references being part of a key are required
+    keys = [primary_key, *unique]
+    key_type = sa.Integer if integer_keys else sa.String
+    references = [REPO, USER] if table in USER_TABLES else [REPO]
+    return [
+        sa.Column(
+            name,
+            key_type(),
+            nullable=not any(reference in key for key in keys),
+        )
+        for reference in references
+        for name in _expand([reference], integer_keys)
+    ]
+
+
+def _create_table(table, name, integer_keys):
+    columns, primary_key, foreign_keys, unique, _ = TABLES[table]
+    constraints = [
+        sa.PrimaryKeyConstraint(*_expand(primary_key, integer_keys))
+    ]
+    # repository is referenced directly only if not through a parent row
+    if not any(REPO in local for local, _, _ in foreign_keys):
+        constraints.append(
+            sa.ForeignKeyConstraint(
+                _expand([REPO], integer_keys),
+                [f"{SCHEMA}.{REPOSITORIES}.id"]
+                if integer_keys
+                else [
+                    f"{SCHEMA}.{REPOSITORIES}.name",
+                    f"{SCHEMA}.{REPOSITORIES}.user",
+                ],
+            )
+        )
+    if table in USER_TABLES:
+        constraints.append(
+            sa.ForeignKeyConstraint(
+                _expand([USER], integer_keys),
+                [
+                    f"{SCHEMA}.{USERS}.id"
+                    if integer_keys
+                    else f"{SCHEMA}.{USERS}.username"
+                ],
+            )
+        )
+    constraints.extend(
+        sa.ForeignKeyConstraint(
+            _expand(local, integer_keys),
+            [f"{SCHEMA}.{target}.{x}" for x in _expand(remote, integer_keys)],
+        )
+        for local, target, remote in foreign_keys
+    )
+    constraints.extend(
+        sa.UniqueConstraint(*_expand(x, integer_keys)) for x in unique
+    )
+    op.create_table(
+        name,
+        *(
+            sa.Column(column_name, column_type, nullable=nullable)
+            for column_name, column_type, nullable in columns
+        ),
+        *_reference_columns(table, integer_keys),
+        *constraints,
+        schema=SCHEMA,
+    )
+
+
+def _copy_table(table, target, integer_keys, users, repositories):
+    """
+    Copy rows of ``table`` to ``target``, replacing references
+    using ``users`` and ``repositories`` tables, which have both
+    integer ids and names.
+
+    References are joined with LEFT JOIN, so rows without a user keep
+    a NULL user. The migration is aborted if any row is not copied.
+    """
+    columns = [x[0] for x in TABLES[table][0]]
+    select_columns = [f"t.{x}" for x in columns]
+    if integer_keys:
+        columns.append("repository_id")
+        select_columns.append("r.id")
+        join_repository = (
+            "r.user = t.repository_user AND r.name = t.repository_name"
+        )
+        join_user = "u.username = t.user"
+    else:
+        columns.extend(["repository_name", "repository_user"])
+        select_columns.extend(["r.name", "r.user"])
+        join_repository = "r.id = t.repository_id"
+        join_user = "u.id = t.user_id"
+    joins = f"LEFT JOIN {SCHEMA}.{repositories} r ON {join_repository}"
+    if table in USER_TABLES:
+        columns.append("user_id" if integer_keys else "user")
+        select_columns.append("u.id" if integer_keys else "u.username")
+        joins += f" LEFT JOIN {SCHEMA}.{users} u ON {join_user}"
+    op.execute(
+        f"""
+        INSERT INTO {SCHEMA}.{target} ({", ".join(columns)})
+        SELECT {", ".join(select_columns)}
+        FROM {SCHEMA}.{table} t {joins}
+        """
+    )
+    conn = op.get_bind()
+    source_count, target_count = (
+        conn.execute(sa.text(f"SELECT COUNT(*) FROM {SCHEMA}.{x}")).scalar()
+        for x in (table, target)
+    )
+    if source_count != target_count:
+        raise RuntimeError(
+            f"Copied {target_count} of {source_count} rows of {table}"
+        )
+
+
+def _replace_table(table, new_table):
+    op.execute(f"DROP TABLE {SCHEMA}.{table}")
+    op.execute(f"ALTER TABLE {SCHEMA}.{new_table} RENAME TO {table}")
+
+
+def _create_indexes(tables, integer_keys):
+    for table in tables:
+        for name, columns in TABLES[table][4]:
+            op.create_index(
+                name, table, _expand(columns, integer_keys), schema=SCHEMA
+            )
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    if not inspector.has_table(USERS, schema=SCHEMA):
+        return
+    if "id" in {x["name"] for x in inspector.get_columns(USERS, SCHEMA)}:
+        return
+    tables = [x for x in TABLES if inspector.has_table(x, schema=SCHEMA)]
+
+    op.create_table(
+        f"{USERS}_new",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("username", sa.String(), nullable=False, unique=True),
+        schema=SCHEMA,
+    )
+    op.execute(
+        f"""
+        INSERT INTO {SCHEMA}.{USERS}_new (username)
+        SELECT username FROM {SCHEMA}.{USERS} ORDER BY rowid
+        """
+    )
+    # users referenced by other rows but missing in users table
+    for table in (REPOSITORIES, *(x for x in tables if x in USER_TABLES)):
+        op.execute(
+            f"""
+            INSERT OR IGNORE INTO {SCHEMA}.{USERS}_new (username)
+            SELECT DISTINCT user FROM {SCHEMA}.{table}
+            WHERE user IS NOT NULL
+            """
+        )
+
+    op.create_table(
+        f"{REPOSITORIES}_new",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user", sa.String()),
+        sa.Column("name", sa.String()),
+        sa.UniqueConstraint("user", "name"),
+        sa.ForeignKeyConstraint(["user"], [f"{SCHEMA}.{USERS}.username"]),
+        schema=SCHEMA,
+    )
+    op.execute(
+        f"""
+        INSERT OR IGNORE INTO {SCHEMA}.{REPOSITORIES}_new (user, name)
+        SELECT user, name FROM {SCHEMA}.{REPOSITORIES} ORDER BY rowid
+        """
+    )
+    # repositories referenced by other rows but missing in repositories table
+    for table in tables:
+        op.execute(
+            f"""
+            INSERT OR IGNORE INTO {SCHEMA}.{REPOSITORIES}_new (user, name)
+            SELECT DISTINCT repository_user, repository_name
+            FROM {SCHEMA}.{table}
+            """
+        )
+
+    for table in tables:
+        _create_table(table, f"{table}_new", integer_keys=True)
+        _copy_table(
+            table,
+            f"{table}_new",
+            integer_keys=True,
+            users=f"{USERS}_new",
+            repositories=f"{REPOSITORIES}_new",
+        )
+    for table in (*tables, USERS, REPOSITORIES):
+        _replace_table(table, f"{table}_new")
+    _create_indexes(tables, integer_keys=True)
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    tables = [x for x in TABLES if inspector.has_table(x, schema=SCHEMA)]
+
+    for table in tables:
+        _create_table(table, f"{table}_old", integer_keys=False)
+        _copy_table(
+            table,
+            f"{table}_old",
+            integer_keys=False,
+            users=USERS,
+            repositories=REPOSITORIES,
+        )
+
+    op.create_table(
+        f"{USERS}_old",
+        sa.Column("username", sa.String()),
+        sa.PrimaryKeyConstraint("username"),
+        schema=SCHEMA,
+    )
+    op.execute(
+        f"""
+        INSERT INTO {SCHEMA}.{USERS}_old (username)
+        SELECT username FROM {SCHEMA}.{USERS} ORDER BY id
+        """
+    )
+    op.create_table(
+        f"{REPOSITORIES}_old",
+        sa.Column("user", sa.String()),
+        sa.Column("name", sa.String()),
+        sa.PrimaryKeyConstraint("user", "name"),
+        sa.ForeignKeyConstraint(["user"], [f"{SCHEMA}.{USERS}.username"]),
+        schema=SCHEMA,
+    )
+    op.execute(
+        f"""
+        INSERT INTO {SCHEMA}.{REPOSITORIES}_old (user, name)
+        SELECT user, name FROM {SCHEMA}.{REPOSITORIES} ORDER BY id
+        """
+    )
+    for table in (*tables, USERS, REPOSITORIES):
+        _replace_table(table, f"{table}_old")
+    _create_indexes(tables, integer_keys=False)
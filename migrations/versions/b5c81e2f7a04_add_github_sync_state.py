@@ -0,0 +1,43 @@
+"""Add state of incremental GitHub synchronization
+
+Revision ID: b5c81e2f7a04
+Revises: 9a4e6b1c0d82
+Create Date: 2026-10-18 17:12:36.504218
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b5c81e2f7a04"
+down_revision: Union[str, None] = "9a4e6b1c0d82"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = "github"
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if sa.inspect(conn).has_table("github_sync_state", schema=SCHEMA):
+        return
+    op.create_table(
+        "github_sync_state",
+        sa.Column("repository_id", sa.Integer()),
+        sa.Column("kind", sa.String()),
+        sa.Column("high_water_mark", sa.DateTime()),
+        sa.Column("synced_at", sa.DateTime()),
+        sa.PrimaryKeyConstraint("repository_id", "kind"),
+        sa.ForeignKeyConstraint(
+            ["repository_id"], [f"{SCHEMA}.github_repositories.id"]
+        ),
+        schema=SCHEMA,
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("github_sync_state", schema=SCHEMA)
@@ -0,0 +1,142 @@
+"""Store conda downloads only when they change
+
+Revision ID: c001bbc69f48
+Revises: c720724e3783
+Create Date: 2026-10-18 10:03:12.811904
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c001bbc69f48"
+down_revision: Union[str, None] = "c720724e3783"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CONDA_SNAPSHOT_VIEW = """
+CREATE VIEW IF NOT EXISTS conda_downloads_snapshot AS
+SELECT
+    s.date AS snapshot_date,
+    d.pypi_name,
+    d.name,
+    d.version,
+    d.download_count,
+    d.full_binary_name,
+    d.latest_version
+FROM conda_snapshots s
+JOIN conda_downloads d
+    ON d.pypi_name = s.pypi_name
+    AND d.date = (
+        SELECT MAX(d2.date)
+        FROM conda_downloads d2
+        WHERE d2.name = d.name
+            AND d2.full_binary_name = d.full_binary_name
+            AND d2.date <= s.date
+    )
+WHERE d.download_count IS NOT NULL
+"""
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if not sa.inspect(conn).has_table("conda_snapshots"):
+        op.create_table(
+            "conda_snapshots",
+            sa.Column("pypi_name", sa.String()),
+            sa.Column("date", sa.Date()),
+            sa.PrimaryKeyConstraint("pypi_name", "date"),
+        )
+    if not sa.inspect(conn).has_table("conda_downloads"):
+        return
+
+    op.execute(
+        """
+        INSERT OR IGNORE INTO conda_snapshots (pypi_name, date)
+        SELECT DISTINCT pypi_name, date FROM conda_downloads
+        """
+    )
+    # mark files that disappear from listing in the next snapshot
+    # of the package, before removing rows that repeat previous state
+    op.execute(
+        """
+        INSERT INTO conda_downloads (
+            pypi_name, name, version, download_count, date,
+            full_binary_name, latest_version
+        )
+        SELECT c.pypi_name, c.name, c.version, NULL, s.date,
+            c.full_binary_name, 0
+        FROM conda_downloads c
+        JOIN conda_snapshots s
+            ON s.pypi_name = c.pypi_name
+            AND s.date = (
+                SELECT MIN(s2.date)
+                FROM conda_snapshots s2
+                WHERE s2.pypi_name = c.pypi_name AND s2.date > c.date
+            )
+        WHERE c.download_count IS NOT NULL
+            AND NOT EXISTS (
+                SELECT 1
+                FROM conda_downloads c2
+                WHERE c2.name = c.name
+                    AND c2.full_binary_name = c.full_binary_name
+                    AND c2.date = s.date
+            )
+        """
+    )
+    op.execute(
+        """
+        DELETE FROM conda_downloads
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT
+                    id,
+                    download_count,
+                    latest_version,
+                    LAG(date) OVER w AS previous_date,
+                    LAG(download_count) OVER w AS previous_count,
+                    LAG(latest_version) OVER w AS previous_latest
+                FROM conda_downloads
+                WINDOW w AS (
+                    PARTITION BY name, full_binary_name ORDER BY date
+                )
+            )
+            WHERE previous_date IS NOT NULL
+                AND download_count IS previous_count
+                AND latest_version IS previous_latest
+        )
+        """
+    )
+    op.execute(CONDA_SNAPSHOT_VIEW)
+
+
+def downgrade() -> None:
+    op.execute("DROP VIEW IF EXISTS conda_downloads_snapshot")
+    # rebuild full snapshot rows for each collected day
+    op.execute(
+        """
+        INSERT INTO conda_downloads (
+            pypi_name, name, version, download_count, date,
+            full_binary_name, latest_version
+        )
+        SELECT c.pypi_name, c.name, c.version, c.download_count, s.date,
+            c.full_binary_name, c.latest_version
+        FROM conda_snapshots s
+        JOIN conda_downloads c
+            ON c.pypi_name = s.pypi_name
+            AND c.date = (
+                SELECT MAX(c2.date)
+                FROM conda_downloads c2
+                WHERE c2.name = c.name
+                    AND c2.full_binary_name = c.full_binary_name
+                    AND c2.date <= s.date
+            )
+        WHERE c.date < s.date AND c.download_count IS NOT NULL
+        """
+    )
+    op.execute("DELETE FROM conda_downloads WHERE download_count IS NULL")
+    op.drop_table("conda_snapshots")
@@ -0,0 +1,47 @@
+"""Add pepy daily totals table
+
+Revision ID: c720724e3783
+Revises: 448ce7fe4091
+Create Date: 2026-10-18 09:12:41.417204
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c720724e3783"
+down_revision: Union[str, None] = "448ce7fe4091"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if not sa.inspect(conn).has_table("pepy_daily_totals"):
+        op.create_table(
+            "pepy_daily_totals",
+            sa.Column("name", sa.String()),
+            sa.Column("date", sa.Date()),
+            sa.Column("downloads", sa.Integer()),
+            sa.PrimaryKeyConstraint("name", "date"),
+        )
+    if not sa.inspect(conn).has_table("pepy_download_stats"):
+        return
+
+    # fill the table with totals for already collected data
+    op.execute(
+        """
+        INSERT OR REPLACE INTO pepy_daily_totals (name, date, downloads)
+        SELECT name, date, SUM(downloads)
+        FROM pepy_download_stats
+        GROUP BY name, date
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("pepy_daily_totals")
@@ -0,0 +1,42 @@
+"""Add head SHA and number of commits of pull requests
+
+Revision ID: d4b7e91a3c60
+Revises: b5c81e2f7a04
+Create Date: 2026-10-19 09:41:18.270361
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d4b7e91a3c60"
+down_revision: Union[str, None] = "b5c81e2f7a04"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = "github"
+TABLE = "github_pull_requests"
+
+COLUMNS = (("head_sha", sa.String), ("commit_count", sa.Integer))
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    if not inspector.has_table(TABLE, schema=SCHEMA):
+        return
+    existing = {x["name"] for x in inspector.get_columns(TABLE, schema=SCHEMA)}
+    for name, type_ in COLUMNS:
+        if name not in existing:
+            # commits of pull requests without the head are fetched again
+            # by the next sync, which fills the columns
+            op.add_column(TABLE, sa.Column(name, type_()), schema=SCHEMA)
+
+
+def downgrade() -> None:
+    for name, _ in COLUMNS:
+        op.drop_column(TABLE, name, schema=SCHEMA)
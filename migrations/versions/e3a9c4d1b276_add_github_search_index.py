@@ -0,0 +1,84 @@
+"""Add full text search index of pull requests and issues
+
+Revision ID: e3a9c4d1b276
+Revises: 5b7e2c9d1f43
+Create Date: 2026-10-18 14:02:51.338920
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e3a9c4d1b276"
+down_revision: Union[str, None] = "5b7e2c9d1f43"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = "github"
+
+# kind, source table, number column
+DOCUMENT_SOURCES = (
+    ("pr", "github_pull_requests", "pull_request"),
+    ("issue", "github_issues", "issue"),
+)
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if not sa.inspect(conn).has_table(
+        "github_search_documents", schema=SCHEMA
+    ):
+        op.create_table(
+            "github_search_documents",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("kind", sa.String(), nullable=False),
+            sa.Column("repository_user", sa.String(), nullable=False),
+            sa.Column("repository_name", sa.String(), nullable=False),
+            sa.Column("number", sa.Integer(), nullable=False),
+            sa.UniqueConstraint(
+                "kind", "repository_user", "repository_name", "number"
+            ),
+            schema=SCHEMA,
+        )
+    op.execute(
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {SCHEMA}.github_search
+        USING fts5(title, description, tokenize = 'porter unicode61')
+        """
+    )
+
+    inspector = sa.inspect(conn)
+    for kind, table, number_column in DOCUMENT_SOURCES:
+        if not inspector.has_table(table, schema=SCHEMA):
+            continue
+        op.execute(
+            f"""
+            INSERT OR IGNORE INTO {SCHEMA}.github_search_documents (
+                kind, repository_user, repository_name, number
+            )
+            SELECT '{kind}', repository_user, repository_name, {number_column}
+            FROM {SCHEMA}.{table}
+            """
+        )
+        op.execute(
+            f"""
+            INSERT INTO {SCHEMA}.github_search (rowid, title, description)
+            SELECT d.id, t.title, t.description
+            FROM {SCHEMA}.github_search_documents d
+            JOIN {SCHEMA}.{table} t
+                ON t.repository_user = d.repository_user
+                AND t.repository_name = d.repository_name
+                AND t.{number_column} = d.number
+            WHERE d.kind = '{kind}'
+                AND d.id NOT IN (SELECT rowid FROM {SCHEMA}.github_search)
+            """
+        )
+
+
+def downgrade() -> None:
+    op.execute(f"DROP TABLE IF EXISTS {SCHEMA}.github_search")
+    op.drop_table("github_search_documents", schema=SCHEMA)
@@ -3,18 +3,18 @@ import datetime
 import os
 from pathlib import Path
 
-from sqlalchemy import create_engine
 from sqlalchemy.orm import Session
 from tqdm import tqdm
 
 from napari_dashboard.db_schema.github import PullRequestCommits
+from napari_dashboard.db_sources import GITHUB, create_source_engine
 from napari_dashboard.db_update.github import (
     ensure_user,
     get_commits,
     get_repo_with_model,
 )
 from napari_dashboard.db_update.util import setup_cache
-from napari_dashboard.get_webpage.gdrive import fetch_database
+from napari_dashboard.gdrive_util import fetch_database
 
 db_path = Path(__file__).parent.parent / "dashboard.db"
 
@@ -26,11 +26,12 @@ PR_COMMITS_HEADER = {
 
 
 def main():
-    fetch_database()
+    fetch_database(db_path)
 
     setup_cache()
 
-    engine = create_engine(f"sqlite:///{db_path.absolute()}")
+    # GitHub tables are stored in their own source database
+    engine = create_source_engine(db_path, GITHUB)
 
     with Session(engine) as session:
         # session.query(PullRequestCommits).delete()
@@ -60,15 +61,13 @@ def main():
                     date = datetime.datetime.fromisoformat(
                         commit["commit"]["author"]["date"]
                     ).replace(tzinfo=None)
-                    ensure_user(user_login, session)
                     session.merge(
                         PullRequestCommits(
                             sha=commit["sha"],
-                            user=user_login,
+                            user_id=ensure_user(user_login, session),
                             date=date,
                             pr_num=pr.number,
-                            repository_name=repo_model.name,
-                            repository_user=repo_model.user,
+                            repository_id=repo_model.id,
                         )
                     )
             session.commit()
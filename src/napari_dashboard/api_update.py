@@ -9,12 +9,11 @@ from pathlib import Path
 
 from napari_dashboard.db_update.__main__ import main as db_update_main
 from napari_dashboard.gdrive_util import (
-    COMPRESSED_DB,
     DB_PATH,
-    compress_file,
     fetch_database,
-    upload_db_dump,
+    upload_databases,
 )
+from napari_dashboard.maintenance import optimize_changed_databases
 
 
 def main(args: None | list[str] = None):
@@ -33,9 +32,9 @@ def main(args: None | list[str] = None):
     updated = db_update_main([str(args.db_path)])
     print(f"Database updated: {updated}")
     if updated:
+        optimize_changed_databases(args.db_path)
         print("Uploading database")
-        compress_file(args.db_path, COMPRESSED_DB)
-        upload_db_dump(COMPRESSED_DB)
+        upload_databases(args.db_path)
 
 
 if __name__ == "__main__":
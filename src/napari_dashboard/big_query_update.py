@@ -12,22 +12,31 @@ import pandas as pd
 from google.cloud import bigquery, bigquery_storage
 from google.cloud.bigquery import UnknownJob
 from packaging import version
-from sqlalchemy import Engine, create_engine, func
+from sqlalchemy import Engine, func
 from sqlalchemy.orm import Session
 from tqdm import tqdm
 
-from napari_dashboard.db_schema.base import Base
 from napari_dashboard.db_schema.pypi import PyPi
+from napari_dashboard.db_sources import (
+    PYPI,
+    create_source_engine,
+    create_source_tables,
+)
+from napari_dashboard.db_update.pypi import (
+    DEFAULT_RETENTION_MONTHS,
+    compact_old_downloads,
+)
+from napari_dashboard.db_update.util import BatchWriter
 from napari_dashboard.gdrive_util import (
-    COMPRESSED_DB,
     DB_PATH,
-    compress_file,
     fetch_database,
-    upload_db_dump,
+    upload_databases,
 )
+from napari_dashboard.maintenance import optimize_changed_databases
 
 PROCESSED_BYTES_LIMIT = 1000**4 - 50 * 1000**3
 # 950GB limit to ensure to fit in 1 TB free limit
+DOWNLOADS_BATCH_SIZE = 10000
 
 
 # The query template
@@ -112,7 +121,8 @@ def is_ci_install(system_release: str) -> bool:
 def load_from_query(df: pd.DataFrame, engine: Engine):
     """Convert the data frame to the PyPi object and save it to the database"""
     with Session(engine) as session:
-        for i, row in enumerate(df.iterrows()):
+        writer = BatchWriter(session, batch_size=DOWNLOADS_BATCH_SIZE)
+        for row in df.iterrows():
             project_info = parse_file_name(row[1].project)
             is_ci = is_ci_install(row[1].system_release)
             # print(row)
@@ -130,10 +140,9 @@ def load_from_query(df: pd.DataFrame, engine: Engine):
                 wheel=project_info.wheel,
                 ci_install=is_ci,
             )
-            session.add(obj)
-            if i % 10000 == 0:
-                session.commit()
-        session.commit()
+            writer.add(obj)
+            writer.done()
+        writer.checkpoint()
 
 
 def get_version_from_beginning(details: str, with_pre=True) -> tuple[str, str]:
@@ -369,7 +378,8 @@ def load_from_czi_file(czi_file: str, engine) -> None:
     """
     df = pd.read_csv(czi_file)
     with Session(engine) as session:
-        for i, row in tqdm(enumerate(df.iterrows()), total=len(df)):
+        writer = BatchWriter(session, batch_size=DOWNLOADS_BATCH_SIZE)
+        for row in tqdm(df.iterrows(), total=len(df)):
             if row[1].PROJECT != "napari":
                 continue
             (
@@ -402,10 +412,9 @@ def load_from_czi_file(czi_file: str, engine) -> None:
                 wheel=row[1].FILE_TYPE == "bdist_wheel",
                 ci_install=is_ci,
             )
-            session.add(obj)
-            if i % 10000 == 0:
-                session.commit()
-        session.commit()
+            writer.add(obj)
+            writer.done()
+        writer.checkpoint()
 
 
 def make_big_query_and_save_to_database(
@@ -525,6 +534,13 @@ def main(args: None | list[str] = None):
         default=Path(DB_PATH),
         nargs="?",
     )
+    parser.add_argument(
+        "--retention-months",
+        type=int,
+        default=DEFAULT_RETENTION_MONTHS,
+        help="Number of months for which raw downloads are kept, "
+        "older ones are compacted to daily counts",
+    )
     args = parser.parse_args(args)
 
     processed_bytes = get_information_about_processed_bytes()
@@ -538,16 +554,19 @@ def main(args: None | list[str] = None):
         return -1
 
     fetch_database(args.db_path.absolute())
-    engine = create_engine(f"sqlite:///{args.db_path.absolute()}")
-    Base.metadata.create_all(engine)
+    engine = create_source_engine(args.db_path, PYPI)
+    create_source_tables(engine, PYPI)
     try:
         updated = make_big_query_and_save_to_database(engine, processed_bytes)
     except EstimationError:
         return -2
     if updated:
-        compress_file(args.db_path.absolute(), COMPRESSED_DB)
+        print("Compacting old downloads")
+        with Session(engine) as session:
+            compact_old_downloads(session, args.retention_months)
+        optimize_changed_databases(args.db_path.absolute())
         print("Uploading database")
-        upload_db_dump(COMPRESSED_DB)
+        upload_databases(args.db_path.absolute())
     return 0
 
 
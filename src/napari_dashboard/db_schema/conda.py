@@ -1,10 +1,31 @@
-from sqlalchemy import Boolean, Column, Date, Integer, String, UniqueConstraint
+from sqlalchemy import (
+    DDL,
+    Boolean,
+    Column,
+    Date,
+    Integer,
+    PrimaryKeyConstraint,
+    String,
+    UniqueConstraint,
+    event,
+    inspect,
+)
 from sqlalchemy.orm import Mapped
 
 from napari_dashboard.db_schema.base import Base
 
 
 class CondaDownload(Base):
+    """
+    Download count of a single conda file.
+
+    Rows are stored only when the state of a file changed since
+    its previous snapshot, so the full state for a given day is
+    the most recent row of each file not newer than this day.
+    ``download_count`` equal to ``None`` marks a file that is no
+    longer listed on anaconda.org.
+    """
+
     __tablename__ = "conda_downloads"
     __table_args__ = (UniqueConstraint("name", "full_binary_name", "date"),)
 
@@ -16,3 +37,51 @@ class CondaDownload(Base):
     date: Mapped[Date] = Column(Date)
     full_binary_name: Mapped[str] = Column(String)
     latest_version: Mapped[bool] = Column(Boolean)
+
+
+class CondaSnapshot(Base):
+    """Days on which conda download information of a package was collected"""
+
+    __tablename__ = "conda_snapshots"
+    __table_args__ = (PrimaryKeyConstraint("pypi_name", "date"),)
+
+    pypi_name: Mapped[str] = Column(String)
+    date: Mapped[Date] = Column(Date)
+
+
+CONDA_SNAPSHOT_VIEW = """
+CREATE VIEW IF NOT EXISTS conda_downloads_snapshot AS
+SELECT
+    s.date AS snapshot_date,
+    d.pypi_name,
+    d.name,
+    d.version,
+    d.download_count,
+    d.full_binary_name,
+    d.latest_version
+FROM conda_snapshots s
+JOIN conda_downloads d
+    ON d.pypi_name = s.pypi_name
+    AND d.date = (
+        SELECT MAX(d2.date)
+        FROM conda_downloads d2
+        WHERE d2.name = d.name
+            AND d2.full_binary_name = d.full_binary_name
+            AND d2.date <= s.date
+    )
+WHERE d.download_count IS NOT NULL
+"""
+
+
+def _has_conda_tables(ddl, target, bind, **kw):
+    inspector = inspect(bind)
+    return inspector.has_table("conda_downloads") and inspector.has_table(
+        "conda_snapshots"
+    )
+
+
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL(CONDA_SNAPSHOT_VIEW).execute_if(callable_=_has_conda_tables),
+)
@@ -1,15 +1,26 @@
+import zlib
+from typing import Optional
+
 from sqlalchemy import (
+    DDL,
     Column,
     Date,
     DateTime,
     ForeignKey,
     ForeignKeyConstraint,
+    Index,
     Integer,
+    LargeBinary,
     PrimaryKeyConstraint,
     String,
     Table,
+    UniqueConstraint,
+    column,
+    event,
+    inspect,
+    table,
 )
-from sqlalchemy.orm import Mapped, declared_attr, relationship
+from sqlalchemy.orm import Mapped, declared_attr, mapped_column, relationship
 
 from napari_dashboard.db_schema.base import Base
 
@@ -21,34 +32,81 @@ BOT_SET = {
 }
 
 
+def compress_text(text: Optional[str]) -> Optional[bytes]:
+    if text is None:
+        return None
+    return zlib.compress(text.encode("utf-8"))
+
+
+def decompress_text(data: Optional[bytes]) -> Optional[str]:
+    if data is None:
+        return None
+    return zlib.decompress(data).decode("utf-8")
+
+
+class CompressedDescription:
+    """
+    Mixin for models with ``description`` stored compressed in a side table.
+
+    Markdown bodies are big and rarely used, so they are kept out of the
+    main rows and loaded only when ``description`` is accessed.
+    Requires ``body_row`` relationship to a model with ``body`` column.
+    """
+
+    __body_model__: type
+
+    @property
+    def description(self) -> Optional[str]:
+        if self.body_row is None:
+            return None
+        return decompress_text(self.body_row.body)
+
+    @description.setter
+    def description(self, value: Optional[str]) -> None:
+        if value is None:
+            self.body_row = None
+        elif self.body_row is None:
+            self.body_row = self.__body_model__(body=compress_text(value))
+        else:
+            self.body_row.body = compress_text(value)
+
+
 def pull_request_relation():
     return (
         Column("pull_request_num", primary_key=True),
-        Column("repository_name", primary_key=True),
-        Column("repository_user", primary_key=True),
+        Column("repository_id", primary_key=True),
         ForeignKeyConstraint(
-            ["pull_request_num", "repository_name", "repository_user"],
+            ["pull_request_num", "repository_id"],
             [
                 "github_pull_requests.pull_request",
-                "github_pull_requests.repository_name",
-                "github_pull_requests.repository_user",
+                "github_pull_requests.repository_id",
             ],
         ),
     )
 
 
 class GithubUser(Base):
+    """
+    User of GitHub.
+
+    Other tables refer to users by integer ``id`` instead of ``username``,
+    to keep rows of big tables and their indexes small.
+    """
+
     __tablename__ = "github_users"
-    __table_args__ = (PrimaryKeyConstraint("username"),)
 
-    username: Mapped[str] = Column(String)
+    id: Mapped[int] = Column(Integer, primary_key=True)
+    username: Mapped[str] = Column(String, unique=True, nullable=False)
     stars: Mapped[list["Stars"]] = relationship(back_populates="gh_user")
 
 
 class Repository(Base):
+    """Repository on GitHub, referred by integer ``id`` in other tables"""
+
     __tablename__ = "github_repositories"
-    __table_args__ = (PrimaryKeyConstraint("user", "name"),)
+    __table_args__ = (UniqueConstraint("user", "name"),)
 
+    id: Mapped[int] = Column(Integer, primary_key=True)
     user: Mapped[str] = Column(String, ForeignKey("github_users.username"))
     name: Mapped[str] = Column(String)
     stars: Mapped[list["Stars"]] = relationship(back_populates="gh_repository")
@@ -61,15 +119,20 @@ class RepositoryRelated(Base):
     def __table_args__(cls):
         return (
             ForeignKeyConstraint(
-                ["repository_name", "repository_user"],
-                ["github_repositories.name", "github_repositories.user"],
+                ["repository_id"], ["github_repositories.id"]
             ),
         )
 
-    __repo_primary_key__ = ("repository_name", "repository_user")
+    __repo_primary_key__ = ("repository_id",)
 
-    repository_name: Mapped[str] = Column(String, primary_key=True)
-    repository_user: Mapped[str] = Column(String, primary_key=True)
+    # first column of primary key, so it is used to filter by repository
+    repository_id: Mapped[int] = mapped_column(
+        Integer, primary_key=True, sort_order=-1
+    )
+
+    @declared_attr
+    def gh_repository(cls) -> Mapped[Repository]:
+        return relationship(Repository)
 
 
 class Stars(RepositoryRelated):
@@ -77,8 +140,8 @@ class Stars(RepositoryRelated):
 
     datetime: Mapped[DateTime] = Column(DateTime)
     date: Mapped[Date] = Column(Date)
-    user: Mapped[str] = Column(
-        String, ForeignKey("github_users.username"), primary_key=True
+    user_id: Mapped[int] = Column(
+        Integer, ForeignKey("github_users.id"), primary_key=True
     )
     gh_user: Mapped[GithubUser] = relationship(back_populates="stars")
     gh_repository: Mapped[Repository] = relationship(back_populates="stars")
@@ -98,15 +161,10 @@ issues_to_labels_table = Table(
     Base.metadata,
     Column("label", ForeignKey("github_labels.label"), primary_key=True),
     Column("issue_num", primary_key=True),
-    Column("repository_name", primary_key=True),
-    Column("repository_user", primary_key=True),
+    Column("repository_id", primary_key=True),
     ForeignKeyConstraint(
-        ["issue_num", "repository_name", "repository_user"],
-        [
-            "github_issues.issue",
-            "github_issues.repository_name",
-            "github_issues.repository_user",
-        ],
+        ["issue_num", "repository_id"],
+        ["github_issues.issue", "github_issues.repository_id"],
     ),
 )
 
@@ -123,20 +181,49 @@ class Labels(Base):
     )
 
 
-class PullRequests(RepositoryRelated):
+class PullRequests(CompressedDescription, RepositoryRelated):
     __tablename__ = "github_pull_requests"
 
-    user: Mapped[str] = Column(String, ForeignKey("github_users.username"))
+    user_id: Mapped[int] = Column(Integer, ForeignKey("github_users.id"))
     pull_request: Mapped[int] = Column(Integer, primary_key=True)
     open_time: Mapped[DateTime] = Column(DateTime, nullable=False)
     close_time: Mapped[DateTime] = Column(DateTime)
     merge_time: Mapped[DateTime] = Column(DateTime)
     last_modification_time: Mapped[DateTime] = Column(DateTime, nullable=False)
     title: Mapped[str] = Column(String)
-    description: Mapped[str] = Column(String)
+    # head of the pull request when its commits were saved
+    head_sha: Mapped[str] = Column(String)
+    commit_count: Mapped[int] = Column(Integer)
     labels: Mapped[list["Labels"]] = relationship(
         secondary=pr_to_labels_table, back_populates="pull_requests"
     )
+    body_row: Mapped[Optional["PullRequestBody"]] = relationship(
+        cascade="all, delete-orphan"
+    )
+    gh_user: Mapped[GithubUser] = relationship()
+
+
+class PullRequestBody(Base):
+    """Compressed description of pull request"""
+
+    __tablename__ = "github_pr_bodies"
+    __table_args__ = (
+        PrimaryKeyConstraint("repository_id", "pull_request"),
+        ForeignKeyConstraint(
+            ["repository_id", "pull_request"],
+            [
+                "github_pull_requests.repository_id",
+                "github_pull_requests.pull_request",
+            ],
+        ),
+    )
+
+    repository_id: Mapped[int] = Column(Integer)
+    pull_request: Mapped[int] = Column(Integer)
+    body: Mapped[bytes] = Column(LargeBinary)
+
+
+PullRequests.__body_model__ = PullRequestBody
 
 
 class PullRequestRelated(Base):
@@ -146,17 +233,15 @@ class PullRequestRelated(Base):
     def __table_args__(cls):
         return (
             ForeignKeyConstraint(
-                ["repository_name", "repository_user", "pr_num"],
+                ["repository_id", "pr_num"],
                 [
-                    "github_pull_requests.repository_name",
-                    "github_pull_requests.repository_user",
+                    "github_pull_requests.repository_id",
                     "github_pull_requests.pull_request",
                 ],
             ),
         )
 
-    repository_name: Mapped[str] = Column(String)
-    repository_user: Mapped[str] = Column(String)
+    repository_id: Mapped[int] = Column(Integer)
     pr_num: Mapped[int] = Column(Integer)
 
 
@@ -168,11 +253,11 @@ class PullRequestCommits(PullRequestRelated):
         return (
             PrimaryKeyConstraint("sha"),
             *PullRequestRelated.__table_args__,
-            ForeignKeyConstraint(["user"], ["github_users.username"]),
+            ForeignKeyConstraint(["user_id"], ["github_users.id"]),
         )
 
     sha: Mapped[str] = Column(String)
-    user: Mapped[str] = Column(String)
+    user_id: Mapped[int] = Column(Integer)
     date: Mapped[DateTime] = Column(DateTime, nullable=False)
 
 
@@ -192,11 +277,11 @@ class PullRequestInteraction(PullRequestRelated):
         return (
             PrimaryKeyConstraint("id"),
             *PullRequestRelated.__table_args__,
-            ForeignKeyConstraint(["user"], ["github_users.username"]),
+            ForeignKeyConstraint(["user_id"], ["github_users.id"]),
         )
 
     id: Mapped[int] = Column(Integer, primary_key=True)
-    user: Mapped[str] = Column(String)
+    user_id: Mapped[int] = Column(Integer)
     date: Mapped[DateTime] = Column(DateTime, nullable=False)
 
 
@@ -228,19 +313,42 @@ PullRequests.pr_comments = relationship(
 )
 
 
-class Issues(RepositoryRelated):
+class Issues(CompressedDescription, RepositoryRelated):
     __tablename__ = "github_issues"
 
-    user: Mapped[str] = Column(String, ForeignKey("github_users.username"))
+    user_id: Mapped[int] = Column(Integer, ForeignKey("github_users.id"))
     issue: Mapped[int] = Column(Integer, primary_key=True)
     open_time: Mapped[DateTime] = Column(DateTime, nullable=False)
     close_time: Mapped[DateTime] = Column(DateTime)
     last_modification_time: Mapped[DateTime] = Column(DateTime, nullable=False)
     title: Mapped[str] = Column(String)
-    description: Mapped[str] = Column(String)
     labels: Mapped[list["Labels"]] = relationship(
         secondary=issues_to_labels_table, back_populates="issues"
     )
+    body_row: Mapped[Optional["IssueBody"]] = relationship(
+        cascade="all, delete-orphan"
+    )
+    gh_user: Mapped[GithubUser] = relationship()
+
+
+class IssueBody(Base):
+    """Compressed description of issue"""
+
+    __tablename__ = "github_issue_bodies"
+    __table_args__ = (
+        PrimaryKeyConstraint("repository_id", "issue"),
+        ForeignKeyConstraint(
+            ["repository_id", "issue"],
+            ["github_issues.repository_id", "github_issues.issue"],
+        ),
+    )
+
+    repository_id: Mapped[int] = Column(Integer)
+    issue: Mapped[int] = Column(Integer)
+    body: Mapped[bytes] = Column(LargeBinary)
+
+
+Issues.__body_model__ = IssueBody
 
 
 class IssuesRelated(Base):
@@ -250,17 +358,12 @@ class IssuesRelated(Base):
     def __table_args__(cls):
         return (
             ForeignKeyConstraint(
-                ["repository_name", "repository_user", "issue"],
-                [
-                    "github_issues.repository_name",
-                    "github_issues.repository_user",
-                    "github_issues.issue",
-                ],
+                ["repository_id", "issue"],
+                ["github_issues.repository_id", "github_issues.issue"],
             ),
         )
 
-    repository_name: Mapped[str] = Column(String)
-    repository_user: Mapped[str] = Column(String)
+    repository_id: Mapped[int] = Column(Integer)
     issue: Mapped[int] = Column(Integer)
 
 
@@ -272,10 +375,10 @@ class IssueComment(IssuesRelated):
         return (
             PrimaryKeyConstraint("id"),
             *IssuesRelated.__table_args__,
-            ForeignKeyConstraint(["user"], ["github_users.username"]),
+            ForeignKeyConstraint(["user_id"], ["github_users.id"]),
         )
 
-    user: Mapped[str] = Column(String)
+    user_id: Mapped[int] = Column(Integer)
     date: Mapped[DateTime] = Column(DateTime, nullable=False)
     id: Mapped[int] = Column(Integer, primary_key=True)
 
@@ -292,6 +395,94 @@ Issues.issue_commenters = relationship(
 )
 
 
+PR_COMMENT_ACTIVITY = "pr_comment"
+PR_REVIEW_ACTIVITY = "pr_review"
+PR_COMMIT_ACTIVITY = "pr_commit"
+ISSUE_COMMENT_ACTIVITY = "issue_comment"
+PR_ACTIVITY_KINDS = (
+    PR_COMMENT_ACTIVITY,
+    PR_REVIEW_ACTIVITY,
+    PR_COMMIT_ACTIVITY,
+)
+
+
+class GithubActivity(Base):
+    """
+    Single activity (comment, review or commit) of user in repository.
+
+    It duplicates information stored in the comments, reviews and commits
+    tables to allow answering who was active when and which pull requests
+    or issues were updated with a single indexed range scan.
+    ``number`` is the pull request or issue number and ``source_id``
+    is the id (or sha for commits) of the source row.
+    """
+
+    __tablename__ = "github_activity"
+    __table_args__ = (
+        PrimaryKeyConstraint("kind", "source_id"),
+        ForeignKeyConstraint(["repository_id"], ["github_repositories.id"]),
+        ForeignKeyConstraint(["user_id"], ["github_users.id"]),
+        Index("ix_github_activity_date", "date"),
+        Index("ix_github_activity_user_date", "user_id", "date"),
+    )
+
+    kind: Mapped[str] = Column(String)
+    source_id: Mapped[str] = Column(String)
+    user_id: Mapped[int] = Column(Integer)
+    repository_id: Mapped[int] = Column(Integer)
+    number: Mapped[int] = Column(Integer)
+    date: Mapped[DateTime] = Column(DateTime, nullable=False)
+
+
+PR_DOCUMENT = "pr"
+ISSUE_DOCUMENT = "issue"
+
+
+class SearchDocument(Base):
+    """
+    Pull request or issue stored in the ``github_search`` full text index.
+
+    ``id`` is used as rowid of the document in the index, so the index
+    row can be replaced when title or description changes.
+    """
+
+    __tablename__ = "github_search_documents"
+    __table_args__ = (
+        UniqueConstraint("kind", "repository_id", "number"),
+        ForeignKeyConstraint(["repository_id"], ["github_repositories.id"]),
+    )
+
+    id: Mapped[int] = Column(Integer, primary_key=True)
+    kind: Mapped[str] = Column(String, nullable=False)
+    repository_id: Mapped[int] = Column(Integer, nullable=False)
+    number: Mapped[int] = Column(Integer, nullable=False)
+
+
+GITHUB_SEARCH_INDEX = """
+CREATE VIRTUAL TABLE IF NOT EXISTS github_search
+USING fts5(title, description, tokenize = 'porter unicode61')
+"""
+
+# FTS5 virtual table is not managed by the ORM
+github_search = table(
+    "github_search",
+    column("rowid", Integer),
+    column("title", String),
+    column("description", String),
+)
+
+
+def _has_search_documents(ddl, target, bind, **kw):
+    return inspect(bind).has_table("github_search_documents")
+
+
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL(GITHUB_SEARCH_INDEX).execute_if(callable_=_has_search_documents),
+)
+
+
 class Release(RepositoryRelated):
     __tablename__ = "github_releases"
     # __table_args__ = (
@@ -304,26 +495,37 @@ class Release(RepositoryRelated):
 class ArtifactDownloads(Base):
     __tablename__ = "github_artifact_downloads"
     __table_args__ = (
-        PrimaryKeyConstraint(
-            "repository_name",
-            "repository_user",
-            "release_tag",
-            "artifact_name",
-        ),
+        PrimaryKeyConstraint("repository_id", "release_tag", "artifact_name"),
         ForeignKeyConstraint(
-            ["repository_name", "repository_user", "release_tag"],
-            [
-                "github_releases.repository_name",
-                "github_releases.repository_user",
-                "github_releases.release_tag",
-            ],
+            ["repository_id", "release_tag"],
+            ["github_releases.repository_id", "github_releases.release_tag"],
         ),
     )
 
-    repository_name: Mapped[str] = Column(String)
-    repository_user: Mapped[str] = Column(String)
+    repository_id: Mapped[int] = Column(Integer)
     release_tag: Mapped[str] = Column(String)
 
     download_count: Mapped[int] = Column(Integer)
     artifact_name: Mapped[str] = Column(String)
     platform: Mapped[str] = Column(String)
+
+
+PR_SYNC = "pull_requests"
+ISSUE_SYNC = "issues"
+COMMENT_SYNC = "comments"
+
+
+class SyncState(RepositoryRelated):
+    """
+    Progress of incremental synchronization of repository with GitHub.
+
+    ``high_water_mark`` is the newest ``updated_at`` of items saved by
+    the last finished sync of ``kind``, older items are not requested
+    again. ``synced_at`` is the time at which that sync started.
+    """
+
+    __tablename__ = "github_sync_state"
+
+    kind: Mapped[str] = Column(String, primary_key=True)
+    high_water_mark: Mapped[DateTime] = Column(DateTime)
+    synced_at: Mapped[DateTime] = Column(DateTime)
@@ -21,6 +21,7 @@ from sqlalchemy import (
     Column,
     ForeignKey,
     ForeignKeyConstraint,
+    Index,
     Integer,
     PrimaryKeyConstraint,
 )
@@ -48,6 +49,31 @@ class PyPi(Base):
     ci_install: Mapped[bool] = mapped_column(Boolean)
 
 
+class PyPiRollup(Base):
+    """Daily download counts aggregated from old ``PyPi`` rows.
+
+    Raw rows older than the retention period are collapsed into this
+    table by ``db_update.pypi.compact_old_downloads``, so only
+    columns used by reports are kept.
+    """
+
+    __tablename__ = "pypi_downloads_rollup"
+    __table_args__ = (
+        Index("ix_pypi_downloads_rollup_project_date", "project", "date"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    project: Mapped[str] = mapped_column(String)
+    date: Mapped[date] = mapped_column(Date)
+    country_code: Mapped[Optional[str]] = mapped_column(String)
+    version: Mapped[Optional[str]] = mapped_column(String)
+    python_version: Mapped[Optional[str]] = mapped_column(String)
+    system_name: Mapped[Optional[str]] = mapped_column(String)
+    distro_name: Mapped[Optional[str]] = mapped_column(String)
+    ci_install: Mapped[Optional[bool]] = mapped_column(Boolean)
+    count: Mapped[int] = mapped_column(Integer)
+
+
 class PePyDownloadStat(Base):
     __tablename__ = "pepy_download_stats"
     __table_args__ = (PrimaryKeyConstraint("name", "version", "date"),)
@@ -58,6 +84,21 @@ class PePyDownloadStat(Base):
     date: Mapped[Date] = Column(Date)
 
 
+class PePyDailyTotal(Base):
+    """Downloads of a package per day summed over all versions.
+
+    Maintained together with ``PePyDownloadStat`` to avoid
+    aggregating per version rows on each report generation.
+    """
+
+    __tablename__ = "pepy_daily_totals"
+    __table_args__ = (PrimaryKeyConstraint("name", "date"),)
+
+    name: Mapped[str] = Column(String)
+    date: Mapped[Date] = Column(Date)
+    downloads: Mapped[int] = Column(Integer)
+
+
 class PePyTotalDownloads(Base):
     __tablename__ = "pepy_total_downloads"
 
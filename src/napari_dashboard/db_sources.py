@@ -0,0 +1,153 @@
+"""
+Split of the dashboard database into per-source files.
+
+Data from each source is stored in a separate SQLite file next to the main
+database, for example ``dashboard_github.db`` for ``dashboard.db``.
+Sources can be updated in parallel, as each file has its own write lock,
+and only changed files need to be transferred.
+
+Updaters use an engine bound to a single source file. Reporting uses
+an engine for the main file with all source files attached under
+the source name, so unqualified table names resolve as in a single file.
+"""
+
+from __future__ import annotations
+
+import logging
+import typing
+from pathlib import Path
+
+from sqlalchemy import create_engine, event
+
+# import all schema modules to register tables in metadata
+from napari_dashboard.db_schema import (  # noqa: F401
+    conda,
+    github,
+    helper_models,
+    imagesc,
+    pypi,
+)
+from napari_dashboard.db_schema.base import Base
+
+if typing.TYPE_CHECKING:
+    from sqlalchemy import Engine, Table
+
+logger = logging.getLogger(__name__)
+
+MAIN = "main"
+GITHUB = "github"
+PYPI = "pypi"
+PYPI_STATS = "pypi_stats"
+CONDA = "conda"
+FORUM = "forum"
+
+SOURCES = (GITHUB, PYPI, PYPI_STATS, CONDA, FORUM)
+
+# raw download data from Big Query, the biggest part of the database
+PYPI_RAW_TABLES = {"pypi_downloads", "pypi_downloads_rollup"}
+
+# checked in order, first matching prefix wins
+TABLE_PREFIXES = (
+    ("github_", GITHUB),
+    ("pepy_", PYPI_STATS),
+    ("pypi_", PYPI_STATS),
+    ("conda_", CONDA),
+    ("forum_", FORUM),
+)
+
+
+def table_source(table_name: str) -> str:
+    """Get name of source database in which table is stored"""
+    if table_name in PYPI_RAW_TABLES:
+        return PYPI
+    for prefix, source in TABLE_PREFIXES:
+        if table_name.startswith(prefix):
+            return source
+    return MAIN
+
+
+def source_path(db_path: str | Path, source: str) -> Path:
+    """Get path to the file of source database"""
+    db_path = Path(db_path)
+    if source == MAIN:
+        return db_path
+    return db_path.with_name(f"{db_path.stem}_{source}{db_path.suffix}")
+
+
+def cache_path(db_path: str | Path, source: str) -> Path:
+    """Get path to the HTTP cache of requests made to update the source"""
+    db_path = Path(db_path)
+    return db_path.with_name(f"{db_path.stem}_{source}_cache.sqlite")
+
+
+def database_paths(db_path: str | Path) -> list[Path]:
+    """Get paths to main and all source databases"""
+    return [source_path(db_path, source) for source in (MAIN, *SOURCES)]
+
+
+def source_tables(source: str) -> list[Table]:
+    """Get tables from the schema that are stored in a given source"""
+    return [
+        table
+        for name, table in Base.metadata.tables.items()
+        if table_source(name) == source
+    ]
+
+
+def attach_sources(dbapi_connection, db_path: str | Path, only_existing=False):
+    """
+    Attach source databases to the connection to the main database.
+
+    Parameters
+    ----------
+    dbapi_connection : sqlite3.Connection
+        raw connection to the main database
+    db_path : str | Path
+        path to the main database
+    only_existing : bool
+        if True, source databases without a file are not attached,
+        so tables from the main database of an old, not split,
+        file are used.
+    """
+    for source in SOURCES:
+        path = source_path(db_path, source)
+        if only_existing and not path.exists():
+            continue
+        dbapi_connection.execute(
+            f"ATTACH DATABASE ? AS {source}", (str(path.absolute()),)
+        )
+
+
+def create_source_engine(db_path: str | Path, source: str, **kwargs) -> Engine:
+    """Create engine for a single source database"""
+    path = source_path(db_path, source)
+    return create_engine(f"sqlite:///{path.absolute()}", **kwargs)
+
+
+def create_source_tables(engine: Engine, source: str) -> None:
+    """Create tables of the source in the database of engine"""
+    Base.metadata.create_all(engine, tables=source_tables(source))
+
+
+def create_databases(db_path: str | Path) -> None:
+    """Create all source databases with their tables"""
+    for source in (MAIN, *SOURCES):
+        engine = create_source_engine(db_path, source)
+        create_source_tables(engine, source)
+        engine.dispose()
+
+
+def create_reporting_engine(db_path: str | Path, **kwargs) -> Engine:
+    """
+    Create engine for the main database with source databases attached.
+
+    Existing source files are attached on each new connection,
+    so tables from all sources are available for reporting queries.
+    """
+    engine = create_engine(f"sqlite:///{Path(db_path).absolute()}", **kwargs)
+
+    @event.listens_for(engine, "connect")
+    def _attach(dbapi_connection, connection_record):
+        attach_sources(dbapi_connection, db_path, only_existing=True)
+
+    return engine
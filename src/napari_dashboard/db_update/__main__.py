@@ -4,30 +4,43 @@ import argparse
 import datetime
 import logging
 import typing
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-from sqlalchemy import create_engine
 from sqlalchemy.orm import Session
 
-from napari_dashboard.db_schema.base import Base
 from napari_dashboard.db_schema.helper_models import UpdateDBInfo
+from napari_dashboard.db_sources import (
+    CONDA,
+    FORUM,
+    GITHUB,
+    MAIN,
+    PYPI_STATS,
+    cache_path,
+    create_source_engine,
+    create_source_tables,
+)
 from napari_dashboard.db_update.conda import save_conda_download_information
 from napari_dashboard.db_update.github import (
+    save_comments,
     save_issues,
-    save_pull_requests,
     save_stars,
     update_artifact_download,
 )
+from napari_dashboard.db_update.github_graphql import (
+    save_pull_requests_graphql,
+)
+from napari_dashboard.db_update.github_rate_limit import GOVERNOR
 from napari_dashboard.db_update.imagesc import save_forum_info
 from napari_dashboard.db_update.pypi import (
     save_package_release,
     save_pepy_download_stat,
     save_pypi_download_information,
 )
-from napari_dashboard.db_update.util import setup_cache
+from napari_dashboard.db_update.util import get_writer, setup_cache
 
 if typing.TYPE_CHECKING:
-    from collections.abc import Sequence
+    from collections.abc import Callable, Sequence
 
 
 def check_if_recently_updated(session: Session) -> bool:
@@ -42,45 +55,107 @@ def check_if_recently_updated(session: Session) -> bool:
     return last_update.datetime.date() == datetime.date.today()
 
 
-def update_github(session: Session):
+def update_github(session: Session, full_sync: bool = False):
     save_stars("napari", "napari", session)
     save_stars("napari", "docs", session)
     save_stars("napari", "npe2", session)
 
-    save_pull_requests("napari", "napari", session)
-    save_pull_requests("napari", "docs", session)
-    save_pull_requests("napari", "npe2", session)
+    save_pull_requests_graphql("napari", "napari", session, full_sync)
+    save_pull_requests_graphql("napari", "docs", session, full_sync)
+    save_pull_requests_graphql("napari", "npe2", session, full_sync)
+
+    save_issues("napari", "napari", session, full_sync)
+    save_issues("napari", "docs", session, full_sync)
+    save_issues("napari", "npe2", session, full_sync)
 
-    save_issues("napari", "napari", session)
-    save_issues("napari", "docs", session)
-    save_issues("napari", "npe2", session)
+    save_comments("napari", "napari", session, full_sync)
+    save_comments("napari", "docs", session, full_sync)
+    save_comments("napari", "npe2", session, full_sync)
 
     update_artifact_download("napari", "napari", session)
+    GOVERNOR.log_stats()
+
+
+def update_pypi_stats(session: Session):
+    save_pepy_download_stat(session)
+    save_pypi_download_information(session)
+    save_package_release(session)
+
+
+# updaters of source databases, each one writes only to its own source
+SOURCE_UPDATERS: dict[str, Callable[..., None]] = {
+    GITHUB: update_github,
+    FORUM: save_forum_info,
+    CONDA: save_conda_download_information,
+    PYPI_STATS: update_pypi_stats,
+}
+
+
+def update_source(db_path: Path, source: str, **kwargs) -> None:
+    """
+    Update a single source database using its own connection
+
+    ``kwargs`` are passed to the updater of the source.
+    """
+    logging.basicConfig(level=logging.INFO)
+    setup_cache(cache_name=str(cache_path(db_path, source)))
+    engine = create_source_engine(db_path, source)
+    create_source_tables(engine, source)
+    with Session(engine) as session:
+        SOURCE_UPDATERS[source](session, **kwargs)
+    engine.dispose()
 
 
 def main(args: Sequence[str] | None = None) -> bool:
     parser = argparse.ArgumentParser()
     parser.add_argument("db_path", help="Path to the database", type=Path)
+    parser.add_argument(
+        "--parallel",
+        action="store_true",
+        help="Update source databases in parallel processes",
+    )
+    parser.add_argument(
+        "--full-github-sync",
+        action="store_true",
+        help="Fetch all GitHub pull requests, issues and comments",
+    )
     args = parser.parse_args(args)
+    source_kwargs = {GITHUB: {"full_sync": args.full_github_sync}}
 
-    setup_cache()
     logging.basicConfig(level=logging.INFO)
 
-    engine = create_engine(f"sqlite:///{args.db_path.absolute()}")
-    Base.metadata.create_all(engine)
+    engine = create_source_engine(args.db_path, MAIN)
+    create_source_tables(engine, MAIN)
 
     with Session(engine) as session:
         if check_if_recently_updated(session):
             logging.info("Database was recently updated, skipping update")
             return False
-        update_github(session)
-        save_forum_info(session)
-        save_conda_download_information(session)
-        save_pepy_download_stat(session)
-        save_pypi_download_information(session)
-        save_package_release(session)
-        session.add(UpdateDBInfo(datetime=datetime.datetime.now()))
-        session.commit()
+
+    if args.parallel:
+        with ProcessPoolExecutor(max_workers=len(SOURCE_UPDATERS)) as pool:
+            futures = [
+                pool.submit(
+                    update_source,
+                    args.db_path,
+                    source,
+                    **source_kwargs.get(source, {}),
+                )
+                for source in SOURCE_UPDATERS
+            ]
+            # raise the first error after all sources are finished
+            for future in futures:
+                future.result()
+    else:
+        for source in SOURCE_UPDATERS:
+            update_source(
+                args.db_path, source, **source_kwargs.get(source, {})
+            )
+
+    with Session(engine) as session:
+        writer = get_writer(session)
+        writer.add(UpdateDBInfo(datetime=datetime.datetime.now()))
+        writer.checkpoint()
     return True
 
 
@@ -2,25 +2,59 @@ import datetime
 
 import requests
 import tqdm
+from sqlalchemy import and_, func
 from sqlalchemy.orm import Session
 
-from napari_dashboard.db_schema.conda import CondaDownload
+from napari_dashboard.db_schema.conda import CondaDownload, CondaSnapshot
+from napari_dashboard.db_update.util import get_writer
 from napari_dashboard.utils import requests_get
 
 
+def _get_last_file_state(
+    session: Session, conda_name: str
+) -> dict[str, CondaDownload]:
+    """Get the most recent stored row for each file of a conda package"""
+    last_dates = (
+        session.query(
+            CondaDownload.full_binary_name,
+            func.max(CondaDownload.date).label("date"),
+        )
+        .filter(CondaDownload.name == conda_name)
+        .group_by(CondaDownload.full_binary_name)
+        .subquery()
+    )
+    return {
+        row.full_binary_name: row
+        for row in session.query(CondaDownload)
+        .join(
+            last_dates,
+            and_(
+                CondaDownload.full_binary_name
+                == last_dates.c.full_binary_name,
+                CondaDownload.date == last_dates.c.date,
+            ),
+        )
+        .filter(CondaDownload.name == conda_name)
+    }
+
+
 def _save_conda_download_information_for_package(
-    session: Session, pypi_name: str, conda_name: str, today: datetime.date
+    session: Session,
+    pypi_name: str,
+    conda_name: str,
+    today: datetime.date,
+    delta: bool = True,
 ):
+    """
+    Save the current download counts of a conda package files.
+
+    If ``delta`` is True, a row is stored only for files which download
+    count or latest version status changed since the previous snapshot.
+    Otherwise, a row for each file is stored.
+    """
     if conda_name is None:
         return
-    if (
-        session.query(CondaDownload)
-        .filter(
-            CondaDownload.pypi_name == pypi_name, CondaDownload.date == today
-        )
-        .count()
-        > 0
-    ):
+    if session.get(CondaSnapshot, (pypi_name, today)) is not None:
         return
     conda_info_res = requests.get(
         f"https://api.anaconda.org/package/{conda_name}"
@@ -30,8 +64,19 @@ def _save_conda_download_information_for_package(
             f"Error fetching conda info for {conda_name} with status {conda_info_res.status_code} and body {conda_info_res.text}"
         )
     conda_info = conda_info_res.json()
+    writer = get_writer(session)
+    last_state = _get_last_file_state(session, conda_name)
     for file in conda_info["files"]:
-        session.add(
+        latest_version = file["version"] == conda_info["latest_version"]
+        previous = last_state.pop(file["full_name"], None)
+        if (
+            delta
+            and previous is not None
+            and previous.download_count == file["ndownloads"]
+            and previous.latest_version == latest_version
+        ):
+            continue
+        writer.add(
             CondaDownload(
                 pypi_name=pypi_name,
                 name=conda_name,
@@ -39,33 +84,53 @@ def _save_conda_download_information_for_package(
                 download_count=file["ndownloads"],
                 date=today,
                 full_binary_name=file["full_name"],
-                latest_version=file["version"] == conda_info["latest_version"],
+                latest_version=latest_version,
             )
         )
+    for previous in last_state.values():
+        if previous.download_count is None:
+            continue
+        # file is no longer listed, so it should not be part of snapshot
+        writer.add(
+            CondaDownload(
+                pypi_name=pypi_name,
+                name=conda_name,
+                version=previous.version,
+                download_count=None,
+                date=today,
+                full_binary_name=previous.full_binary_name,
+                latest_version=False,
+            )
+        )
+    writer.add(CondaSnapshot(pypi_name=pypi_name, date=today))
+    writer.done()
 
 
-def save_conda_download_information(session: Session, limit: int = 10):
+def save_conda_download_information(
+    session: Session, limit: int = 10, delta: bool = True
+):
     response = requests_get("https://api.napari.org/api/conda")
     conda_translation = response.json()
     today = datetime.date.today()
 
     _save_conda_download_information_for_package(
-        session, "napari", "conda-forge/napari", today
+        session, "napari", "conda-forge/napari", today, delta
     )
     _save_conda_download_information_for_package(
         session,
         "napari-plugin-manager",
         "conda-forge/napari-plugin-manager",
         today,
+        delta,
     )
     _save_conda_download_information_for_package(
-        session, "npe2", "conda-forge/npe2", today
+        session, "npe2", "conda-forge/npe2", today, delta
     )
 
     for pypi_name, conda_name in tqdm.tqdm(
         conda_translation.items(), desc="Fetching conda info"
     ):
         _save_conda_download_information_for_package(
-            session, pypi_name, conda_name, today
+            session, pypi_name, conda_name, today, delta
         )
-    session.commit()
+    get_writer(session).checkpoint()
@@ -1,22 +1,30 @@
+from __future__ import annotations
+
 import datetime
 import logging
-import math
 import os
-import time
+from functools import cached_property
+from typing import TYPE_CHECKING
 
-import requests
 from github import (
     Auth,
     Github,
+    Issue as GHIssue,
     PullRequest as GHPullRequest,
     Repository as GHRepository,
 )
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, insert, select
 from tqdm import tqdm
 
 from napari_dashboard.db_schema.github import (
     BOT_SET,
+    COMMENT_SYNC,
+    ISSUE_COMMENT_ACTIVITY,
+    ISSUE_DOCUMENT,
+    ISSUE_SYNC,
+    PR_COMMENT_ACTIVITY,
     ArtifactDownloads,
+    GithubActivity,
     GithubUser,
     IssueComment,
     Issues,
@@ -27,15 +35,38 @@ from napari_dashboard.db_schema.github import (
     PullRequests,
     Release,
     Repository,
+    SearchDocument,
     Stars,
+    SyncState,
+    github_search,
+)
+from napari_dashboard.db_update.github_rate_limit import (
+    GOVERNOR,
+    get_session,
+    install_governor,
+)
+from napari_dashboard.db_update.util import (
+    bulk_upsert,
+    get_or_create,
+    get_writer,
 )
-from napari_dashboard.db_update.util import get_or_create
 from napari_dashboard.gen_stat.github import get_repo_model
 
+if TYPE_CHECKING:
+    from github.PaginatedList import PaginatedList
+    from github.Stargazer import Stargazer
+    from sqlalchemy.orm import Session
+
 GH_TOKEN_ = os.environ.get("GH_TOKEN_")
 logger = logging.getLogger(__name__)
 
 _G = None
+_REPOS: dict[str, GHRepository] = {}
+
+# number of items on a page of lists fetched with PyGithub
+PER_PAGE = 100
+
+IDENTITY_MAP_KEY = "github_identity_map"
 
 PR_COMMITS_HEADER = {
     "Accept": "application/vnd.github+json",
@@ -44,40 +75,47 @@ PR_COMMITS_HEADER = {
 }
 
 
-def get_commits(pr: GHPullRequest):
+def get_commits(pr: GHPullRequest) -> list[dict]:
+    """
+    Fetch commits of pull request
+
+    Pages are followed by their ``Link`` headers, so the number of commits,
+    which is missing from pull requests listed by PyGithub, is not needed.
+    """
+    http = get_session()
     commits_json = []
-    i = 1
-    while i < int(math.ceil(pr.commits / 100)) + 1:
-        resp = requests.get(
-            f"{pr.commits_url}?page={i}&per_page=100",
-            headers=PR_COMMITS_HEADER,
-        )
-        if resp.status_code == 200:
-            commits_json.extend(resp.json())
-            i += 1
-        if resp.status_code in {403, 429}:
-            sleep_time = (
-                int(resp.headers.get("x-ratelimit-reset")) - time.time()
-            )
-            if sleep_time > 0:
-                logger.warning(
-                    "Rate limit exceeded. Sleeping for %s seconds", sleep_time
-                )
-                time.sleep(sleep_time)
+    url = f"{pr.commits_url}?per_page={PER_PAGE}"
+    while url is not None:
+        resp = http.get(url, headers=PR_COMMITS_HEADER)
+        resp.raise_for_status()
+        commits_json.extend(resp.json())
+        url = resp.links.get("next", {}).get("url")
     return commits_json
 
 
+def _create_github(token: str) -> Github:
+    install_governor()
+    # pacing of requests is left to the rate limit governor
+    return Github(
+        auth=Auth.Token(token),
+        per_page=PER_PAGE,
+        seconds_between_requests=None,
+    )
+
+
 def get_github(token: str = GH_TOKEN_):
     global _G
     if _G is None:
-        auth = Auth.Token(token)
-        _G = Github(auth=auth, per_page=100)
+        _G = _create_github(token)
     return _G
 
 
 def get_repo(user: str, repo: str) -> GHRepository:
-    g = get_github()
-    return g.get_repo(f"{user}/{repo}")
+    """Get repository from GitHub, it is requested once per run"""
+    full_name = f"{user}/{repo}"
+    if full_name not in _REPOS:
+        _REPOS[full_name] = get_github().get_repo(full_name)
+    return _REPOS[full_name]
 
 
 def get_repo_with_model(
@@ -89,8 +127,7 @@ def get_repo_with_model(
         .count()
         == 0
     ):
-        session.add(Repository(user=user, name=repo))
-        session.commit()
+        get_writer(session).add(Repository(user=user, name=repo))
     repo_ = get_repo(user, repo)
     return repo_, get_repo_model(user, repo, session)
 
@@ -107,9 +144,39 @@ def stars_per_date(user: str, repo: str):
     return date_to_stars
 
 
+def _stargazers_tail(
+    stargazers: PaginatedList[Stargazer], saved: set[str]
+) -> list[Stargazer] | None:
+    """
+    Get stargazers listed after the saved ones
+
+    Stargazers are listed from the oldest, so only pages from the one
+    with the last saved stargazer are fetched. Saved stargazers on
+    that page have to line up with the listing, otherwise someone
+    before them removed their star and None is returned.
+    """
+    page = max(len(saved) - 1, 0) // PER_PAGE
+    overlap = len(saved) - page * PER_PAGE
+    items = stargazers.get_page(page)
+    if len(items) < overlap or any(
+        star.user.login not in saved for star in items[:overlap]
+    ):
+        return None
+    tail = items[overlap:]
+    while len(items) == PER_PAGE:
+        page += 1
+        items = stargazers.get_page(page)
+        tail.extend(items)
+    return tail
+
+
 def save_stars(user: str, repo: str, session: Session) -> None:
     """
     Save stars information for a repository to the database
+
+    Only stargazers after the saved ones are fetched. Stars of
+    the repository are saved again from scratch if some were removed.
+
     Parameters
     ----------
     user : str
@@ -121,14 +188,14 @@ def save_stars(user: str, repo: str, session: Session) -> None:
     """
     gh_repo, repo_model = get_repo_with_model(user, repo, session)
 
-    count = (
-        session.query(Stars)
-        .filter(
-            Stars.repository_name == repo_model.name,
-            Stars.repository_user == repo_model.user,
+    saved = set(
+        session.scalars(
+            select(GithubUser.username)
+            .join(Stars, Stars.user_id == GithubUser.id)
+            .where(Stars.repository_id == repo_model.id)
         )
-        .count()
     )
+    count = len(saved)
     if count == gh_repo.stargazers_count:
         logger.info(
             "Already saved %s stars for %s",
@@ -136,57 +203,229 @@ def save_stars(user: str, repo: str, session: Session) -> None:
             gh_repo.full_name,
         )
         return
-    if count > gh_repo.stargazers_count:
-        session.query(Stars).filter(
-            Stars.repository_name == repo_model.name,
-            Stars.repository_user == repo_model.user,
-        ).delete()
-        session.commit()
+
+    stargazers = gh_repo.get_stargazers_with_dates()
+    tail = None
+    if count < gh_repo.stargazers_count:
+        tail = _stargazers_tail(stargazers, saved)
+    writer = get_writer(session)
+    if tail is None:
+        writer.execute(
+            delete(Stars).where(Stars.repository_id == repo_model.id)
+        )
         logger.info(
-            "Reset starts because have more saved stars %s than exists %s",
+            "Reset stars because saved %s stars do not match %s existing",
             count,
             gh_repo.stargazers_count,
         )
-
-    stargazers = gh_repo.get_stargazers_with_dates()
-
-    for star in tqdm(
-        stargazers, total=gh_repo.stargazers_count, desc=f"Stars {user}/{repo}"
-    ):
-        ensure_user(star.user.login, session)
-        session.merge(
-            Stars(
-                user=star.user.login,
-                date=star.starred_at,
-                datetime=star.starred_at,
-                repository_user=repo_model.user,
-                repository_name=repo_model.name,
+        saved = set()
+        count = 0
+        tail = stargazers
+
+    identity_map = get_identity_map(session)
+    bulk_upsert(
+        session,
+        Stars,
+        (
+            {
+                "user_id": identity_map.user_id(star.user.login),
+                "date": star.starred_at,
+                "datetime": star.starred_at,
+                "repository_id": repo_model.id,
+            }
+            for star in tqdm(
+                tail,
+                total=gh_repo.stargazers_count - count,
+                desc=f"Stars {user}/{repo}",
             )
-        )
-    session.commit()
-    count_2 = (
-        session.query(Stars)
-        .filter(
-            Stars.repository_name == repo_model.name,
-            Stars.repository_user == repo_model.user,
-        )
-        .count()
+            if identity_map.is_new(saved, star.user.login)
+        ),
     )
+    writer.checkpoint()
     logger.info(
         "Saved %s stars for %s/%s",
-        count_2 - count,
+        len(saved) - count,
         repo_model.user,
         repo_model.name,
     )
 
 
-def ensure_user(user: str, session: Session) -> None:
-    if (
-        session.query(GithubUser).filter(GithubUser.username == user).count()
-        == 0
-    ):
-        session.add(GithubUser(username=user))
-        session.commit()
+class IdentityMap:
+    """
+    Users, labels and ids of interactions already in the database.
+
+    They are loaded once per session, when first needed, so GitHub savers
+    resolve them in memory instead of querying the database for every
+    item. New rows are added to the session and inserted together
+    at flush, only new users are flushed at once to get their ids.
+    Use :py:func:`get_identity_map` to get the map of a session.
+    It is not updated on rollback, so the session should not be reused
+    after a failed sync.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    @cached_property
+    def users(self) -> dict[str, int]:
+        return dict(
+            self.session.execute(
+                select(GithubUser.username, GithubUser.id)
+            ).all()
+        )
+
+    @cached_property
+    def labels(self) -> dict[str, Labels]:
+        return {x.label: x for x in self.session.scalars(select(Labels))}
+
+    @cached_property
+    def commit_shas(self) -> set[str]:
+        return set(self.session.scalars(select(PullRequestCommits.sha)))
+
+    @cached_property
+    def review_ids(self) -> set[int]:
+        return set(self.session.scalars(select(PullRequestReviews.id)))
+
+    @cached_property
+    def pr_comment_ids(self) -> set[int]:
+        return set(self.session.scalars(select(PullRequestComments.id)))
+
+    @cached_property
+    def issue_comment_ids(self) -> set[int]:
+        return set(self.session.scalars(select(IssueComment.id)))
+
+    def user_id(self, username: str) -> int:
+        """Get id of user, add the user if needed"""
+        user_id = self.users.get(username)
+        if user_id is None:
+            gh_user = GithubUser(username=username)
+            get_writer(self.session).add(gh_user)
+            self.session.flush()
+            user_id = self.users[username] = gh_user.id
+        return user_id
+
+    def label(self, name: str) -> Labels:
+        """Get label, add it if needed"""
+        label = self.labels.get(name)
+        if label is None:
+            label = self.labels[name] = Labels(label=name)
+            get_writer(self.session).add(label)
+        return label
+
+    @staticmethod
+    def is_new(known: set, key) -> bool:
+        """Check if ``key`` is not in ``known`` and mark it as known"""
+        if key in known:
+            return False
+        known.add(key)
+        return True
+
+
+def get_identity_map(session: Session) -> IdentityMap:
+    """Get identity map of GitHub rows stored in ``session.info``"""
+    if IDENTITY_MAP_KEY not in session.info:
+        session.info[IDENTITY_MAP_KEY] = IdentityMap(session)
+    return session.info[IDENTITY_MAP_KEY]
+
+
+def ensure_user(user: str, session: Session) -> int:
+    """Get id of GitHub user with a given login, add the user if needed"""
+    return get_identity_map(session).user_id(user)
+
+
+def save_activity(
+    session: Session,
+    kind: str,
+    source_id: str | int,
+    user_id: int,
+    repo_model: Repository,
+    number: int,
+    date: datetime.datetime,
+) -> None:
+    """
+    Save information about user activity in the repository
+
+    The activity should be new, callers check if its source
+    (comment, review or commit) is already saved.
+
+    Parameters
+    ----------
+    session : sqlalchemy.orm.Session
+        database session
+    kind : str
+        kind of activity, one of the ``*_ACTIVITY`` constants
+        from ``napari_dashboard.db_schema.github``
+    source_id : str | int
+        id of comment or review, or sha of commit
+    user_id : int
+        id of the user that performed the activity
+    repo_model : Repository
+        repository in which the activity was performed
+    number : int
+        number of pull request or issue
+    date : datetime.datetime
+        time of the activity
+    """
+    get_writer(session).add(
+        GithubActivity(
+            kind=kind,
+            source_id=str(source_id),
+            user_id=user_id,
+            repository_id=repo_model.id,
+            number=number,
+            date=date,
+        )
+    )
+
+
+def update_search_index(
+    session: Session,
+    kind: str,
+    repo_model: Repository,
+    number: int,
+    title: str | None,
+    description: str | None,
+) -> None:
+    """
+    Replace title and description of pull request or issue
+    in the full text search index
+
+    Parameters
+    ----------
+    session : sqlalchemy.orm.Session
+        database session
+    kind : str
+        ``PR_DOCUMENT`` or ``ISSUE_DOCUMENT``
+    repo_model : Repository
+        repository of the pull request or issue
+    number : int
+        number of pull request or issue
+    title : str | None
+        current title
+    description : str | None
+        current description
+    """
+    writer = get_writer(session)
+    document = session.scalars(
+        select(SearchDocument).filter_by(
+            kind=kind, repository_id=repo_model.id, number=number
+        )
+    ).first()
+    if document is None:
+        document = SearchDocument(
+            kind=kind, repository_id=repo_model.id, number=number
+        )
+        writer.add(document)
+        session.flush()
+    else:
+        writer.execute(
+            delete(github_search).where(github_search.c.rowid == document.id)
+        )
+    writer.execute(
+        insert(github_search).values(
+            rowid=document.id, title=title, description=description
+        )
+    )
 
 
 def get_pull_request_coauthors(pr: GHPullRequest, session: Session):
@@ -210,154 +449,54 @@ def get_pull_request_coauthors(pr: GHPullRequest, session: Session):
     ]
 
 
-def _get_pr_attributes(pr: GHPullRequest, session: Session):
-    return {
-        "merge_time": pr.merged_at,
-        "close_time": pr.closed_at,
-        "last_modification_time": pr.updated_at,
-        "title": pr.title,
-        "description": pr.body,
-        "labels": [
-            get_or_create(session, Labels, label=label.name)
-            for label in pr.get_labels()
-        ],
-        # "coauthors": get_pull_request_coauthors(pr, session),
-    }
-
-
-def save_pull_requests(user: str, repo: str, session: Session) -> None:
-    """
-    Save pull requests information for a repository to the database
-    Parameters
-    ----------
-    user : str
-        user or organization name on GitHub
-    repo : str
-        repository name on GitHub
-    session : sqlalchemy.orm.Session
-        database session
-    """
-    gh_repo, repo_model = get_repo_with_model(user, repo, session)
-
-    count = (
-        session.query(PullRequests)
-        .filter(
-            PullRequests.repository_user == repo_model.user,
-            PullRequests.repository_name == repo_model.name,
-        )
-        .count()
+def log_requests_per_pull_request(
+    full_name: str, start_calls: int, changed: int
+) -> None:
+    """Log number of GitHub requests sent since ``start_calls`` per changed PR"""
+    calls = GOVERNOR.calls - start_calls
+    logger.info(
+        "Sent %s requests for %s changed pull requests of %s (%.1f per PR)",
+        calls,
+        changed,
+        full_name,
+        calls / max(changed, 1),
     )
 
-    pr_iter = gh_repo.get_pulls(state="all")
-    for pr in tqdm(
-        pr_iter, total=pr_iter.totalCount, desc=f"Pull Requests {user}/{repo}"
-    ):
-        ensure_user(pr.user.login, session)
-        # check if pull request is already saved and check if there is a need to update
-        # merge status and labels
-        pull = (
-            session.query(PullRequests)
-            .filter(
-                PullRequests.repository_user == repo_model.user,
-                PullRequests.repository_name == repo_model.name,
-                PullRequests.pull_request == pr.number,
-            )
-            .first()
-        )
-        if pull is None:
-            pull = PullRequests(
-                user=pr.user.login,
-                repository_user=repo_model.user,
-                repository_name=repo_model.name,
-                open_time=pr.created_at,
-                last_modification_time=pr.updated_at.replace(tzinfo=None),
-                pull_request=pr.number,
-            )
-            session.add(pull)
-
-        elif pull.last_modification_time == pr.updated_at.replace(tzinfo=None):
-            continue
-
-        for key, value in _get_pr_attributes(pr, session).items():
-            setattr(pull, key, value)
 
-        commits_json = get_commits(pr)
-
-        for commit in commits_json:
-            # if session.query(PullRequestCommits).get(commit.sha):
-            #     continue
-            user_login = (
-                commit["author"]["login"]
-                if commit["author"]
-                else pr.user.login
-            )
-            date = datetime.datetime.fromisoformat(
-                commit["commit"]["author"]["date"]
-            ).replace(tzinfo=None)
-            ensure_user(user_login, session)
-            session.merge(
-                PullRequestCommits(
-                    sha=commit["sha"],
-                    user=user_login,
-                    date=date,
-                    pr_num=pr.number,
-                    repository_name=repo_model.name,
-                    repository_user=repo_model.user,
-                )
-            )
+def get_sync_state(
+    session: Session, repo_model: Repository, kind: str
+) -> SyncState:
+    """Get synchronization state of repository, create it if missing"""
+    sync_state = session.get(
+        SyncState, {"repository_id": repo_model.id, "kind": kind}
+    )
+    if sync_state is None:
+        sync_state = SyncState(repository_id=repo_model.id, kind=kind)
+        get_writer(session).add(sync_state)
+    return sync_state
 
-        for review in pr.get_reviews():
-            if review.state == "PENDING":
-                continue
-            if session.query(PullRequestReviews).get(review.id):
-                continue
-            ensure_user(review.user.login, session)
-            session.add(
-                PullRequestReviews(
-                    id=review.id,
-                    user=review.user.login,
-                    date=review.submitted_at,
-                    state=review.state,
-                    pr_num=pr.number,
-                    repository_name=repo_model.name,
-                    repository_user=repo_model.user,
-                )
-            )
 
-        for comment in pr.get_comments():
-            if session.query(PullRequestComments).get(comment.id):
-                continue
-            ensure_user(comment.user.login, session)
-            session.merge(
-                PullRequestComments(
-                    id=comment.id,
-                    user=comment.user.login,
-                    date=comment.created_at,
-                    pr_num=pr.number,
-                    repository_name=repo_model.name,
-                    repository_user=repo_model.user,
-                )
-            )
+def utc_now() -> datetime.datetime:
+    """Current time as naive UTC, the way GitHub times are stored"""
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
 
-    session.commit()
-    count_2 = (
-        session.query(PullRequests)
-        .filter(
-            PullRequests.repository_user == repo_model.user,
-            PullRequests.repository_name == repo_model.name,
-        )
-        .count()
-    )
 
-    logger.info(
-        "Saved %s pull requests for %s", count_2 - count, gh_repo.full_name
-    )
+def _is_pull_request(issue: GHIssue) -> bool:
+    # ``issue.pull_request`` of a plain issue is missing from the payload,
+    # so accessing it would request the whole issue again
+    return "pull_request" in issue._rawData
 
 
-def save_issues(user: str, repo: str, session: Session) -> None:
+def save_issues(
+    user: str, repo: str, session: Session, full_sync: bool = False
+) -> None:
     """
     Save issues information for a repository to the database
 
+    Only issues updated since the start of the previous finished sync
+    are requested from GitHub. Comments are saved by
+    :py:func:`save_comments`.
+
     Parameters
     ----------
     user : str
@@ -366,56 +505,49 @@ def save_issues(user: str, repo: str, session: Session) -> None:
         repository name on GitHub
     session : sqlalchemy.orm.Session
         database session
+    full_sync : bool
+        if True, iterate over all issues of the repository
     """
     gh_repo, repo_model = get_repo_with_model(user, repo, session)
+    sync_start = utc_now()
+    sync_state = get_sync_state(session, repo_model, ISSUE_SYNC)
+    since = None if full_sync else sync_state.synced_at
 
     count = (
         session.query(Issues)
-        .filter(
-            Issues.repository_user == repo_model.user,
-            Issues.repository_name == repo_model.name,
-        )
+        .filter(Issues.repository_id == repo_model.id)
         .count()
     )
-    issue_iter = gh_repo.get_issues(state="all")
+    writer = get_writer(session)
+    if since is None:
+        issue_iter = gh_repo.get_issues(state="all")
+    else:
+        issue_iter = gh_repo.get_issues(state="all", since=since)
     for issue in tqdm(
-        issue_iter, total=issue_iter.totalCount, desc=f"Issues {user}/{repo}"
+        issue_iter,
+        total=issue_iter.totalCount if since is None else None,
+        desc=f"Issues {user}/{repo}",
     ):
-        if (
-            session.get(
-                PullRequests,
-                {
-                    "repository_user": repo_model.user,
-                    "repository_name": repo_model.name,
-                    "pull_request": issue.number,
-                },
-            )
-            is not None
-        ):
+        # the issues endpoint lists pull requests too
+        if _is_pull_request(issue):
             continue
 
         issue_ob = (
             session.query(Issues)
             .filter(
-                Issues.repository_user == repo_model.user,
-                Issues.repository_name == repo_model.name,
+                Issues.repository_id == repo_model.id,
                 Issues.issue == issue.number,
             )
             .first()
         )
-        if issue_ob is None and issue.pull_request is not None:
-            continue
-
         if issue_ob is None:
-            ensure_user(issue.user.login, session)
             issue_ob = Issues(
-                user=issue.user.login,
-                repository_user=repo_model.user,
-                repository_name=repo_model.name,
+                user_id=ensure_user(issue.user.login, session),
+                repository_id=repo_model.id,
                 issue=issue.number,
                 open_time=issue.created_at,
             )
-            session.add(issue_ob)
+            writer.add(issue_ob)
 
         elif issue_ob.last_modification_time == issue.updated_at.replace(
             tzinfo=None
@@ -427,72 +559,245 @@ def save_issues(user: str, repo: str, session: Session) -> None:
         issue_ob.close_time = issue.closed_at
         issue_ob.last_modification_time = issue.updated_at.replace(tzinfo=None)
         issue_ob.labels = [
-            get_or_create(session, Labels, label=label.name)
-            for label in issue.get_labels()
+            get_identity_map(session).label(label.name)
+            for label in issue.labels
         ]
+        update_search_index(
+            session,
+            ISSUE_DOCUMENT,
+            repo_model,
+            issue.number,
+            issue.title,
+            issue.body,
+        )
+        writer.done()
 
-        for comment in issue.get_comments():
-            if session.query(IssueComment).get(comment.id):
-                continue
-            ensure_user(comment.user.login, session)
-            session.merge(
-                IssueComment(
-                    id=comment.id,
-                    user=comment.user.login,
-                    date=comment.created_at,
-                    issue=issue.number,
-                    repository_name=repo_model.name,
-                    repository_user=repo_model.user,
-                )
-            )
-    session.commit()
+    sync_state.synced_at = sync_start
+    writer.checkpoint()
     count_2 = (
         session.query(Issues)
-        .filter(
-            Issues.repository_user == repo_model.user,
-            Issues.repository_name == repo_model.name,
-        )
+        .filter(Issues.repository_id == repo_model.id)
         .count()
     )
     logger.info("Saved %s issues for %s", count_2 - count, gh_repo.full_name)
 
 
+def _number_from_url(url: str) -> int:
+    return int(url.rsplit("/", 1)[-1])
+
+
+def save_comments(
+    user: str, repo: str, session: Session, full_sync: bool = False
+) -> None:
+    """
+    Save comments of issues and review comments of pull requests
+    for a repository to the database
+
+    Comments are listed for the whole repository, including only those
+    updated since the start of the previous finished sync, and matched
+    to issues and pull requests already saved in the database.
+    So it should be called after :py:func:`save_issues` and
+    :py:func:`~.github_graphql.save_pull_requests_graphql`.
+    Comments of issues and pull requests not saved yet are skipped,
+    and the next sync starts no later than the oldest of them,
+    so they are listed again.
+
+    Parameters
+    ----------
+    user : str
+        user or organization name on GitHub
+    repo : str
+        repository name on GitHub
+    session : sqlalchemy.orm.Session
+        database session
+    full_sync : bool
+        if True, iterate over all comments of the repository
+    """
+    gh_repo, repo_model = get_repo_with_model(user, repo, session)
+    sync_start = utc_now()
+    sync_state = get_sync_state(session, repo_model, COMMENT_SYNC)
+    since = None if full_sync else sync_state.synced_at
+    kwargs = {} if since is None else {"since": since}
+
+    issue_numbers = set(
+        session.scalars(
+            select(Issues.issue).where(Issues.repository_id == repo_model.id)
+        )
+    )
+    pr_numbers = set(
+        session.scalars(
+            select(PullRequests.pull_request).where(
+                PullRequests.repository_id == repo_model.id
+            )
+        )
+    )
+
+    identity_map = get_identity_map(session)
+    writer = get_writer(session)
+    # the next sync starts before the oldest comment that was skipped
+    # because its issue or pull request is not saved yet
+    next_since = sync_start
+
+    # issue comments of pull requests are not saved
+    for comment in tqdm(
+        gh_repo.get_issues_comments(**kwargs),
+        desc=f"Issue comments {user}/{repo}",
+    ):
+        number = _number_from_url(comment.issue_url)
+        if number not in issue_numbers and number not in pr_numbers:
+            next_since = min(
+                next_since, comment.updated_at.replace(tzinfo=None)
+            )
+        if number not in issue_numbers or not identity_map.is_new(
+            identity_map.issue_comment_ids, comment.id
+        ):
+            continue
+        user_id = ensure_user(comment.user.login, session)
+        writer.add(
+            IssueComment(
+                id=comment.id,
+                user_id=user_id,
+                date=comment.created_at,
+                issue=number,
+                repository_id=repo_model.id,
+            )
+        )
+        save_activity(
+            session,
+            ISSUE_COMMENT_ACTIVITY,
+            comment.id,
+            user_id,
+            repo_model,
+            number,
+            comment.created_at,
+        )
+        writer.done()
+
+    for comment in tqdm(
+        gh_repo.get_pulls_comments(**kwargs),
+        desc=f"Pull request comments {user}/{repo}",
+    ):
+        number = _number_from_url(comment.pull_request_url)
+        if number not in pr_numbers:
+            next_since = min(
+                next_since, comment.updated_at.replace(tzinfo=None)
+            )
+        if number not in pr_numbers or not identity_map.is_new(
+            identity_map.pr_comment_ids, comment.id
+        ):
+            continue
+        user_id = ensure_user(comment.user.login, session)
+        writer.add(
+            PullRequestComments(
+                id=comment.id,
+                user_id=user_id,
+                date=comment.created_at,
+                pr_num=number,
+                repository_id=repo_model.id,
+            )
+        )
+        save_activity(
+            session,
+            PR_COMMENT_ACTIVITY,
+            comment.id,
+            user_id,
+            repo_model,
+            number,
+            comment.created_at,
+        )
+        writer.done()
+
+    sync_state.synced_at = next_since
+    writer.checkpoint()
+
+
+# platforms of napari installers by the extension of the asset
+INSTALLER_PLATFORMS = {".sh": "Linux", ".exe": "Windows", ".pkg": "macOS"}
+
+
+def _installer_platform(name: str) -> str | None:
+    for extension, platform in INSTALLER_PLATFORMS.items():
+        if name.endswith(extension):
+            return platform
+    return None
+
+
 def update_artifact_download(user: str, repo: str, session: Session):
+    """
+    Save download counts of installers attached to releases
+
+    Assets are taken from the release listing, which embeds them, so
+    the update costs one request per page of releases. Releases
+    whose installers and their download counts did not change
+    since the previous update are skipped.
+
+    Parameters
+    ----------
+    user : str
+        user or organization name on GitHub
+    repo : str
+        repository name on GitHub
+    session : sqlalchemy.orm.Session
+        database session
+    """
     gh_repo, repo_model = get_repo_with_model(user, repo, session)
 
-    releases = gh_repo.get_releases()
+    saved_releases = set(
+        session.scalars(
+            select(Release.release_tag).where(
+                Release.repository_id == repo_model.id
+            )
+        )
+    )
+    saved_counts: dict[str, dict[str, int]] = {}
+    for tag, name, count in session.execute(
+        select(
+            ArtifactDownloads.release_tag,
+            ArtifactDownloads.artifact_name,
+            ArtifactDownloads.download_count,
+        ).where(ArtifactDownloads.repository_id == repo_model.id)
+    ):
+        saved_counts.setdefault(tag, {})[name] = count
 
+    new_releases = []
+    downloads = []
+    changed = 0
     for release in tqdm(
-        releases,
-        total=releases.totalCount,
-        desc=f"Artifact downloads {user}/{repo}",
+        gh_repo.get_releases(), desc=f"Artifact downloads {user}/{repo}"
     ):
         if release.prerelease:
             continue
-        release_model = get_or_create(
-            session,
-            Release,
-            repository_name=repo_model.name,
-            repository_user=repo_model.user,
-            release_tag=release.tag_name,
-        )
-        for asset in release.get_assets():
-            if asset.name.endswith(".sh"):
-                platform = "Linux"
-            elif asset.name.endswith(".exe"):
-                platform = "Windows"
-            elif asset.name.endswith(".pkg"):
-                platform = "macOS"
-            else:
-                continue
-            session.merge(
-                ArtifactDownloads(
-                    release_tag=release_model.release_tag,
-                    repository_name=repo_model.name,
-                    repository_user=repo_model.user,
-                    artifact_name=asset.name,
-                    download_count=asset.download_count,
-                    platform=platform,
-                )
+        counts = {
+            asset.name: asset.download_count
+            for asset in release.assets
+            if _installer_platform(asset.name) is not None
+        }
+        if release.tag_name in saved_releases and counts == saved_counts.get(
+            release.tag_name, {}
+        ):
+            continue
+        changed += 1
+        if release.tag_name not in saved_releases:
+            new_releases.append(
+                {
+                    "repository_id": repo_model.id,
+                    "release_tag": release.tag_name,
+                }
             )
-    session.commit()
+        downloads.extend(
+            {
+                "release_tag": release.tag_name,
+                "repository_id": repo_model.id,
+                "artifact_name": name,
+                "download_count": count,
+                "platform": _installer_platform(name),
+            }
+            for name, count in counts.items()
+        )
+
+    bulk_upsert(session, Release, new_releases)
+    bulk_upsert(session, ArtifactDownloads, downloads)
+    get_writer(session).checkpoint()
+    logger.info(
+        "Updated downloads of %s releases for %s/%s", changed, user, repo
+    )
@@ -0,0 +1,423 @@
+"""
+Fetch pull requests with their details from GitHub GraphQL API.
+
+REST API needs separate requests for labels, commits and reviews
+of each pull request. A GraphQL query returns them nested for
+a batch of pull requests, so syncing a repository costs
+one request per ``PR_BATCH_SIZE`` changed pull requests. Follow up
+requests are only needed for pull requests with more nested items
+than fit in the first page of a connection.
+"""
+
+from __future__ import annotations
+
+import datetime
+import logging
+import typing
+
+from tqdm import tqdm
+
+from napari_dashboard.db_schema.github import (
+    PR_COMMIT_ACTIVITY,
+    PR_DOCUMENT,
+    PR_REVIEW_ACTIVITY,
+    PR_SYNC,
+    PullRequestCommits,
+    PullRequestReviews,
+    PullRequests,
+    Repository,
+)
+from napari_dashboard.db_update.github import (
+    PR_COMMITS_HEADER,
+    ensure_user,
+    get_identity_map,
+    get_sync_state,
+    log_requests_per_pull_request,
+    save_activity,
+    update_search_index,
+    utc_now,
+)
+from napari_dashboard.db_update.github_rate_limit import (
+    GOVERNOR,
+    GRAPHQL,
+    RATE_LIMIT_ATTEMPTS,
+    get_session,
+)
+from napari_dashboard.db_update.util import (
+    bulk_upsert,
+    get_or_create,
+    get_writer,
+)
+
+if typing.TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+GRAPHQL_URL = "https://api.github.com/graphql"
+# type of error returned with status 200 when a query hits the rate limit
+RATE_LIMITED = "RATE_LIMITED"
+PR_BATCH_SIZE = 50
+# login of users removed from GitHub, used by REST API as well
+GHOST_USER = "ghost"
+
+
+class GraphQLError(Exception):
+    pass
+
+
+def _connection(name: str, fields: str, first: int, after: bool = False):
+    arguments = (
+        f"first: {first}, after: $cursor" if after else f"first: {first}"
+    )
+    return (
+        f"{name}({arguments}) "
+        f"{{ totalCount pageInfo {{ hasNextPage endCursor }} "
+        f"nodes {{ {fields} }} }}"
+    )
+
+
+LABEL_FIELDS = "name"
+COMMIT_FIELDS = "commit { oid authoredDate author { user { login } } }"
+REVIEW_FIELDS = "databaseId state submittedAt author { login }"
+
+# nested connections of a pull request: name, node fields, first page size
+PR_CONNECTIONS = (
+    ("labels", LABEL_FIELDS, 20),
+    ("commits", COMMIT_FIELDS, 100),
+    ("reviews", REVIEW_FIELDS, 100),
+)
+
+PR_FIELDS = (
+    "id number title body createdAt updatedAt closedAt mergedAt "
+    "headRefOid author { login } "
+    + " ".join(
+        _connection(name, fields, first)
+        for name, fields, first in PR_CONNECTIONS
+    )
+)
+
+PULL_REQUESTS_QUERY = f"""
+query($owner: String!, $name: String!, $count: Int!, $cursor: String) {{
+  repository(owner: $owner, name: $name) {{
+    pullRequests(
+      first: $count,
+      after: $cursor,
+      orderBy: {{field: UPDATED_AT, direction: DESC}}
+    ) {{
+      pageInfo {{ hasNextPage endCursor }}
+      nodes {{ {PR_FIELDS} }}
+    }}
+  }}
+}}
+"""
+
+
+def _node_connection_query(type_name: str, connection: str) -> str:
+    """Query for next page of a connection of any node"""
+    return f"""
+query($id: ID!, $cursor: String) {{
+  node(id: $id) {{ ... on {type_name} {{ {connection} }} }}
+}}
+"""
+
+
+def graphql_query(query: str, variables: dict) -> dict:
+    """
+    Execute GraphQL query
+
+    The request is paced by the shared rate limit governor. Server
+    errors are retried by the session. Queries rejected by a rate limit,
+    with HTTP status or with ``RATE_LIMITED`` error in the response,
+    are sent again once the governor lets them, up to
+    ``RATE_LIMIT_ATTEMPTS`` times.
+
+    Returns
+    -------
+    dict
+        ``data`` part of the response
+    """
+    for _ in range(RATE_LIMIT_ATTEMPTS):
+        resp = get_session().post(
+            GRAPHQL_URL,
+            json={"query": query, "variables": variables},
+            headers=PR_COMMITS_HEADER,
+        )
+        if resp.status_code != 200:
+            raise GraphQLError(
+                f"GraphQL query failed with status {resp.status_code}: "
+                f"{resp.text}"
+            )
+        data = resp.json()
+        errors = data.get("errors")
+        if errors and any(x.get("type") == RATE_LIMITED for x in errors):
+            logger.warning("Rate limit of GitHub GraphQL API exceeded")
+            GOVERNOR.rate_limited(GRAPHQL, resp.headers)
+            continue
+        if errors:
+            raise GraphQLError(f"GraphQL query failed: {errors}")
+        return data["data"]
+    raise GraphQLError(
+        f"GraphQL query rate limited {RATE_LIMIT_ATTEMPTS} times in a row"
+    )
+
+
+def _complete_connection(
+    node_id: str, type_name: str, name: str, fields: str, connection: dict
+) -> list[dict]:
+    """Fetch remaining pages of connection, return all its nodes"""
+    nodes = list(connection["nodes"])
+    page_info = connection["pageInfo"]
+    query = _node_connection_query(
+        type_name, _connection(name, fields, 100, after=True)
+    )
+    while page_info["hasNextPage"]:
+        data = graphql_query(
+            query, {"id": node_id, "cursor": page_info["endCursor"]}
+        )
+        connection = data["node"][name]
+        nodes.extend(connection["nodes"])
+        page_info = connection["pageInfo"]
+    return nodes
+
+
+def pull_request_head(pr: dict) -> tuple[str, int]:
+    """Head SHA and number of commits of pull request"""
+    return pr["headRefOid"], pr["commits"]["totalCount"]
+
+
+def complete_pull_request(pr: dict, skip: tuple[str, ...] = ()) -> dict:
+    """
+    Replace connections of pull request with lists of all their nodes
+
+    Connections named in ``skip`` are replaced by their first page only.
+    """
+    for name, fields, _ in PR_CONNECTIONS:
+        if name in skip:
+            pr[name] = list(pr[name]["nodes"])
+            continue
+        pr[name] = _complete_connection(
+            pr["id"], "PullRequest", name, fields, pr[name]
+        )
+    return pr
+
+
+def parse_time(value: str | None) -> datetime.datetime | None:
+    """Parse GraphQL time to naive UTC datetime"""
+    if value is None:
+        return None
+    return datetime.datetime.fromisoformat(
+        value.replace("Z", "+00:00")
+    ).replace(tzinfo=None)
+
+
+def login(actor: dict | None) -> str:
+    """Login of author, ``GHOST_USER`` for deleted accounts"""
+    if actor is None:
+        return GHOST_USER
+    return actor["login"]
+
+
+def iter_pull_requests(
+    owner: str,
+    name: str,
+    updated_since: datetime.datetime | None = None,
+    batch_size: int = PR_BATCH_SIZE,
+) -> Iterator[dict]:
+    """
+    Iterate over pull requests from the most recently updated.
+
+    Labels, commits and reviews of pull requests are
+    connections with the first page of nodes, use
+    :py:func:`complete_pull_request` to fetch the remaining ones.
+
+    Parameters
+    ----------
+    owner : str
+        user or organization name on GitHub
+    name : str
+        repository name on GitHub
+    updated_since : datetime.datetime | None
+        stop at first pull request updated before this naive UTC time
+    batch_size : int
+        number of pull requests fetched in a single request
+    """
+    cursor = None
+    while True:
+        data = graphql_query(
+            PULL_REQUESTS_QUERY,
+            {
+                "owner": owner,
+                "name": name,
+                "count": batch_size,
+                "cursor": cursor,
+            },
+        )
+        connection = data["repository"]["pullRequests"]
+        for pr in connection["nodes"]:
+            if (
+                updated_since is not None
+                and parse_time(pr["updatedAt"]) < updated_since
+            ):
+                return
+            yield pr
+        if not connection["pageInfo"]["hasNextPage"]:
+            return
+        cursor = connection["pageInfo"]["endCursor"]
+
+
+def _save_commits(session: Session, repo_model: Repository, pr: dict):
+    identity_map = get_identity_map(session)
+    author = login(pr["author"])
+    commits = []
+    for node in pr["commits"]:
+        commit = node["commit"]
+        if not identity_map.is_new(identity_map.commit_shas, commit["oid"]):
+            continue
+        commit_user = (commit["author"] or {}).get("user")
+        user_id = ensure_user(
+            author if commit_user is None else commit_user["login"], session
+        )
+        date = parse_time(commit["authoredDate"])
+        commits.append(
+            {
+                "sha": commit["oid"],
+                "user_id": user_id,
+                "date": date,
+                "pr_num": pr["number"],
+                "repository_id": repo_model.id,
+            }
+        )
+        save_activity(
+            session,
+            PR_COMMIT_ACTIVITY,
+            commit["oid"],
+            user_id,
+            repo_model,
+            pr["number"],
+            date,
+        )
+    bulk_upsert(session, PullRequestCommits, commits)
+
+
+def _save_reviews(session: Session, repo_model: Repository, pr: dict):
+    identity_map = get_identity_map(session)
+    writer = get_writer(session)
+    for review in pr["reviews"]:
+        if review["state"] == "PENDING" or not identity_map.is_new(
+            identity_map.review_ids, review["databaseId"]
+        ):
+            continue
+        user_id = ensure_user(login(review["author"]), session)
+        date = parse_time(review["submittedAt"])
+        writer.add(
+            PullRequestReviews(
+                id=review["databaseId"],
+                user_id=user_id,
+                date=date,
+                state=review["state"],
+                pr_num=pr["number"],
+                repository_id=repo_model.id,
+            )
+        )
+        save_activity(
+            session,
+            PR_REVIEW_ACTIVITY,
+            review["databaseId"],
+            user_id,
+            repo_model,
+            pr["number"],
+            date,
+        )
+
+
+def save_pull_requests_graphql(
+    user: str, repo: str, session: Session, full_sync: bool = False
+) -> None:
+    """
+    Save pull requests information for a repository to the database
+
+    Pull requests are fetched with GraphQL API from the most recently
+    updated, down to the newest update time saved by the previous sync.
+    Remaining pages of commits are fetched only if head SHA or number
+    of commits changed. Review comments are saved by
+    :py:func:`napari_dashboard.db_update.github.save_comments`.
+
+    Parameters
+    ----------
+    user : str
+        user or organization name on GitHub
+    repo : str
+        repository name on GitHub
+    session : sqlalchemy.orm.Session
+        database session
+    full_sync : bool
+        if True, iterate over all pull requests of the repository
+    """
+    repo_model = get_or_create(session, Repository, user=user, name=repo)
+    sync_start = utc_now()
+    start_calls = GOVERNOR.calls
+    sync_state = get_sync_state(session, repo_model, PR_SYNC)
+    high_water_mark = None if full_sync else sync_state.high_water_mark
+    newest_update = sync_state.high_water_mark
+    writer = get_writer(session)
+    saved = 0
+    changed = 0
+
+    for pr in tqdm(
+        iter_pull_requests(user, repo, high_water_mark),
+        desc=f"Pull Requests {user}/{repo}",
+    ):
+        updated_at = parse_time(pr["updatedAt"])
+        if newest_update is None or updated_at > newest_update:
+            newest_update = updated_at
+        pull = session.get(
+            PullRequests,
+            {"repository_id": repo_model.id, "pull_request": pr["number"]},
+        )
+        if pull is None:
+            pull = PullRequests(
+                user_id=ensure_user(login(pr["author"]), session),
+                repository_id=repo_model.id,
+                open_time=parse_time(pr["createdAt"]),
+                pull_request=pr["number"],
+            )
+            writer.add(pull)
+            saved += 1
+        elif pull.last_modification_time == updated_at:
+            continue
+
+        changed += 1
+        head = pull_request_head(pr)
+        commits_changed = head != (pull.head_sha, pull.commit_count)
+        complete_pull_request(pr, skip=() if commits_changed else ("commits",))
+        pull.merge_time = parse_time(pr["mergedAt"])
+        pull.close_time = parse_time(pr["closedAt"])
+        pull.last_modification_time = updated_at
+        pull.title = pr["title"]
+        pull.description = pr["body"]
+        pull.labels = [
+            get_identity_map(session).label(label["name"])
+            for label in pr["labels"]
+        ]
+        update_search_index(
+            session,
+            PR_DOCUMENT,
+            repo_model,
+            pr["number"],
+            pr["title"],
+            pr["body"],
+        )
+        if commits_changed:
+            _save_commits(session, repo_model, pr)
+            pull.head_sha, pull.commit_count = head
+        _save_reviews(session, repo_model, pr)
+        writer.done()
+
+    sync_state.high_water_mark = newest_update
+    sync_state.synced_at = sync_start
+    writer.checkpoint()
+    logger.info("Saved %s pull requests for %s/%s", saved, user, repo)
+    log_requests_per_pull_request(f"{user}/{repo}", start_calls, changed)
@@ -0,0 +1,278 @@
+"""
+Rate limit governor shared by all requests to GitHub API.
+
+PyGithub clients and direct ``requests`` calls send their requests
+through a single HTTP session (see :py:func:`get_session`), so each
+of them passes through :py:data:`GOVERNOR`. It reads the quota from
+``X-RateLimit-*`` headers and ``Retry-After`` of secondary rate limits
+of every response and paces requests with a token bucket per rate
+limit resource (REST, GraphQL and search have separate quotas).
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+import urllib.parse
+from typing import TYPE_CHECKING
+
+import requests
+from github.Requester import (
+    HTTPRequestsConnectionClass,
+    HTTPSRequestsConnectionClass,
+    Requester,
+)
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+logger = logging.getLogger(__name__)
+
+CORE = "core"
+GRAPHQL = "graphql"
+SEARCH = "search"
+
+# GitHub asks to stay below 900 points per minute for REST API
+MAX_RATE = 10.0
+BURST = 10
+# below this quota requests are spread over the time left to its reset
+LOW_QUOTA = 500
+RATE_LIMIT_ATTEMPTS = 5
+# seconds to wait after rejection by a rate limit without reset time
+RATE_LIMIT_WAIT = 60.0
+POOL_SIZE = 16
+
+# all methods are retried, as GraphQL queries are sent with POST
+# and the dashboard does not modify anything on GitHub
+SERVER_ERROR_RETRY = Retry(
+    total=3,
+    backoff_factor=1,
+    status_forcelist=(500, 502, 503, 504),
+    allowed_methods=None,
+    raise_on_status=False,
+)
+
+
+def resource_of(url: str) -> str:
+    """Rate limit resource used by request to the url"""
+    path = urllib.parse.urlsplit(url).path
+    if path.endswith("/graphql"):
+        return GRAPHQL
+    if path.startswith("/search/"):
+        return SEARCH
+    return CORE
+
+
+class TokenBucket:
+    """
+    Token bucket of a single rate limit resource
+
+    Tokens are refilled with ``max_rate`` per second while the quota
+    is above ``LOW_QUOTA``, then at the rate that lasts until reset.
+    It is not thread safe, :py:class:`RateLimitGovernor` guards it.
+    """
+
+    def __init__(self, max_rate: float, burst: int):
+        self.max_rate = max_rate
+        self.rate = max_rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.remaining: int | None = None
+        self.reset: float | None = None
+
+    def take(self, now: float) -> float:
+        """Take a token, return number of seconds to wait for it"""
+        if self.reset is not None and time.time() >= self.reset:
+            self.rate = self.max_rate
+            self.remaining = self.reset = None
+        self.tokens = min(
+            self.burst, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+        self.tokens -= 1
+        return max(-self.tokens / self.rate, self.blocked_until - now, 0.0)
+
+    def block(self, until: float) -> None:
+        self.blocked_until = max(self.blocked_until, until)
+
+    def set_quota(self, remaining: int, reset: float) -> None:
+        self.remaining = remaining
+        self.reset = reset
+        seconds = max(reset - time.time(), 1.0)
+        if remaining <= 0:
+            self.block(time.monotonic() + seconds)
+        if remaining > LOW_QUOTA:
+            self.rate = self.max_rate
+        else:
+            self.rate = min(self.max_rate, max(remaining, 1) / seconds)
+
+
+class RateLimitGovernor:
+    """
+    Pace requests to GitHub API to stay within its rate limits
+
+    It is shared by threads, each request should call :py:meth:`acquire`
+    before it is sent and :py:meth:`update` with the response headers.
+
+    Attributes
+    ----------
+    calls : int
+        number of requests sent
+    throttled : float
+        total number of seconds requests waited for their turn
+    """
+
+    def __init__(self, max_rate: float = MAX_RATE, burst: int = BURST):
+        self.max_rate = max_rate
+        self.burst = burst
+        self.calls = 0
+        self.throttled = 0.0
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, resource: str) -> TokenBucket:
+        if resource not in self._buckets:
+            self._buckets[resource] = TokenBucket(self.max_rate, self.burst)
+        return self._buckets[resource]
+
+    def acquire(self, resource: str = CORE) -> None:
+        """Wait until a request using the resource may be sent"""
+        with self._lock:
+            delay = self._bucket(resource).take(time.monotonic())
+            self.calls += 1
+            self.throttled += delay
+        if delay > 0:
+            logger.debug("Waiting %.2f s for %s rate limit", delay, resource)
+            time.sleep(delay)
+
+    def update(self, resource: str, headers: Mapping[str, str]) -> None:
+        """Update quota of the resource from response headers"""
+        with self._lock:
+            if (
+                "x-ratelimit-remaining" in headers
+                and "x-ratelimit-reset" in headers
+            ):
+                self._bucket(resource).set_quota(
+                    int(headers["x-ratelimit-remaining"]),
+                    float(headers["x-ratelimit-reset"]),
+                )
+            if "retry-after" in headers:
+                # secondary rate limits are not tied to a resource
+                until = time.monotonic() + float(headers["retry-after"])
+                for bucket in self._buckets.values():
+                    bucket.block(until)
+
+    def rate_limited(self, resource: str, headers: Mapping[str, str]) -> None:
+        """
+        Hold requests using the resource after one was rejected
+
+        Requests wait until the reset of the quota from the headers,
+        or ``RATE_LIMIT_WAIT`` seconds if it is not known.
+        """
+        with self._lock:
+            if "x-ratelimit-reset" in headers:
+                seconds = float(headers["x-ratelimit-reset"]) - time.time()
+            else:
+                seconds = RATE_LIMIT_WAIT
+            self._bucket(resource).block(time.monotonic() + max(seconds, 1.0))
+
+    @property
+    def quota_left(self) -> dict[str, int]:
+        """Remaining quota of each resource, as reported by GitHub"""
+        with self._lock:
+            return {
+                resource: bucket.remaining
+                for resource, bucket in self._buckets.items()
+                if bucket.remaining is not None
+            }
+
+    def log_stats(self) -> None:
+        logger.info(
+            "GitHub API: %s requests, throttled for %.1f s, quota left %s",
+            self.calls,
+            self.throttled,
+            self.quota_left,
+        )
+
+
+GOVERNOR = RateLimitGovernor()
+
+
+def is_rate_limited(response: requests.Response) -> bool:
+    return response.status_code in {403, 429} and (
+        "retry-after" in response.headers
+        or response.headers.get("x-ratelimit-remaining") == "0"
+    )
+
+
+class GovernedAdapter(HTTPAdapter):
+    """
+    HTTP adapter sending requests through a rate limit governor
+
+    Requests rejected by a rate limit are sent again once
+    the governor lets them, up to ``RATE_LIMIT_ATTEMPTS`` times.
+    """
+
+    def __init__(self, governor: RateLimitGovernor, **kwargs):
+        self.governor = governor
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs) -> requests.Response:
+        resource = resource_of(request.url)
+        for _ in range(RATE_LIMIT_ATTEMPTS):
+            self.governor.acquire(resource)
+            response = super().send(request, **kwargs)
+            self.governor.update(resource, response.headers)
+            if not is_rate_limited(response):
+                break
+            logger.warning("Rate limit of GitHub %s API exceeded", resource)
+            response.close()
+        return response
+
+
+_SESSION: requests.Session | None = None
+_SESSION_LOCK = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """HTTP session used for all requests to GitHub API, shared by threads"""
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            session = requests.Session()
+            # disable fallback to .netrc credentials, as PyGithub does
+            session.auth = Requester.noopAuth
+            session.mount(
+                "https://api.github.com",
+                GovernedAdapter(
+                    GOVERNOR,
+                    max_retries=SERVER_ERROR_RETRY,
+                    pool_maxsize=POOL_SIZE,
+                ),
+            )
+            _SESSION = session
+    return _SESSION
+
+
+class GovernedConnection(HTTPSRequestsConnectionClass):
+    """PyGithub connection sending requests with :py:func:`get_session`"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.session = get_session()
+
+    def close(self) -> None:
+        # the session is shared with other connections
+        pass
+
+
+def install_governor() -> None:
+    """Make PyGithub clients send their requests with :py:func:`get_session`"""
+    Requester.injectConnectionClasses(
+        HTTPRequestsConnectionClass, GovernedConnection
+    )
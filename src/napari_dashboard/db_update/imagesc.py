@@ -5,7 +5,7 @@ import tqdm
 from sqlalchemy.orm import Session
 
 from napari_dashboard.db_schema.imagesc import ForumTag, ForumTopic, ForumUser
-from napari_dashboard.db_update.util import get_or_create
+from napari_dashboard.db_update.util import get_or_create, get_writer
 
 
 def save_user_info(
@@ -37,6 +37,7 @@ def save_forum_info(session: Session):
     index = 1
     user_dict = {}
     tag_dict = {}
+    writer = get_writer(session)
 
     with tqdm.tqdm(desc="Fetching forum information") as pbar:
         while True:
@@ -79,7 +80,7 @@ def save_forum_info(session: Session):
                             user_dict[x["user_id"]] for x in topic["posters"]
                         ],
                     )
-                    session.add(topic)
+                    writer.add(topic)
                 else:
                     topic_ = topic_list[0]
                     topic_.last_posted_at = datetime.datetime.fromisoformat(
@@ -90,4 +91,5 @@ def save_forum_info(session: Session):
                     topic_.users = [
                         user_dict[x["user_id"]] for x in topic["posters"]
                     ]
-                    session.commit()
+                writer.done()
+    writer.checkpoint()
@@ -8,19 +8,23 @@ from time import sleep
 
 import requests
 import tqdm
+from sqlalchemy import delete, func, insert, select, union
 from sqlalchemy.orm import Session
 
 from napari_dashboard.db_schema.pypi import (
     OperatingSystem,
     PackageRelease,
+    PePyDailyTotal,
     PePyDownloadStat,
     PePyTotalDownloads,
     PyPi,
     PyPiDownloadPerOS,
     PyPiDownloadPerPythonVersion,
+    PyPiRollup,
     PyPiStatsDownloads,
     PythonVersion,
 )
+from napari_dashboard.db_update.util import bulk_upsert, get_writer
 from napari_dashboard.plugins_info import (
     get_packages_to_fetch,
     plugin_name_list,
@@ -30,6 +34,17 @@ if typing.TYPE_CHECKING:
     from sqlalchemy import Engine
 
 START_DATE = "2018-01-01"
+DEFAULT_RETENTION_MONTHS = 12
+ROLLUP_COLUMNS = (
+    "project",
+    "date",
+    "country_code",
+    "version",
+    "python_version",
+    "system_name",
+    "distro_name",
+    "ci_install",
+)
 
 
 class PackageNotFound(Exception):
@@ -38,7 +53,9 @@ class PackageNotFound(Exception):
 
 def indexed_projects(engine: Engine) -> list[str]:
     with Session(engine) as session:
-        dist = session.query(PyPi.project).distinct()
+        dist = session.execute(
+            union(select(PyPi.project), select(PyPiRollup.project))
+        ).all()
     return [d[0] for d in dist]
 
 
@@ -94,6 +111,53 @@ def build_new_projects_query(engine: Engine) -> str:
     )
 
 
+def retention_cutoff(today: datetime.date, months: int) -> datetime.date:
+    """First day of the month ``months`` months before ``today``"""
+    month_index = today.year * 12 + today.month - 1 - months
+    return datetime.date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def compact_old_downloads(
+    session: Session, months: int = DEFAULT_RETENTION_MONTHS
+) -> int:
+    """
+    Collapse raw ``PyPi`` rows older than ``months`` into ``PyPiRollup``.
+
+    Rows are grouped by day and columns used by reports, counted
+    and removed from the raw table. Only full months are compacted.
+
+    Parameters
+    ----------
+    session : Session
+        database session
+    months : int
+        number of months for which raw rows are kept
+
+    Returns
+    -------
+    int
+        number of removed raw rows
+    """
+    if months < 1:
+        raise ValueError("Retention period needs to be at least one month")
+    cutoff = retention_cutoff(datetime.date.today(), months)
+    columns = [getattr(PyPi, name) for name in ROLLUP_COLUMNS]
+    writer = get_writer(session)
+    # rollup and removal of raw rows are committed together
+    writer.execute(
+        insert(PyPiRollup).from_select(
+            [*ROLLUP_COLUMNS, "count"],
+            select(*columns, func.count())
+            .where(PyPi.date < cutoff)
+            .group_by(*columns),
+        )
+    )
+    removed = writer.execute(delete(PyPi).where(PyPi.date < cutoff)).rowcount
+    writer.checkpoint()
+    logging.info("Compacted %s pypi downloads before %s", removed, cutoff)
+    return removed
+
+
 def _save_pepy_download_stat(session: Session, package: str):
     pepy = requests.get(
         f"https://pepy.tech/api/v2/projects/{package}",
@@ -106,28 +170,58 @@ def _save_pepy_download_stat(session: Session, package: str):
             pepy["message"],
         )
         return
-    session.merge(
-        PePyTotalDownloads(name=package, downloads=pepy["total_downloads"])
+    bulk_upsert(
+        session,
+        PePyTotalDownloads,
+        [{"name": package, "downloads": pepy["total_downloads"]}],
+    )
+    bulk_upsert(
+        session,
+        PePyDownloadStat,
+        (
+            {
+                "name": package,
+                "version": version,
+                "date": datetime.date.fromisoformat(day),
+                "downloads": count,
+            }
+            for day, downloads in pepy["downloads"].items()
+            for version, count in downloads.items()
+        ),
+    )
+    update_pepy_daily_totals(
+        session,
+        package,
+        [datetime.date.fromisoformat(day) for day in pepy["downloads"]],
+    )
+    get_writer(session).done()
+
+
+def update_pepy_daily_totals(
+    session: Session, package: str, days: list[datetime.date]
+):
+    """
+    Recalculate the per day totals of a package for the given days
+    based on the per version data stored in ``PePyDownloadStat``.
+    """
+    totals = (
+        session.query(
+            PePyDownloadStat.date, func.sum(PePyDownloadStat.downloads)
+        )
+        .filter(
+            PePyDownloadStat.name == package, PePyDownloadStat.date.in_(days)
+        )
+        .group_by(PePyDownloadStat.date)
+        .all()
+    )
+    bulk_upsert(
+        session,
+        PePyDailyTotal,
+        (
+            {"name": package, "date": day, "downloads": downloads}
+            for day, downloads in totals
+        ),
     )
-    for day, downloads in pepy["downloads"].items():
-        day_date = datetime.date.fromisoformat(day)
-        for version, count in downloads.items():
-            # if (pepy := session.query(PePyDownloadStat).filter(
-            #     PePyDownloadStat.name == package,
-            #     PePyDownloadStat.version == version,
-            #     PePyDownloadStat.date == day_date,
-            # ).first()) is not None:
-            #     pepy.downloads = count
-            # else:
-            session.merge(
-                PePyDownloadStat(
-                    name=package,
-                    version=version,
-                    date=day_date,
-                    downloads=count,
-                )
-            )
-    session.commit()
 
 
 def save_pepy_download_stat(session: Session):
@@ -135,14 +229,14 @@ def save_pepy_download_stat(session: Session):
         get_packages_to_fetch(), desc="Fetching pepy plugin stats"
     ):
         _save_pepy_download_stat(session, plugin)
-    session.commit()
+    get_writer(session).checkpoint()
 
 
 def init_os(session: Session):
     all_os = {x[0] for x in session.query(OperatingSystem.name).all()}
     for os_ in ("darwin", "linux", "windows", "other", "null"):
         if os_ not in all_os:
-            session.add(OperatingSystem(name=os_))
+            get_writer(session).add(OperatingSystem(name=os_))
 
 
 def init_python_version(session: Session):
@@ -151,7 +245,7 @@ def init_python_version(session: Session):
     }
     for python_version in [f"3.{num}" for num in range(6, 19)] + ["null"]:
         if python_version not in all_python_version:
-            session.add(PythonVersion(version=python_version))
+            get_writer(session).add(PythonVersion(version=python_version))
 
 
 def _fetch_pypi_download_information(url: str, depth=10):
@@ -185,69 +279,88 @@ def _save_pypi_download_information(session: Session, package: str):
         logging.warning("Package %s not found", package)
         return
 
-    for el in overall["data"]:
-        session.merge(
-            PyPiStatsDownloads(
-                name=package,
-                date=datetime.date.fromisoformat(el["date"]),
-                downloads=el["downloads"],
-            )
-        )
-    for el in python_minor["data"]:
-        session.merge(
-            PyPiDownloadPerPythonVersion(
-                package_name=package,
-                package_date=datetime.date.fromisoformat(el["date"]),
-                python_version_name=el["category"],
-                downloads=el["downloads"],
-            )
-        )
-    for el in system["data"]:
-        session.merge(
-            PyPiDownloadPerOS(
-                package_name=package,
-                package_date=datetime.date.fromisoformat(el["date"]),
-                os_name=el["category"],
-                downloads=el["downloads"],
-            )
-        )
+    bulk_upsert(
+        session,
+        PyPiStatsDownloads,
+        (
+            {
+                "name": package,
+                "date": datetime.date.fromisoformat(el["date"]),
+                "downloads": el["downloads"],
+            }
+            for el in overall["data"]
+        ),
+    )
+    bulk_upsert(
+        session,
+        PyPiDownloadPerPythonVersion,
+        (
+            {
+                "package_name": package,
+                "package_date": datetime.date.fromisoformat(el["date"]),
+                "python_version_name": el["category"],
+                "downloads": el["downloads"],
+            }
+            for el in python_minor["data"]
+        ),
+    )
+    bulk_upsert(
+        session,
+        PyPiDownloadPerOS,
+        (
+            {
+                "package_name": package,
+                "package_date": datetime.date.fromisoformat(el["date"]),
+                "os_name": el["category"],
+                "downloads": el["downloads"],
+            }
+            for el in system["data"]
+        ),
+    )
 
 
 def save_pypi_download_information(session: Session):
+    writer = get_writer(session)
     init_os(session)
-    session.commit()
     init_python_version(session)
-    session.commit()
+    writer.checkpoint()
 
     for plugin in tqdm.tqdm(
         get_packages_to_fetch(), desc="Fetching pypistats data"
     ):
         _save_pypi_download_information(session, plugin)
+        writer.done()
 
-    session.commit()
+    writer.checkpoint()
 
 
 def _save_package_release(session: Session, name: str):
     data = requests.get(f"https://pypi.org/pypi/{name}/json").json()
     if "releases" not in data:
         return
-    for version, artifacts in data["releases"].items():
-        if not artifacts:
-            continue
-        release_date = min(
-            datetime.datetime.fromisoformat(x["upload_time"])
-            for x in artifacts
-        ).date()
-        session.merge(
-            PackageRelease(
-                name=name, version=version, release_date=release_date
-            )
-        )
+    bulk_upsert(
+        session,
+        PackageRelease,
+        (
+            {
+                "name": name,
+                "version": version,
+                "release_date": min(
+                    datetime.datetime.fromisoformat(x["upload_time"])
+                    for x in artifacts
+                ).date(),
+            }
+            for version, artifacts in data["releases"].items()
+            if artifacts
+        ),
+    )
 
 
 def save_package_release(session: Session):
+    writer = get_writer(session)
     for plugin in tqdm.tqdm(
         get_packages_to_fetch(), desc="Fetching pypi release data"
     ):
         _save_package_release(session, plugin)
-    session.commit()
+        writer.done()
+    writer.checkpoint()
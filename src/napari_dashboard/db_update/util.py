@@ -1,8 +1,25 @@
 import datetime
+import itertools
 import json
 import sys
+import time
 
 from sqlalchemy import Row
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+# GitHub responses are stored with their ETag and revalidated on each
+# request, as unchanged (304) responses do not count to the rate limit
+GITHUB_URLS_EXPIRE_AFTER = {"api.github.com": 0}
+# responses older than this are dropped, to not keep unused ones forever
+CACHE_MAX_AGE = datetime.timedelta(days=30)
+
+WRITER_KEY = "batch_writer"
+# number of pending writes and seconds after which a checkpoint is made
+BATCH_SIZE = 1000
+CHECKPOINT_INTERVAL = 60.0
+# number of rows sent to the database in a single upsert statement
+UPSERT_CHUNK_SIZE = 500
 
 
 class JSONEncoder(json.JSONEncoder):
@@ -14,10 +31,14 @@ class JSONEncoder(json.JSONEncoder):
         return json.JSONEncoder.default(self, o)
 
 
-def setup_cache(timeout=3600 * 5):
+def setup_cache(timeout=3600 * 5, cache_name="github_cache"):
     """
     setup cache for speedup execution and reduce number of requests to GitHub API
     by default cache will expire after 1h (3600s)
+
+    Processes updating sources in parallel should use separate ``cache_name``.
+    Responses from GitHub API do not expire, they are revalidated instead,
+    so a cache kept between runs saves requests for unchanged resources.
     """
     try:
         import requests_cache
@@ -27,8 +48,145 @@ def setup_cache(timeout=3600 * 5):
 
     """setup cache for requests"""
     requests_cache.install_cache(
-        "github_cache", backend="sqlite", expire_after=timeout
+        cache_name,
+        backend="sqlite",
+        expire_after=timeout,
+        urls_expire_after=GITHUB_URLS_EXPIRE_AFTER,
     )
+    requests_cache.get_cache().delete(older_than=CACHE_MAX_AGE)
+
+
+class BatchWriter:
+    """
+    Unit of work shared by database updaters
+
+    Writes are buffered in the session and committed together at
+    checkpoints. Updaters call :py:meth:`done` at the end of each unit
+    of work, like a saved pull request or package, which makes
+    a checkpoint once ``batch_size`` writes are pending or ``interval``
+    seconds passed since the previous one. Units are never split between
+    commits, so a crash loses only the unfinished batch. Changes of
+    already loaded objects are not counted, ``interval`` bounds them.
+    Use :py:func:`get_writer` to get the writer of a session.
+
+    Parameters
+    ----------
+    session : sqlalchemy.orm.Session
+        database session, the writer is stored in its ``info``
+    batch_size : int
+        number of pending writes that triggers a checkpoint
+    interval : float
+        number of seconds after which a checkpoint is made
+    """
+
+    def __init__(
+        self,
+        session: Session,
+        batch_size: int = BATCH_SIZE,
+        interval: float = CHECKPOINT_INTERVAL,
+    ):
+        self.session = session
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pending = 0
+        self.checkpoints = 0
+        self._last_checkpoint = time.monotonic()
+        session.info[WRITER_KEY] = self
+
+    def add(self, instance) -> None:
+        self.session.add(instance)
+        self.pending += 1
+
+    def merge(self, instance):
+        self.pending += 1
+        return self.session.merge(instance)
+
+    def execute(self, statement, params=None):
+        self.pending += len(params) if isinstance(params, list) else 1
+        return self.session.execute(statement, params)
+
+    def done(self) -> None:
+        """Mark end of a unit of work, make a checkpoint if it is due"""
+        if (
+            self.pending >= self.batch_size
+            or time.monotonic() - self._last_checkpoint >= self.interval
+        ):
+            self.checkpoint()
+
+    def checkpoint(self) -> None:
+        """Commit all pending writes"""
+        # the updater is the only writer of its database, so loaded
+        # objects stay valid and are not expired by checkpoints
+        expire_on_commit = self.session.expire_on_commit
+        self.session.expire_on_commit = False
+        try:
+            self.session.commit()
+        finally:
+            self.session.expire_on_commit = expire_on_commit
+        self.pending = 0
+        self.checkpoints += 1
+        self._last_checkpoint = time.monotonic()
+
+
+def get_writer(session: Session) -> BatchWriter:
+    """Get batch writer of the session, create one with default settings"""
+    writer = session.info.get(WRITER_KEY)
+    if writer is None:
+        writer = BatchWriter(session)
+    return writer
+
+
+def bulk_upsert(
+    session: Session, model, rows, chunk_size: int = UPSERT_CHUNK_SIZE
+) -> int:
+    """
+    Insert rows of the model, update the ones already stored
+
+    Rows are written with SQLite ``INSERT ... ON CONFLICT DO UPDATE``
+    on the primary key of the model, ``chunk_size`` rows per statement.
+    Unlike ``session.merge`` it does not select rows before writing them.
+    Writes go through the batch writer of the session. Objects
+    of the model already loaded into the session are not refreshed.
+
+    Parameters
+    ----------
+    session : sqlalchemy.orm.Session
+        database session
+    model
+        ORM model of the table
+    rows : Iterable[dict]
+        values of the rows by column name, all with the same columns
+    chunk_size : int
+        number of rows in a single statement
+
+    Returns
+    -------
+    int
+        number of written rows
+    """
+    table = model.__table__
+    primary_key = [column.name for column in table.primary_key.columns]
+    writer = get_writer(session)
+    rows = iter(rows)
+    count = 0
+    while chunk := list(itertools.islice(rows, chunk_size)):
+        statement = sqlite_insert(table)
+        update = {
+            name: statement.excluded[name]
+            for name in chunk[0]
+            if name not in primary_key
+        }
+        if update:
+            statement = statement.on_conflict_do_update(
+                index_elements=primary_key, set_=update
+            )
+        else:
+            statement = statement.on_conflict_do_nothing(
+                index_elements=primary_key
+            )
+        writer.execute(statement, chunk)
+        count += len(chunk)
+    return count
 
 
 def get_or_create(session, model, **kwargs):
@@ -43,6 +201,6 @@ def get_or_create(session, model, **kwargs):
         return instance
 
     instance = model(**kwargs)
-    session.add(instance)
-    session.commit()
+    get_writer(session).add(instance)
+    session.flush()
     return instance
@@ -1,15 +1,20 @@
 import bz2
 import hashlib
+import json
 import logging
 import os.path
+import sqlite3
 from pathlib import Path
 from typing import Optional, Union
 
 from pydrive2.auth import GoogleAuth
 from pydrive2.drive import GoogleDrive, GoogleDriveFile
 
+from napari_dashboard.db_sources import GITHUB, cache_path, database_paths
+
 COMPRESSED_DB = "dashboard.db.bz2"
 DB_PATH = "dashboard.db"
+ALEMBIC_CONFIG = "alembic.ini"
 
 
 def login_with_local_webserver():
@@ -98,15 +103,15 @@ def upload_xlsx_dump():
 
 def upload_db_dump(file_name=COMPRESSED_DB):
     drive = GoogleDrive(get_auth())
-    file = get_or_create_gdrive_file(drive, file_name)
-    file.SetContentFile(file_name)
+    file = get_or_create_gdrive_file(drive, Path(file_name).name)
+    file.SetContentFile(str(file_name))
     file.Upload()
 
 
-def get_db_file() -> Optional[GoogleDriveFile]:
+def get_db_file(file_name=COMPRESSED_DB) -> Optional[GoogleDriveFile]:
     drive = GoogleDrive(get_auth())
     file_list = drive.ListFile(
-        {"q": "title='dashboard.db.bz2' and trashed=false"}
+        {"q": f"title='{Path(file_name).name}' and trashed=false"}
     ).GetList()
     if file_list:
         return file_list[0]
@@ -121,6 +126,57 @@ def calculate_md5(file_path: Union[str, Path]) -> str:
     return hash_md5.hexdigest()
 
 
+def get_manifest_path(db_path: Union[str, Path]) -> Path:
+    """Path to the file with checksums of the last transferred databases"""
+    db_path = Path(db_path)
+    return db_path.with_name(f"{db_path.stem}_manifest.json")
+
+
+def load_manifest(db_path: Union[str, Path]) -> dict[str, str]:
+    manifest_path = get_manifest_path(db_path)
+    if not manifest_path.exists():
+        return {}
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def save_manifest(db_path: Union[str, Path], manifest: dict[str, str]):
+    with open(get_manifest_path(db_path), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def transferred_paths(db_path: Union[str, Path] = DB_PATH) -> list[Path]:
+    """
+    Get paths of files stored in Google Drive.
+
+    Beside databases, it is the HTTP cache of GitHub requests,
+    so ETags of GitHub responses are kept between runs.
+    """
+    return [*database_paths(db_path), cache_path(db_path, GITHUB)]
+
+
+def archive_path_of(path: Path) -> Path:
+    return path.with_name(f"{path.name}.bz2")
+
+
+def _changed_files(db_path: Union[str, Path], paths: list[Path]) -> list[Path]:
+    manifest = load_manifest(db_path)
+    return [
+        path
+        for path in paths
+        if path.exists() and manifest.get(path.name) != calculate_md5(path)
+    ]
+
+
+def changed_databases(db_path: Union[str, Path] = DB_PATH) -> list[Path]:
+    """
+    Get database files changed since they were fetched or uploaded.
+
+    Files are compared with checksums stored in the manifest file.
+    """
+    return _changed_files(db_path, database_paths(db_path))
+
+
 def compress_file(original_file_path: str, compressed_file_path: str):
     with (
         open(original_file_path, "rb") as original_file,
@@ -137,29 +193,81 @@ def uncompressed_file(compressed_file_path, original_file_path):
         original_file.writelines(compressed_file)
 
 
+def get_database_revision(db_path: Union[str, Path]) -> Optional[str]:
+    """Get alembic revision stored in the database"""
+    with sqlite3.connect(db_path) as conn:
+        try:
+            row = conn.execute(
+                "SELECT version_num FROM alembic_version"
+            ).fetchone()
+        except sqlite3.OperationalError:
+            return None
+    return None if row is None else row[0]
+
+
+def migrate_database(db_path: Union[str, Path]):
+    """
+    Upgrade the database to the newest schema.
+
+    Alembic is not invoked if the database is already
+    at the head revision.
+    """
+    from alembic import command
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config = Config(ALEMBIC_CONFIG)
+    config.set_main_option(
+        "sqlalchemy.url", f"sqlite:///{Path(db_path).absolute()}"
+    )
+    head = ScriptDirectory.from_config(config).get_current_head()
+    if get_database_revision(db_path) == head:
+        logging.info("database already at revision %s", head)
+        return
+    command.upgrade(config, "head")
+
+
 def fetch_database(db_path=DB_PATH):
-    """Fetch the database from Google Drive."""
+    """
+    Fetch the main and source databases from Google Drive.
+
+    Only files that differ from the local archives are downloaded.
+    """
     logging.info("fetching database")
 
-    db_path = Path(db_path)
-    archive_path = db_path.with_suffix(".db.bz2")
-    db_file = get_db_file()
-    if db_file is not None:
+    manifest = load_manifest(db_path)
+    for path in transferred_paths(db_path):
+        archive_path = archive_path_of(path)
+        db_file = get_db_file(archive_path.name)
+        if db_file is None:
+            logging.info("Database %s not found", archive_path.name)
+            continue
         db_file.FetchMetadata(fields="md5Checksum")
         if not (
-            archive_path.exists()
+            path.exists()
+            and archive_path.exists()
             and calculate_md5(archive_path) == db_file["md5Checksum"]
         ):
-            logging.info("download database")
+            logging.info("download database %s", archive_path.name)
 
             db_file.GetContentFile(str(archive_path))
-            logging.info("uncompressing database")
-            uncompressed_file(archive_path, db_path)
-            logging.info("migrate database")
-            # call alembic upgrade
-            from alembic.config import main
-
-            main(["upgrade", "head"], prog="alembic")
-
-    else:
-        logging.info("Database not found")
+            logging.info("uncompressing database %s", archive_path.name)
+            uncompressed_file(archive_path, path)
+        manifest[path.name] = calculate_md5(path)
+    save_manifest(db_path, manifest)
+
+    if Path(db_path).exists():
+        logging.info("migrate database")
+        migrate_database(db_path)
+
+
+def upload_databases(db_path=DB_PATH):
+    """Compress and upload database files changed since the last transfer"""
+    manifest = load_manifest(db_path)
+    for path in _changed_files(db_path, transferred_paths(db_path)):
+        archive_path = archive_path_of(path)
+        logging.info("uploading database %s", archive_path.name)
+        compress_file(path, archive_path)
+        upload_db_dump(archive_path)
+        manifest[path.name] = calculate_md5(path)
+    save_manifest(db_path, manifest)
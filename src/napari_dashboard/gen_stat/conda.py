@@ -1,10 +1,10 @@
 import datetime
 from typing import NamedTuple
 
-from sqlalchemy import desc, func
+from sqlalchemy import Subquery, and_, func, select
 from sqlalchemy.orm import Session
 
-from napari_dashboard.db_schema.conda import CondaDownload
+from napari_dashboard.db_schema.conda import CondaDownload, CondaSnapshot
 
 
 class CondaDownloadInfo(NamedTuple):
@@ -13,34 +13,82 @@ class CondaDownloadInfo(NamedTuple):
     last_version_downloads: int
 
 
+def get_conda_snapshot(day: datetime.date) -> Subquery:
+    """
+    Rebuild the full state of conda downloads for a given day.
+
+    Conda downloads are stored only when they changed, so for each file
+    the most recent row not newer than ``day`` is selected.
+    Only packages that have a snapshot collected at ``day`` are included.
+
+    Parameters
+    ----------
+    day : datetime.date
+        day for which the state should be rebuilt
+
+    Returns
+    -------
+    sqlalchemy.Subquery
+        subquery with the same columns as ``CondaDownload``
+        with one row per file
+    """
+    last_dates = (
+        select(
+            CondaDownload.name,
+            CondaDownload.full_binary_name,
+            func.max(CondaDownload.date).label("date"),
+        )
+        .where(CondaDownload.date <= day)
+        .group_by(CondaDownload.name, CondaDownload.full_binary_name)
+        .subquery()
+    )
+    return (
+        select(CondaDownload)
+        .join(
+            last_dates,
+            and_(
+                CondaDownload.name == last_dates.c.name,
+                CondaDownload.full_binary_name
+                == last_dates.c.full_binary_name,
+                CondaDownload.date == last_dates.c.date,
+            ),
+        )
+        .join(
+            CondaSnapshot,
+            and_(
+                CondaSnapshot.pypi_name == CondaDownload.pypi_name,
+                CondaSnapshot.date == day,
+            ),
+        )
+        .where(CondaDownload.download_count.isnot(None))
+        .subquery("conda_snapshot")
+    )
+
+
 def _get_conda_download_info(
     session: Session, pypi_name: str
 ) -> CondaDownloadInfo:
     recent_date = (
-        session.query(CondaDownload.date)
-        .filter(CondaDownload.pypi_name == pypi_name)
-        .order_by(desc(CondaDownload.date))
-        .first()
+        session.query(func.max(CondaSnapshot.date))
+        .filter(CondaSnapshot.pypi_name == pypi_name)
+        .scalar()
     )
     if recent_date is None:
         return CondaDownloadInfo(
             pypi_name=pypi_name, total_downloads=0, last_version_downloads=0
         )
 
+    snapshot = get_conda_snapshot(recent_date)
     total_downloads = (
-        session.query(func.sum(CondaDownload.download_count))
-        .filter(
-            CondaDownload.pypi_name == pypi_name,
-            CondaDownload.date == recent_date[0],
-        )
+        session.query(func.sum(snapshot.c.download_count))
+        .filter(snapshot.c.pypi_name == pypi_name)
         .first()[0]
     )
     last_version_downloads = (
-        session.query(func.sum(CondaDownload.download_count))
+        session.query(func.sum(snapshot.c.download_count))
         .filter(
-            CondaDownload.pypi_name == pypi_name,
-            CondaDownload.date == recent_date[0],
-            CondaDownload.latest_version == True,  # noqa: E712
+            snapshot.c.pypi_name == pypi_name,
+            snapshot.c.latest_version == True,  # noqa: E712
         )
         .first()[0]
     )
@@ -54,8 +102,8 @@ def _get_conda_download_info(
 
 def _last_date(session: Session, packages: set[str]) -> datetime.date:
     return (
-        session.query(func.max(CondaDownload.date))
-        .filter(CondaDownload.pypi_name.in_(packages))
+        session.query(func.max(CondaSnapshot.date))
+        .filter(CondaSnapshot.pypi_name.in_(packages))
         .scalar()
     )
 
@@ -63,14 +111,13 @@ def _last_date(session: Session, packages: set[str]) -> datetime.date:
 def get_conda_total_download_info(
     session: Session, packages: set[str]
 ) -> dict[str, int]:
-    last_date = _last_date(session, packages)
+    snapshot = get_conda_snapshot(_last_date(session, packages))
     return dict(
         session.query(
-            CondaDownload.pypi_name, func.sum(CondaDownload.download_count)
+            snapshot.c.pypi_name, func.sum(snapshot.c.download_count)
         )
-        .filter(CondaDownload.pypi_name.in_(packages))
-        .filter(CondaDownload.date == last_date)
-        .group_by(CondaDownload.pypi_name)
+        .filter(snapshot.c.pypi_name.in_(packages))
+        .group_by(snapshot.c.pypi_name)
         .all()
     )
 
@@ -78,24 +125,22 @@ def get_conda_total_download_info(
 def get_conda_latest_download_info(
     session: Session, packages: set[str]
 ) -> dict[str, int]:
-    last_date = _last_date(session, packages)
+    snapshot = get_conda_snapshot(_last_date(session, packages))
     return dict(
         session.query(
-            CondaDownload.pypi_name, func.sum(CondaDownload.download_count)
+            snapshot.c.pypi_name, func.sum(snapshot.c.download_count)
         )
-        .filter(CondaDownload.pypi_name.in_(packages))
-        .filter(CondaDownload.date == last_date)
-        .filter(CondaDownload.latest_version == True)  # noqa: E712
-        .group_by(CondaDownload.pypi_name)
+        .filter(snapshot.c.pypi_name.in_(packages))
+        .filter(snapshot.c.latest_version == True)  # noqa: E712
+        .group_by(snapshot.c.pypi_name)
         .all()
     )
 
 
 def get_total_conda_download(session: Session, packages: set[str]):
-    last_date = _last_date(session, packages)
+    snapshot = get_conda_snapshot(_last_date(session, packages))
     return (
-        session.query(func.sum(CondaDownload.download_count))
-        .filter(CondaDownload.pypi_name.in_(packages))
-        .filter(CondaDownload.date == last_date)
+        session.query(func.sum(snapshot.c.download_count))
+        .filter(snapshot.c.pypi_name.in_(packages))
         .scalar()
     )
@@ -7,6 +7,7 @@ from pathlib import Path
 from typing import Union
 
 import pandas as pd
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from napari_dashboard.db_schema import base
@@ -18,7 +19,9 @@ def generate_excel_file(file_path: Union[str, Path], session: Session):
             if name in ("sqlite_sequence", "alembic_version"):
                 continue
             try:
-                df = pd.read_sql_table(table.name, session.bind)
+                # select by unqualified name, so tables from source
+                # databases attached to the connection are found
+                df = pd.read_sql(select(table), session.bind)
                 df.to_excel(writer, sheet_name=table.name[:31], index=False)
             except ValueError:
                 logging.exception("Error while reading table %s", table.name)
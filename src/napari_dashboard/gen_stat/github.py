@@ -5,27 +5,42 @@ import itertools
 from functools import lru_cache
 from typing import TYPE_CHECKING, Callable
 
-from sqlalchemy import and_, desc, func, null, or_
+from sqlalchemy import (
+    and_,
+    desc,
+    func,
+    literal,
+    literal_column,
+    null,
+    select,
+    tuple_,
+    union_all,
+)
 
 from napari_dashboard.db_schema.github import (
     BOT_SET,
+    ISSUE_COMMENT_ACTIVITY,
+    ISSUE_DOCUMENT,
+    PR_ACTIVITY_KINDS,
+    PR_DOCUMENT,
     ArtifactDownloads,
+    GithubActivity,
     GithubUser,
-    IssueComment,
     Issues,
     Labels,
-    PullRequestComments,
-    PullRequestCommits,
-    PullRequestReviews,
     PullRequests,
     Release,
     Repository,
+    SearchDocument,
     Stars,
+    github_search,
+    pr_to_labels_table,
 )
 
 if TYPE_CHECKING:
     from collections.abc import Iterable, Sequence
 
+    from sqlalchemy import Row
     from sqlalchemy.orm import Session
 
 
@@ -54,6 +69,43 @@ CORE_DEVS = {
 }
 
 
+# columns used to describe pull requests and issues in summaries,
+# selected instead of whole rows to not load unused data.
+# Repository and user are joined by id, see ``_summary_query``
+PR_SUMMARY_COLUMNS = (
+    Repository.user.label("repository_user"),
+    Repository.name.label("repository_name"),
+    PullRequests.pull_request,
+    GithubUser.username.label("user"),
+    PullRequests.title,
+    PullRequests.open_time,
+    PullRequests.close_time,
+    PullRequests.merge_time,
+)
+ISSUE_SUMMARY_COLUMNS = (
+    Repository.user.label("repository_user"),
+    Repository.name.label("repository_name"),
+    Issues.issue,
+    GithubUser.username.label("user"),
+    Issues.title,
+    Issues.open_time,
+    Issues.close_time,
+)
+
+
+def _summary_query(session: Session, model: type[PullRequests | Issues]):
+    """Query for summary columns of pull requests or issues"""
+    columns = (
+        PR_SUMMARY_COLUMNS if model is PullRequests else ISSUE_SUMMARY_COLUMNS
+    )
+    return (
+        session.query(*columns)
+        .select_from(model)
+        .join(Repository, Repository.id == model.repository_id)
+        .join(GithubUser, GithubUser.id == model.user_id)
+    )
+
+
 def get_repo_model(user: str, repo: str, session: Session) -> Repository:
     return (
         session.query(Repository)
@@ -90,10 +142,7 @@ def calc_stars_per_day_cumulative(
     res = {"day": [], "stars": []}
     for el in (
         session.query(Stars.date, func.count(Stars.date))
-        .filter(
-            Stars.repository_user == repo_model.user,
-            Stars.repository_name == repo_model.name,
-        )
+        .filter(Stars.repository_id == repo_model.id)
         .group_by(Stars.date)
         .order_by(Stars.date)
         .all()
@@ -112,11 +161,13 @@ def get_pull_request_creators(
 ) -> list[tuple[str, int]]:
     # get all contributors with number of pull requests
     repo_model = get_repo_model(user, repo, session)
-    basic_querry = session.query(
-        PullRequests.user, func.count(PullRequests.pull_request).label("count")
-    ).filter(
-        PullRequests.repository_name == repo_model.name,
-        PullRequests.repository_user == repo_model.user,
+    basic_querry = (
+        session.query(
+            GithubUser.username,
+            func.count(PullRequests.pull_request).label("count"),
+        )
+        .join(PullRequests, PullRequests.user_id == GithubUser.id)
+        .filter(PullRequests.repository_id == repo_model.id)
     )
 
     if since is not None:
@@ -124,7 +175,7 @@ def get_pull_request_creators(
 
     return [
         (x[0], x[1])
-        for x in basic_querry.group_by(PullRequests.user)
+        for x in basic_querry.group_by(GithubUser.username)
         .order_by(desc("count"))
         .all()
         if x[0] not in BOT_SET
@@ -147,10 +198,7 @@ def get_pull_request_reviewers(
             func.count(PullRequests.pull_request).label("count"),
         )
         .join(PullRequests, GithubUser.pull_requests_reviews)
-        .filter(
-            PullRequests.repository_user == repo_model.user,
-            PullRequests.repository_name == repo_model.name,
-        )
+        .filter(PullRequests.repository_id == repo_model.id)
     )
 
     if since is not None:
@@ -181,10 +229,7 @@ def get_pull_request_coauthors(
             func.count(PullRequests.pull_request).label("count"),
         )
         .join(PullRequests, GithubUser.commits)
-        .filter(
-            PullRequests.repository_user == repo_model.user,
-            PullRequests.repository_name == repo_model.name,
-        )
+        .filter(PullRequests.repository_id == repo_model.id)
     )
 
     if since is not None:
@@ -207,13 +252,13 @@ def get_recent_contributors(
 
     return [
         x[0]
-        for x in session.query(PullRequests.user)
+        for x in session.query(GithubUser.username)
+        .join(PullRequests, PullRequests.user_id == GithubUser.id)
         .filter(
-            PullRequests.repository_user == repo_model.user,
-            PullRequests.repository_name == repo_model.name,
+            PullRequests.repository_id == repo_model.id,
             PullRequests.merge_time > since,
         )
-        .group_by(PullRequests.user)
+        .group_by(GithubUser.username)
         .all()
         if x[0] not in BOT_SET
     ]
@@ -227,8 +272,7 @@ def count_recent_pull_requests(
     return (
         session.query(PullRequests)
         .filter(
-            PullRequests.repository_user == repo_model.user,
-            PullRequests.repository_name == repo_model.name,
+            PullRequests.repository_id == repo_model.id,
             PullRequests.merge_time > since,
         )
         .count()
@@ -243,9 +287,7 @@ def count_recent_closed_issues(
     return (
         session.query(Issues)
         .filter(
-            Issues.repository_user == repo_model.user,
-            Issues.repository_name == repo_model.name,
-            Issues.close_time > since,
+            Issues.repository_id == repo_model.id, Issues.close_time > since
         )
         .count()
     )
@@ -259,9 +301,7 @@ def count_recent_opened_issues(
     return (
         session.query(Issues)
         .filter(
-            Issues.repository_user == repo_model.user,
-            Issues.repository_name == repo_model.name,
-            Issues.open_time > since,
+            Issues.repository_id == repo_model.id, Issues.open_time > since
         )
         .count()
     )
@@ -279,8 +319,7 @@ def count_recent_pull_requests_by_label(
     resp = dict(
         session.query(Labels.label, func.count(PullRequests.pull_request))
         .filter(
-            PullRequests.repository_user == repo_model.user,
-            PullRequests.repository_name == repo_model.name,
+            PullRequests.repository_id == repo_model.id,
             PullRequests.merge_time > since,
         )
         .join(PullRequests.labels)
@@ -297,17 +336,13 @@ def generate_pr_stats(
     repo_model = get_repo_model(user, repo, session)
     total_pull_requests = (
         session.query(PullRequests)
-        .filter(
-            PullRequests.repository_user == repo_model.user,
-            PullRequests.repository_name == repo_model.name,
-        )
+        .filter(PullRequests.repository_id == repo_model.id)
         .count()
     )
     merged_pull_requests = (
         session.query(PullRequests)
         .filter(
-            PullRequests.repository_user == repo_model.user,
-            PullRequests.repository_name == repo_model.name,
+            PullRequests.repository_id == repo_model.id,
             PullRequests.merge_time.isnot(null()),
         )
         .count()
@@ -315,8 +350,7 @@ def generate_pr_stats(
     open_pull_requests = (
         session.query(PullRequests)
         .filter(
-            PullRequests.repository_user == repo_model.user,
-            PullRequests.repository_name == repo_model.name,
+            PullRequests.repository_id == repo_model.id,
             PullRequests.merge_time.is_(null()),
             PullRequests.close_time.is_(null()),
         )
@@ -325,8 +359,7 @@ def generate_pr_stats(
     new_merged_pull_requests = (
         session.query(PullRequests)
         .filter(
-            PullRequests.repository_user == repo_model.user,
-            PullRequests.repository_name == repo_model.name,
+            PullRequests.repository_id == repo_model.id,
             PullRequests.merge_time > since,
             PullRequests.merge_time.isnot(null()),
         )
@@ -335,8 +368,7 @@ def generate_pr_stats(
     new_opened_pull_requests = (
         session.query(PullRequests)
         .filter(
-            PullRequests.repository_user == repo_model.user,
-            PullRequests.repository_name == repo_model.name,
+            PullRequests.repository_id == repo_model.id,
             PullRequests.open_time > since,
             PullRequests.merge_time.is_(null()),
         )
@@ -345,8 +377,7 @@ def generate_pr_stats(
     pr_closed_without_merge = (
         session.query(PullRequests)
         .filter(
-            PullRequests.repository_user == repo_model.user,
-            PullRequests.repository_name == repo_model.name,
+            PullRequests.repository_id == repo_model.id,
             PullRequests.close_time.is_not(null()),
             PullRequests.merge_time.is_(null()),
         )
@@ -373,10 +404,7 @@ def bundle_downloads_count(user: str, repo: str, session: Session):
             func.sum(ArtifactDownloads.download_count),
         )
         .join(Release)
-        .filter(
-            Release.repository_name == repo_model.name,
-            Release.repository_user == repo_model.user,
-        )
+        .filter(Release.repository_id == repo_model.id)
         .group_by(ArtifactDownloads.platform)
         .all()
     )
@@ -477,57 +505,50 @@ def generate_pr_and_issue_time_stats(user: str, repo: str, session: Session):
     pr_merged_bugfix = [0] * len(days_array)
     pr_merged_maintenance = [0] * len(days_array)
     pr_merged_enhancement = [0] * len(days_array)
-    feature_label = (
-        session.query(Labels).filter(Labels.label == "feature").one()
-    )
-    bugfix_label = session.query(Labels).filter(Labels.label == "bugfix").one()
-    maintenance_label = (
-        session.query(Labels).filter(Labels.label == "maintenance").one()
-    )
-    enhancement_label = (
-        session.query(Labels).filter(Labels.label == "enhancement").one()
-    )
-
-    for issue in (
-        session.query(Issues)
-        .filter(
-            Issues.repository_user == repo_model.user,
-            Issues.repository_name == repo_model.name,
+    for open_time, close_time in session.query(
+        Issues.open_time, Issues.close_time
+    ).filter(Issues.repository_id == repo_model.id):
+        issues_open[index_dict[open_time.date()]] += 1
+        if close_time is not None:
+            issues_closed[index_dict[close_time.date()]] += 1
+
+    for open_time, close_time, merge_time in session.query(
+        PullRequests.open_time,
+        PullRequests.close_time,
+        PullRequests.merge_time,
+    ).filter(PullRequests.repository_id == repo_model.id):
+        pr_open[index_dict[open_time.date()]] += 1
+        if close_time is not None:
+            pr_closed[index_dict[close_time.date()]] += 1
+        if merge_time is not None:
+            pr_merged[index_dict[merge_time.date()]] += 1
+
+    merged_per_label = {
+        "feature": pr_merged_feature,
+        "bugfix": pr_merged_bugfix,
+        "maintenance": pr_merged_maintenance,
+        "enhancement": pr_merged_enhancement,
+    }
+    for merge_time, label in (
+        session.query(
+            PullRequests.merge_time, pr_to_labels_table.c.github_labels
+        )
+        .join(
+            pr_to_labels_table,
+            and_(
+                pr_to_labels_table.c.pull_request_num
+                == PullRequests.pull_request,
+                pr_to_labels_table.c.repository_id
+                == PullRequests.repository_id,
+            ),
         )
-        .all()
-    ):
-        issues_open[index_dict[issue.open_time.date()]] += 1
-        if issue.close_time is not None:
-            issues_closed[index_dict[issue.close_time.date()]] += 1
-
-    for pull_request in (
-        session.query(PullRequests)
         .filter(
-            PullRequests.repository_user == repo_model.user,
-            PullRequests.repository_name == repo_model.name,
+            PullRequests.repository_id == repo_model.id,
+            PullRequests.merge_time.isnot(null()),
+            pr_to_labels_table.c.github_labels.in_(merged_per_label),
         )
-        .all()
     ):
-        pr_open[index_dict[pull_request.open_time.date()]] += 1
-        if pull_request.close_time is not None:
-            pr_closed[index_dict[pull_request.close_time.date()]] += 1
-        if pull_request.merge_time is None:
-            continue
-
-        pr_merged[index_dict[pull_request.merge_time.date()]] += 1
-
-        if feature_label in pull_request.labels:
-            pr_merged_feature[index_dict[pull_request.merge_time.date()]] += 1
-        if bugfix_label in pull_request.labels:
-            pr_merged_bugfix[index_dict[pull_request.merge_time.date()]] += 1
-        if maintenance_label in pull_request.labels:
-            pr_merged_maintenance[
-                index_dict[pull_request.merge_time.date()]
-            ] += 1
-        if enhancement_label in pull_request.labels:
-            pr_merged_enhancement[
-                index_dict[pull_request.merge_time.date()]
-            ] += 1
+        merged_per_label[label][index_dict[merge_time.date()]] += 1
 
     weeks = days_array[::7]
     issues_open_weekly = aggregate_weekly_stats(issues_open, weeks)
@@ -617,7 +638,7 @@ def get_last_week() -> tuple[datetime.datetime, datetime.datetime]:
     return prev_monday, last_sunday
 
 
-def pr_to_desc(pr: PullRequests) -> str:
+def pr_to_desc(pr: Row) -> str:
     end_day = get_last_week()[1]
     book_mark = "📖"
     if pr.close_time is not None and pr.close_time < end_day:
@@ -626,7 +647,7 @@ def pr_to_desc(pr: PullRequests) -> str:
     return f"{book_mark} [{pr.repository_user}/{pr.repository_name}#{pr.pull_request}](https://github.com/{pr.repository_user}/{pr.repository_name}/pull/{pr.pull_request}) {pr.title} ({pr.user})"
 
 
-def issue_to_desc(issue: Issues) -> str:
+def issue_to_desc(issue: Row) -> str:
     end_day = get_last_week()[1]
     book_mark = "📖"
     if issue.close_time is not None and issue.close_time < end_day:
@@ -634,7 +655,7 @@ def issue_to_desc(issue: Issues) -> str:
     return f"{book_mark} [{issue.repository_user}/{issue.repository_name}#{issue.issue}](https://github.com/{issue.repository_user}/{issue.repository_name}/issues/{issue.issue}) {issue.title} ({issue.user})"
 
 
-def pr_to_page_dict(pr: PullRequests) -> dict[str, str]:
+def pr_to_page_dict(pr: Row) -> dict[str, str]:
     end_day = get_last_week()[1]
     book_mark = "📖"
     if pr.close_time is not None and pr.close_time < end_day:
@@ -649,7 +670,7 @@ def pr_to_page_dict(pr: PullRequests) -> dict[str, str]:
     }
 
 
-def issue_to_page_dict(issue: Issues) -> dict[str, str]:
+def issue_to_page_dict(issue: Row) -> dict[str, str]:
     end_day = get_last_week()[1]
     book_mark = "📖"
     if issue.close_time is not None and issue.close_time < end_day:
@@ -663,11 +684,11 @@ def issue_to_page_dict(issue: Issues) -> dict[str, str]:
     }
 
 
-def get_last_week_new_pr(session: Session) -> Iterable[PullRequests]:
+def get_last_week_new_pr(session: Session) -> list[Row]:
     """Get PR opened in last week"""
     start, stop = get_last_week()
     return (
-        session.query(PullRequests)
+        _summary_query(session, PullRequests)
         .filter(PullRequests.open_time > start, PullRequests.open_time < stop)
         .all()
     )
@@ -677,32 +698,43 @@ def get_last_week_new_pr_md(session: Session) -> list[str]:
     return [pr_to_desc(pr) for pr in get_last_week_new_pr(session)]
 
 
-def get_last_week_updated_pr(session: Session) -> Iterable[PullRequests]:
+def _active_targets(
+    session: Session,
+    kinds: Sequence[str],
+    start: datetime.datetime,
+    stop: datetime.datetime,
+):
+    """
+    Subquery with repository and number of pull requests or issues
+    with activity of given kinds between start and stop
+    """
+    return (
+        session.query(GithubActivity.repository_id, GithubActivity.number)
+        .filter(
+            GithubActivity.date >= start,
+            GithubActivity.date <= stop,
+            GithubActivity.kind.in_(kinds),
+        )
+        .distinct()
+        .subquery()
+    )
+
+
+def get_last_week_updated_pr(session: Session) -> list[Row]:
     """Get PR updated in last week, but open before last week and not closed"""
     start, stop = get_last_week()
+    active = _active_targets(session, PR_ACTIVITY_KINDS, start, stop)
     return (
-        session.query(PullRequests)
-        .filter(
-            PullRequests.open_time < start, PullRequests.close_time.is_(null())
+        _summary_query(session, PullRequests)
+        .join(
+            active,
+            and_(
+                PullRequests.repository_id == active.c.repository_id,
+                PullRequests.pull_request == active.c.number,
+            ),
         )
-        .outerjoin(PullRequestReviews)
-        .outerjoin(PullRequestComments)
-        .outerjoin(PullRequestCommits)
         .filter(
-            or_(
-                and_(
-                    PullRequestReviews.date >= start,
-                    PullRequestReviews.date <= stop,
-                ),
-                and_(
-                    PullRequestComments.date >= start,
-                    PullRequestComments.date <= stop,
-                ),
-                and_(
-                    PullRequestCommits.date >= start,
-                    PullRequestCommits.date <= stop,
-                ),
-            )
+            PullRequests.open_time < start, PullRequests.close_time.is_(null())
         )
         .all()
     )
@@ -712,10 +744,10 @@ def get_last_week_updated_pr_md(session: Session) -> list[str]:
     return [pr_to_desc(pr) for pr in get_last_week_updated_pr(session)]
 
 
-def get_last_week_merged_pr(session: Session) -> Iterable[PullRequests]:
+def get_last_week_merged_pr(session: Session) -> list[Row]:
     start, stop = get_last_week()
     return (
-        session.query(PullRequests)
+        _summary_query(session, PullRequests)
         .filter(
             PullRequests.merge_time > start,
             PullRequests.merge_time < stop,
@@ -729,11 +761,11 @@ def get_last_week_merged_pr_md(session: Session):
     return [pr_to_desc(pr) for pr in get_last_week_merged_pr(session)]
 
 
-def get_last_week_closed_pr(session: Session) -> Iterable[PullRequests]:
+def get_last_week_closed_pr(session: Session) -> list[Row]:
     """get PR closed in last week"""
     start, stop = get_last_week()
     return (
-        session.query(PullRequests)
+        _summary_query(session, PullRequests)
         .filter(
             PullRequests.close_time > start,
             PullRequests.close_time < stop,
@@ -748,10 +780,10 @@ def get_last_week_closed_pr_md(session: Session):
     return [pr_to_desc(pr) for pr in get_last_week_closed_pr(session)]
 
 
-def get_last_week_new_issues(session: Session) -> Iterable[Issues]:
+def get_last_week_new_issues(session: Session) -> list[Row]:
     start, stop = get_last_week()
     return (
-        session.query(Issues)
+        _summary_query(session, Issues)
         .filter(Issues.open_time > start, Issues.open_time < stop)
         .all()
     )
@@ -763,14 +795,20 @@ def get_last_week_new_issues_md(session: Session):
     ]
 
 
-def get_last_week_updated_issues(session: Session) -> Iterable[Issues]:
+def get_last_week_updated_issues(session: Session) -> list[Row]:
     """get issues that were updated in the last week but not closed"""
     start, stop = get_last_week()
+    active = _active_targets(session, (ISSUE_COMMENT_ACTIVITY,), start, stop)
     return (
-        session.query(Issues)
+        _summary_query(session, Issues)
+        .join(
+            active,
+            and_(
+                Issues.repository_id == active.c.repository_id,
+                Issues.issue == active.c.number,
+            ),
+        )
         .filter(Issues.open_time < start, Issues.close_time.is_(null()))
-        .join(IssueComment)
-        .filter(IssueComment.date > start, IssueComment.date < stop)
         .all()
     )
 
@@ -781,13 +819,13 @@ def get_last_week_updated_issues_md(session: Session) -> list[str]:
     ]
 
 
-def get_last_week_closed_issues(session: Session) -> Iterable[Issues]:
+def get_last_week_closed_issues(session: Session) -> list[Row]:
     """
     Get the closed issues from the last week, that were opened before the last week
     """
     start, stop = get_last_week()
     return (
-        session.query(Issues)
+        _summary_query(session, Issues)
         .filter(
             Issues.close_time > start,
             Issues.close_time < stop,
@@ -812,53 +850,18 @@ def get_last_week_active_core_devs(session: Session):
     """
     stat, stop = get_last_week()
 
-    pr_comments = [
-        x.username
-        for x in (
-            session.query(GithubUser)
-            .filter(GithubUser.username.in_(CORE_DEVS))
-            .outerjoin(PullRequestComments)
-            .filter(
-                PullRequestComments.date >= stat,
-                PullRequestComments.date <= stop,
-            )
-        ).all()
-    ]
-    pr_reviews = [
-        x.username
-        for x in (
-            session.query(GithubUser)
-            .filter(GithubUser.username.in_(CORE_DEVS))
-            .outerjoin(PullRequestReviews)
-            .filter(
-                PullRequestReviews.date >= stat,
-                PullRequestReviews.date <= stop,
-            )
-        ).all()
-    ]
-    pr_commits = [
-        x.username
-        for x in (
-            session.query(GithubUser)
-            .filter(GithubUser.username.in_(CORE_DEVS))
-            .outerjoin(PullRequestCommits)
-            .filter(
-                PullRequestCommits.date >= stat,
-                PullRequestCommits.date <= stop,
-            )
-        ).all()
-    ]
-    issue_comments = [
-        x.username
-        for x in (
-            session.query(GithubUser)
-            .filter(GithubUser.username.in_(CORE_DEVS))
-            .outerjoin(IssueComment)
-            .filter(IssueComment.date >= stat, IssueComment.date <= stop)
-        ).all()
-    ]
-
-    return sorted(set(pr_comments + pr_reviews + pr_commits + issue_comments))
+    return sorted(
+        x[0]
+        for x in session.query(GithubUser.username)
+        .join(GithubActivity, GithubActivity.user_id == GithubUser.id)
+        .filter(
+            GithubActivity.date >= stat,
+            GithubActivity.date <= stop,
+            GithubUser.username.in_(CORE_DEVS),
+        )
+        .distinct()
+        .all()
+    )
 
 
 def get_weekly_summary_of_activity(session: Session):
@@ -881,3 +884,120 @@ def get_weekly_summary_of_activity(session: Session):
             for x in get_last_week_updated_issues(session)
         ],
     }
+
+
+def quote_search_phrase(phrase: str) -> str:
+    """Quote text to be searched as a phrase, not as FTS5 query syntax"""
+    return '"' + phrase.replace('"', '""') + '"'
+
+
+def _search_kind(
+    kind: str,
+    model: type[PullRequests | Issues],
+    number_column,
+    query: str,
+    repositories: Iterable[tuple[str, str]] | None,
+    since: datetime.datetime | None,
+    until: datetime.datetime | None,
+):
+    stmt = (
+        select(
+            literal(kind).label("kind"),
+            Repository.user.label("repository_user"),
+            Repository.name.label("repository_name"),
+            number_column.label("number"),
+            model.title,
+            GithubUser.username.label("user"),
+            model.last_modification_time,
+            func.bm25(literal_column("github_search")).label("rank"),
+        )
+        .select_from(SearchDocument)
+        .join(github_search, github_search.c.rowid == SearchDocument.id)
+        .join(
+            model,
+            and_(
+                model.repository_id == SearchDocument.repository_id,
+                number_column == SearchDocument.number,
+            ),
+        )
+        .join(Repository, Repository.id == model.repository_id)
+        .join(GithubUser, GithubUser.id == model.user_id)
+        .where(
+            SearchDocument.kind == kind,
+            literal_column("github_search").op("MATCH")(query),
+        )
+    )
+    if repositories is not None:
+        stmt = stmt.where(
+            tuple_(Repository.user, Repository.name).in_(list(repositories))
+        )
+    if since is not None:
+        stmt = stmt.where(model.last_modification_time >= since)
+    if until is not None:
+        stmt = stmt.where(model.last_modification_time <= until)
+    return stmt
+
+
+def search_pull_requests_and_issues(
+    session: Session,
+    query: str,
+    repositories: Iterable[tuple[str, str]] | None = None,
+    since: datetime.datetime | None = None,
+    until: datetime.datetime | None = None,
+    kinds: Sequence[str] = (PR_DOCUMENT, ISSUE_DOCUMENT),
+    limit: int = 50,
+) -> list[Row]:
+    """
+    Search titles and descriptions of pull requests and issues
+
+    Parameters
+    ----------
+    session : sqlalchemy.orm.Session
+        database session
+    query : str
+        FTS5 query, use ``quote_search_phrase`` to search for plain text
+    repositories : Iterable[tuple[str, str]] | None
+        pairs of (user, repository name) to search in, all if None
+    since : datetime.datetime | None
+        only items modified after this time
+    until : datetime.datetime | None
+        only items modified before this time
+    kinds : Sequence[str]
+        ``PR_DOCUMENT`` and/or ``ISSUE_DOCUMENT``
+    limit : int
+        maximum number of results
+
+    Returns
+    -------
+    list[Row]
+        rows with kind, repository_user, repository_name, number, title,
+        user, last_modification_time and rank, best matches first
+    """
+    models = {
+        PR_DOCUMENT: (PullRequests, PullRequests.pull_request),
+        ISSUE_DOCUMENT: (Issues, Issues.issue),
+    }
+    selects = [
+        _search_kind(kind, *models[kind], query, repositories, since, until)
+        for kind in kinds
+    ]
+    combined = union_all(*selects).subquery()
+    return session.execute(
+        select(combined).order_by(combined.c.rank).limit(limit)
+    ).all()
+
+
+def search_result_to_desc(result: Row) -> str:
+    path = "pull" if result.kind == PR_DOCUMENT else "issues"
+    return f"[{result.repository_user}/{result.repository_name}#{result.number}](https://github.com/{result.repository_user}/{result.repository_name}/{path}/{result.number}) {result.title} ({result.user})"
+
+
+def get_last_week_keyword_md(session: Session, keyword: str) -> list[str]:
+    """Pull requests and issues modified in the last week mentioning keyword"""
+    start, stop = get_last_week()
+    return [
+        search_result_to_desc(result)
+        for result in search_pull_requests_and_issues(
+            session, quote_search_phrase(keyword), since=start, until=stop
+        )
+    ]
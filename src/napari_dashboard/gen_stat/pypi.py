@@ -6,31 +6,34 @@ from datetime import date, timedelta
 
 import pycountry
 from packaging.version import parse as parse_version
-from sqlalchemy import func, null
+from sqlalchemy import func, null, select, union_all
 
 from napari_dashboard.db_schema.pypi import (
     PackageRelease,
-    PePyDownloadStat,
+    PePyDailyTotal,
     PePyTotalDownloads,
     PyPi,
     PyPiDownloadPerOS,
     PyPiDownloadPerPythonVersion,
+    PyPiRollup,
 )
 
 if typing.TYPE_CHECKING:
     from sqlalchemy.orm import Session
 
+    from napari_dashboard.pypi_columns import DownloadColumns
+
 
 def get_active_packages(session: Session, packages: set[str], threshold: int):
     month_ago = date.today() - timedelta(days=30)
     subquery = (
         session.query(
-            PePyDownloadStat.name,
-            func.sum(PePyDownloadStat.downloads).label("total_download"),
+            PePyDailyTotal.name,
+            func.sum(PePyDailyTotal.downloads).label("total_download"),
         )
-        .filter(PePyDownloadStat.date >= month_ago)
-        .filter(PePyDownloadStat.name.in_(packages))
-        .group_by(PePyDownloadStat.name)
+        .filter(PePyDailyTotal.date >= month_ago)
+        .filter(PePyDailyTotal.name.in_(packages))
+        .group_by(PePyDailyTotal.name)
         .subquery()
     )
 
@@ -48,33 +51,33 @@ def get_download_info(session: Session, packages: list[str]):
 
     query_month = dict(
         session.query(
-            PePyDownloadStat.name,
-            func.sum(PePyDownloadStat.downloads).label("Last month"),
+            PePyDailyTotal.name,
+            func.sum(PePyDailyTotal.downloads).label("Last month"),
         )
-        .filter(PePyDownloadStat.date >= month_ago)
-        .filter(PePyDownloadStat.name.in_(packages))
-        .group_by(PePyDownloadStat.name)
+        .filter(PePyDailyTotal.date >= month_ago)
+        .filter(PePyDailyTotal.name.in_(packages))
+        .group_by(PePyDailyTotal.name)
         .all()
     )
     query_week = dict(
         session.query(
-            PePyDownloadStat.name,
-            func.sum(PePyDownloadStat.downloads).label("Last week"),
+            PePyDailyTotal.name,
+            func.sum(PePyDailyTotal.downloads).label("Last week"),
         )
-        .filter(PePyDownloadStat.date >= week_ago)
-        .filter(PePyDownloadStat.name.in_(packages))
-        .group_by(PePyDownloadStat.name)
+        .filter(PePyDailyTotal.date >= week_ago)
+        .filter(PePyDailyTotal.name.in_(packages))
+        .group_by(PePyDailyTotal.name)
         .all()
     )
 
     query_day = dict(
         session.query(
-            PePyDownloadStat.name,
-            func.sum(PePyDownloadStat.downloads).label("Last day"),
+            PePyDailyTotal.name,
+            func.sum(PePyDailyTotal.downloads).label("Last day"),
         )
-        .filter(PePyDownloadStat.date >= day_ago)
-        .filter(PePyDownloadStat.name.in_(packages))
-        .group_by(PePyDownloadStat.name)
+        .filter(PePyDailyTotal.date >= day_ago)
+        .filter(PePyDailyTotal.name.in_(packages))
+        .group_by(PePyDailyTotal.name)
         .all()
     )
 
@@ -94,11 +97,9 @@ def get_download_info(session: Session, packages: list[str]):
 
 def get_pepy_download_per_day(session: Session, package: str):
     return dict(
-        session.query(
-            PePyDownloadStat.date, func.sum(PePyDownloadStat.downloads)
-        )
-        .filter(PePyDownloadStat.name == package)
-        .group_by(PePyDownloadStat.date)
+        session.query(PePyDailyTotal.date, PePyDailyTotal.downloads)
+        .filter(PePyDailyTotal.name == package)
+        .order_by(PePyDailyTotal.date)
         .all()
     )
 
@@ -195,17 +196,58 @@ def add_plot_info(df):
 def get_per_country_download(
     session: Session, package: str, since: date | None = None
 ):
-    query = (
-        session.query(
-            PyPi.country_code, func.count(PyPi.country_code).label("count")
-        )
-        .filter(PyPi.project == package)
+    """Non CI downloads of package per country.
+
+    Combines raw ``PyPi`` rows with ``PyPiRollup`` rows created
+    for data older than the retention period.
+    """
+    raw = (
+        select(PyPi.country_code, func.count().label("count"))
+        .where(PyPi.project == package)
         # filter out ci downloads
-        .filter(PyPi.ci_install.isnot(True))
+        .where(PyPi.ci_install.isnot(True))
         # filter out None country code
-        .filter(PyPi.country_code.isnot(null()))
+        .where(PyPi.country_code.isnot(null()))
+    )
+    rollup = (
+        select(
+            PyPiRollup.country_code, func.sum(PyPiRollup.count).label("count")
+        )
+        .where(PyPiRollup.project == package)
+        .where(PyPiRollup.ci_install.isnot(True))
+        .where(PyPiRollup.country_code.isnot(null()))
     )
     if since is not None:
-        query = query.filter(PyPi.timestamp >= since)
-    query = query.group_by(PyPi.country_code)
-    return query.all()
+        raw = raw.where(PyPi.timestamp >= since)
+        rollup = rollup.where(PyPiRollup.date >= since)
+    combined = union_all(
+        raw.group_by(PyPi.country_code),
+        rollup.group_by(PyPiRollup.country_code),
+    ).subquery()
+    return (
+        session.query(
+            combined.c.country_code, func.sum(combined.c.count).label("count")
+        )
+        .group_by(combined.c.country_code)
+        .all()
+    )
+
+
+def get_download_breakdown(
+    columns: DownloadColumns,
+    package: str,
+    column: str,
+    since: date | None = None,
+) -> list[tuple[str, int]]:
+    """Non CI downloads of package per value of column, from columnar snapshot.
+
+    ``column`` is one of dictionary coded columns of the snapshot,
+    for example ``country_code``, ``version``, ``python_version``,
+    ``system_name`` or ``distro_name``. Rows without value are skipped.
+    Result is sorted by number of downloads, descending.
+    """
+    counts = columns.count_by(
+        column, columns.mask(project=package, since=since)
+    )
+    counts.pop(None, None)
+    return sorted(counts.items(), key=lambda x: x[1], reverse=True)
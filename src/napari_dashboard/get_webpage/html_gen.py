@@ -6,9 +6,9 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from jinja2 import Environment, FileSystemLoader
-from sqlalchemy import create_engine
 from sqlalchemy.orm import Session
 
+from napari_dashboard.db_sources import create_reporting_engine
 from napari_dashboard.db_update.util import setup_cache
 from napari_dashboard.gen_stat.conda import (
     get_conda_latest_download_info,
@@ -421,7 +421,7 @@ def generate_webpage(
     target_path.mkdir(parents=True, exist_ok=True)
     print(f"target path {target_path.absolute()}")
     print(f"db path {db_path.absolute()}, sqlite://{db_path.absolute()}")
-    engine = create_engine(f"sqlite:///{db_path.absolute()}")
+    engine = create_reporting_engine(db_path)
     setup_cache(timeout=60 * 60 * 4)
 
     skip_plugins = {"PartSeg", "skan"}
@@ -1,16 +1,20 @@
+from __future__ import annotations
+
 import argparse
 import logging
 import os
+import typing
 
-from sqlalchemy import create_engine
 from sqlalchemy.orm import Session
 
-from napari_dashboard.gdrive_util import fetch_database
+from napari_dashboard.db_sources import create_reporting_engine
+from napari_dashboard.gdrive_util import DB_PATH, fetch_database
 from napari_dashboard.gen_stat.github import (
     get_last_week,
     get_last_week_active_core_devs,
     get_last_week_closed_issues_as_md,
     get_last_week_closed_pr_md,
+    get_last_week_keyword_md,
     get_last_week_merged_pr_md,
     get_last_week_new_issues_md,
     get_last_week_new_pr_md,
@@ -18,17 +22,24 @@ from napari_dashboard.gen_stat.github import (
     get_last_week_updated_pr_md,
 )
 
+if typing.TYPE_CHECKING:
+    from collections.abc import Sequence
+
 
-def generate_weekly_summary(fetch_db: bool) -> list[str]:
+def generate_weekly_summary(
+    fetch_db: bool, keywords: Sequence[str] = ()
+) -> list[str]:
     """
     Generate Markdown for the weekly summary.
     It is served as a list of lines to easier split it in case of a long message.
+    For each of keywords, a section with pull requests and issues
+    mentioning it is added.
     """
     start, end = get_last_week()
     logging.basicConfig(level=logging.INFO)
     if fetch_db:
         fetch_database()
-    engine = create_engine("sqlite:///dashboard.db")
+    engine = create_reporting_engine(DB_PATH)
     res = [f"# Weekly Summary {start.date()}-{end.date()}\n"]
     with Session(engine) as session:
         if new_pr := get_last_week_new_pr_md(session):
@@ -52,6 +63,12 @@ def generate_weekly_summary(fetch_db: bool) -> list[str]:
         if closed_issues := get_last_week_closed_issues_as_md(session):
             res.append("\n## Closed Issues\n")
             res.extend(f" - {text}" for text in closed_issues)
+        for keyword in keywords:
+            if keyword_items := get_last_week_keyword_md(session, keyword):
+                res.append(
+                    f'\n## Pull Requests and Issues about "{keyword}"\n'
+                )
+                res.extend(f" - {text}" for text in keyword_items)
 
         res.append("\n## Core-devs active in repositories\n")
         res.append(", ".join(get_last_week_active_core_devs(session)))
@@ -70,10 +87,17 @@ def main():
     parse.add_argument(
         "--no-fetch", action="store_true", help="Do not fetch the database"
     )
+    parse.add_argument(
+        "--keyword",
+        action="append",
+        default=[],
+        help="Add section with pull requests and issues mentioning keyword, "
+        "can be used multiple times",
+    )
 
     args = parse.parse_args()
 
-    message = generate_weekly_summary(not args.no_fetch)
+    message = generate_weekly_summary(not args.no_fetch, args.keyword)
     if args.send_zulip:
         import zulip
 
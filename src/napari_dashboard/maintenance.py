@@ -0,0 +1,202 @@
+"""
+Maintenance of the dashboard database.
+
+Gather statistics for the query planner, reclaim space left by deleted
+rows and optionally rebuild the database with a different page size
+or compact old raw pypi downloads.
+Should be run before the database is compressed and uploaded.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import typing
+from pathlib import Path
+
+import humanize
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from napari_dashboard.db_sources import (
+    PYPI,
+    create_source_engine,
+    database_paths,
+)
+from napari_dashboard.db_update.pypi import compact_old_downloads
+from napari_dashboard.gdrive_util import DB_PATH, changed_databases
+
+if typing.TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from sqlalchemy import Connection
+
+logger = logging.getLogger(__name__)
+
+INCREMENTAL_AUTO_VACUUM = 2
+
+
+def get_table_sizes(connection: Connection) -> dict[str, int]:
+    """
+    Get size in bytes used by each table, including its indexes.
+
+    Uses ``dbstat`` virtual table. If SQLite is compiled without it,
+    only the size of the whole database is reported.
+    """
+    try:
+        sizes = dict(
+            connection.execute(
+                text(
+                    """
+                    SELECT COALESCE(m.tbl_name, d.name), SUM(d.pgsize)
+                    FROM dbstat AS d
+                    LEFT JOIN sqlite_master AS m ON m.name = d.name
+                    GROUP BY COALESCE(m.tbl_name, d.name)
+                    """
+                )
+            ).all()
+        )
+    except OperationalError:
+        logger.warning("dbstat is not available, report only total size")
+        sizes = {}
+    page_size = connection.execute(text("PRAGMA page_size")).scalar()
+    sizes["<free pages>"] = (
+        connection.execute(text("PRAGMA freelist_count")).scalar() * page_size
+    )
+    sizes["<total>"] = (
+        connection.execute(text("PRAGMA page_count")).scalar() * page_size
+    )
+    return sizes
+
+
+def format_size_report(before: dict[str, int], after: dict[str, int]) -> str:
+    """Format table sizes before and after maintenance as a text table"""
+    names = sorted(
+        set(before) | set(after),
+        key=lambda x: (x.startswith("<"), -before.get(x, 0)),
+    )
+    width = max(len(x) for x in names)
+    lines = [f"{'table':<{width}} {'before':>10} {'after':>10}"]
+    lines.extend(
+        f"{name:<{width}} "
+        f"{humanize.naturalsize(before.get(name, 0)):>10} "
+        f"{humanize.naturalsize(after.get(name, 0)):>10}"
+        for name in names
+    )
+    return "\n".join(lines)
+
+
+def optimize_database(
+    db_path: str | Path, page_size: int | None = None, vacuum: bool = True
+) -> tuple[dict[str, int], dict[str, int]]:
+    """
+    Perform maintenance of the database.
+
+    The database is switched to incremental auto vacuum, so free pages
+    are returned to the file system by ``PRAGMA incremental_vacuum``
+    without rebuilding the whole file. A full ``VACUUM`` is performed only
+    when the auto vacuum mode or page size needs to be changed.
+    Then planner statistics are gathered with ``ANALYZE`` and
+    ``PRAGMA optimize``.
+
+    Parameters
+    ----------
+    db_path : str | Path
+        path to the sqlite database
+    page_size : int | None
+        if provided, rebuild the database with this page size
+    vacuum : bool
+        if False, only gather statistics
+
+    Returns
+    -------
+    tuple[dict[str, int], dict[str, int]]
+        size of tables in bytes before and after maintenance
+    """
+    engine = create_engine(
+        f"sqlite:///{Path(db_path).absolute()}", isolation_level="AUTOCOMMIT"
+    )
+    with engine.connect() as connection:
+        before = get_table_sizes(connection)
+        if vacuum:
+            auto_vacuum = connection.execute(
+                text("PRAGMA auto_vacuum")
+            ).scalar()
+            current_page_size = connection.execute(
+                text("PRAGMA page_size")
+            ).scalar()
+            if auto_vacuum != INCREMENTAL_AUTO_VACUUM or (
+                page_size is not None and page_size != current_page_size
+            ):
+                logger.info("Rebuild database %s", db_path)
+                connection.execute(text("PRAGMA auto_vacuum = INCREMENTAL"))
+                if page_size is not None:
+                    connection.execute(text(f"PRAGMA page_size = {page_size}"))
+                connection.execute(text("VACUUM"))
+            else:
+                connection.execute(text("PRAGMA incremental_vacuum"))
+        connection.execute(text("ANALYZE"))
+        connection.execute(text("PRAGMA optimize"))
+        after = get_table_sizes(connection)
+    engine.dispose()
+    return before, after
+
+
+def optimize_changed_databases(db_path: str | Path = DB_PATH) -> None:
+    """Optimize database files changed since the last transfer"""
+    for path in changed_databases(db_path):
+        print(f"Optimizing {path.name}")
+        print(format_size_report(*optimize_database(path)))
+
+
+def main(args: Sequence[str] | None = None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "db_path",
+        help="Path to the main database, source databases are "
+        "found next to it",
+        type=Path,
+        default=Path(DB_PATH),
+        nargs="?",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=None,
+        help="Rebuild the database with a given page size",
+    )
+    parser.add_argument(
+        "--no-vacuum",
+        action="store_true",
+        help="Only gather statistics, do not reclaim free space",
+    )
+    parser.add_argument(
+        "--pypi-retention-months",
+        type=int,
+        default=None,
+        help="Compact raw pypi downloads older than given number of months",
+    )
+    args = parser.parse_args(args)
+
+    if args.pypi_retention_months is not None:
+        engine = create_source_engine(args.db_path, PYPI)
+        with Session(engine) as session:
+            removed = compact_old_downloads(
+                session, args.pypi_retention_months
+            )
+        engine.dispose()
+        print(f"Compacted {removed} raw pypi downloads")
+
+    for path in database_paths(args.db_path):
+        if not path.exists():
+            continue
+        before, after = optimize_database(
+            path, page_size=args.page_size, vacuum=not args.no_vacuum
+        )
+        print(path.name)
+        print(format_size_report(before, after))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""
+Helpers for migrations of big tables.
+
+SQLite does not support most of ``ALTER TABLE`` operations, so changing
+the schema of a table requires creating a new table and copying data.
+Doing it in a single statement for tables with millions of rows takes
+a long time, doubles the size of the database file and has to be started
+from the beginning if interrupted.
+
+Functions from this module copy data in chunks ordered by a key column,
+commit after each chunk and can continue an interrupted copy.
+They require a connection in autocommit mode, for example
+inside ``op.get_context().autocommit_block()`` in alembic migration.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import typing
+
+from sqlalchemy import inspect, text
+from tqdm import tqdm
+
+if typing.TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from sqlalchemy import Connection
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+def _begin(connection: Connection) -> None:
+    connection.exec_driver_sql("BEGIN")
+
+
+def _commit(connection: Connection) -> None:
+    connection.exec_driver_sql("COMMIT")
+
+
+def copy_table_in_chunks(
+    connection: Connection,
+    source: str,
+    target: str,
+    columns: Sequence[str],
+    select_columns: Sequence[str] | None = None,
+    key: str = "id",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    delete_source: bool = False,
+) -> int:
+    """
+    Copy rows from ``source`` to ``target`` table in chunks ordered by ``key``.
+
+    Each chunk is copied in a separate transaction. If the copy is
+    interrupted, calling this function again continues after
+    the biggest ``key`` already present in the ``target`` table.
+
+    Parameters
+    ----------
+    connection : sqlalchemy.Connection
+        connection in autocommit mode
+    source : str
+        name of table to copy from
+    target : str
+        name of already existing table to copy to
+    columns : Sequence[str]
+        names of columns in target table
+    select_columns : Sequence[str] | None
+        SQL expressions evaluated on the source table, for each
+        of ``columns``. If not provided ``columns`` are used.
+    key : str
+        name of unique column used to order and split rows.
+        It needs to be copied without change.
+    chunk_size : int
+        number of rows copied in a single transaction
+    delete_source : bool
+        if True, copied rows are removed from the source table
+        in the same transaction, so the space can be reused for the next
+        chunks and the database file does not grow to double size
+
+    Returns
+    -------
+    int
+        number of copied rows
+    """
+    if select_columns is None:
+        select_columns = columns
+    columns_str = ", ".join(columns)
+    select_str = ", ".join(select_columns)
+
+    last_key = connection.execute(
+        text(f"SELECT MAX({key}) FROM {target}")
+    ).scalar()
+    if last_key is not None:
+        logger.info("Resume copy of %s after %s=%s", source, key, last_key)
+        if delete_source:
+            _begin(connection)
+            connection.execute(
+                text(f"DELETE FROM {source} WHERE {key} <= :last_key"),
+                {"last_key": last_key},
+            )
+            _commit(connection)
+
+    key_filter = "" if last_key is None else f"WHERE {key} > :last_key"
+    to_copy = connection.execute(
+        text(f"SELECT COUNT(*) FROM {source} {key_filter}"),
+        {"last_key": last_key},
+    ).scalar()
+
+    copied = 0
+    with tqdm(total=to_copy, desc=f"Copy {source}") as pbar:
+        while copied < to_copy:
+            # the last key of chunk, or None if less than chunk_size remains
+            upper_key = connection.execute(
+                text(
+                    f"SELECT {key} FROM {source} {key_filter} "
+                    f"ORDER BY {key} LIMIT 1 OFFSET :offset"
+                ),
+                {"last_key": last_key, "offset": chunk_size - 1},
+            ).scalar()
+            if upper_key is None:
+                upper_key = connection.execute(
+                    text(f"SELECT MAX({key}) FROM {source}")
+                ).scalar()
+            chunk_filter = (
+                f"{key} <= :upper_key"
+                if last_key is None
+                else f"{key} > :last_key AND {key} <= :upper_key"
+            )
+            params = {"last_key": last_key, "upper_key": upper_key}
+
+            _begin(connection)
+            inserted = connection.execute(
+                text(
+                    f"INSERT INTO {target} ({columns_str}) "
+                    f"SELECT {select_str} FROM {source} "
+                    f"WHERE {chunk_filter} ORDER BY {key}"
+                ),
+                params,
+            ).rowcount
+            if delete_source:
+                connection.execute(
+                    text(f"DELETE FROM {source} WHERE {chunk_filter}"), params
+                )
+            _commit(connection)
+
+            copied += inserted
+            pbar.update(inserted)
+            last_key = upper_key
+            key_filter = f"WHERE {key} > :last_key"
+    return copied
+
+
+def rebuild_table_in_chunks(
+    connection: Connection,
+    table: str,
+    column_definitions: Sequence[str],
+    columns: Sequence[str],
+    select_columns: Sequence[str] | None = None,
+    key: str = "id",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    delete_source: bool = False,
+) -> None:
+    """
+    Recreate ``table`` with a new schema, copying data in chunks.
+
+    Rows are copied to ``{table}_new`` table that replaces the original
+    one when all rows are copied. Calling this function again after
+    interruption continues the copy.
+
+    Parameters
+    ----------
+    connection : sqlalchemy.Connection
+        connection in autocommit mode
+    table : str
+        name of table to rebuild
+    column_definitions : Sequence[str]
+        SQL definitions of columns (and constraints) of the new table
+    columns : Sequence[str]
+        names of columns of the new table to fill
+    select_columns : Sequence[str] | None
+        SQL expressions evaluated on the old table, for each of ``columns``
+    key : str
+        name of unique column used to order and split rows
+    chunk_size : int
+        number of rows copied in a single transaction
+    delete_source : bool
+        if True, copied rows are removed from the original table while
+        copying, see :py:func:`copy_table_in_chunks`
+    """
+    new_table = f"{table}_new"
+    if not inspect(connection).has_table(new_table):
+        connection.execute(
+            text(f"CREATE TABLE {new_table} ({', '.join(column_definitions)})")
+        )
+    copied = copy_table_in_chunks(
+        connection,
+        table,
+        new_table,
+        columns,
+        select_columns=select_columns,
+        key=key,
+        chunk_size=chunk_size,
+        delete_source=delete_source,
+    )
+    logger.info("Copied %s rows from %s", copied, table)
+    # SQLite DDL is transactional, so the swap of tables is atomic
+    _begin(connection)
+    connection.execute(text(f"DROP TABLE {table}"))
+    connection.execute(text(f"ALTER TABLE {new_table} RENAME TO {table}"))
+    _commit(connection)
+
+
+_CREATE_RE = re.compile(
+    r"^\s*CREATE\s+(UNIQUE\s+)?(TABLE|INDEX|VIEW)\s+(IF\s+NOT\s+EXISTS\s+)?"
+    r"(?:\w+\.)?",
+    re.IGNORECASE,
+)
+
+
+def _qualify_create(sql: str, schema: str) -> str:
+    """Rewrite ``CREATE`` statement to create the object in ``schema``"""
+    return _CREATE_RE.sub(
+        lambda m: (
+            f"CREATE {m.group(1) or ''}{m.group(2).upper()} "
+            f"IF NOT EXISTS {schema}."
+        ),
+        sql,
+        count=1,
+    )
+
+
+def _table_key(connection: Connection, schema: str, table: str) -> str:
+    """Name of integer primary key column, or ``rowid`` if there is none"""
+    info = connection.execute(
+        text(f"PRAGMA {schema}.table_info('{table}')")
+    ).all()
+    pk_columns = [row for row in info if row[5]]
+    if len(pk_columns) == 1 and pk_columns[0][2].upper() == "INTEGER":
+        return pk_columns[0][1]
+    return "rowid"
+
+
+def move_table(
+    connection: Connection,
+    table: str,
+    source_schema: str,
+    target_schema: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> None:
+    """
+    Move ``table`` with its indexes between attached databases.
+
+    The table is created in ``target_schema`` using the SQL stored in
+    ``sqlite_master`` and rows are copied in chunks, so an interrupted
+    move can be continued. Views are recreated in the target schema.
+
+    Parameters
+    ----------
+    connection : sqlalchemy.Connection
+        connection in autocommit mode with both databases attached
+    table : str
+        name of table or view to move
+    source_schema : str
+        name of database in which the table is currently stored
+    target_schema : str
+        name of database to which the table is moved
+    chunk_size : int
+        number of rows copied in a single transaction
+    """
+    objects = connection.execute(
+        text(
+            f"SELECT type, name, sql FROM {source_schema}.sqlite_master "
+            "WHERE tbl_name = :table AND sql IS NOT NULL "
+            "ORDER BY type = 'index'"
+        ),
+        {"table": table},
+    ).all()
+    if not objects:
+        return
+    if objects[0][0] == "view":
+        _begin(connection)
+        connection.execute(text(_qualify_create(objects[0][2], target_schema)))
+        connection.execute(text(f"DROP VIEW {source_schema}.{table}"))
+        _commit(connection)
+        return
+
+    _begin(connection)
+    for _, _, sql in objects:
+        connection.execute(text(_qualify_create(sql, target_schema)))
+    _commit(connection)
+
+    key = _table_key(connection, source_schema, table)
+    columns = [
+        row[1]
+        for row in connection.execute(
+            text(f"PRAGMA {source_schema}.table_info('{table}')")
+        )
+    ]
+    if key == "rowid":
+        columns.insert(0, key)
+    copied = copy_table_in_chunks(
+        connection,
+        f"{source_schema}.{table}",
+        f"{target_schema}.{table}",
+        columns,
+        key=key,
+        chunk_size=chunk_size,
+        # the source table is dropped after the move
+        delete_source=True,
+    )
+    logger.info(
+        "Moved %s rows of %s from %s to %s",
+        copied,
+        table,
+        source_schema,
+        target_schema,
+    )
+    _begin(connection)
+    connection.execute(text(f"DROP TABLE {source_schema}.{table}"))
+    _commit(connection)
@@ -0,0 +1,336 @@
+"""
+Columnar snapshot of raw pypi downloads.
+
+Aggregating millions of ``pypi_downloads`` rows through SQLAlchemy
+creates a Python object for each row. This module exports the raw
+downloads, together with the rollup of old downloads, to a directory
+of ``.npy`` files that are memory mapped when loaded, so breakdowns
+are computed with NumPy without reading the data into Python objects.
+
+Timestamps are stored as seconds since epoch. String columns are
+dictionary coded: each array holds indexes into a list of values
+stored in ``columns.json``, with ``-1`` for missing values.
+Rows from the rollup table have a timestamp at midnight of their day
+and a weight equal to the aggregated count, raw rows have weight 1.
+
+Run ``python -m napari_dashboard.pypi_columns`` to export the snapshot.
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import logging
+import shutil
+import typing
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from tqdm import tqdm
+
+from napari_dashboard.db_schema.pypi import PyPi, PyPiRollup
+from napari_dashboard.db_sources import PYPI, create_source_engine
+from napari_dashboard.gdrive_util import DB_PATH
+
+if typing.TYPE_CHECKING:
+    from collections.abc import Iterable, Sequence
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 100_000
+METADATA_FILE = "columns.json"
+
+# dictionary coded columns, shared by raw and rollup tables
+CODED_COLUMNS = (
+    "project",
+    "country_code",
+    "version",
+    "python_version",
+    "system_name",
+    "distro_name",
+)
+
+
+def snapshot_path(db_path: str | Path) -> Path:
+    """Get default path of snapshot directory for a database"""
+    db_path = Path(db_path)
+    return db_path.with_name(f"{db_path.stem}_pypi_columns")
+
+
+def _encode(
+    values: Iterable[str | None], dictionary: dict[str, int], count: int
+) -> np.ndarray:
+    return np.fromiter(
+        (
+            -1
+            if value is None
+            else dictionary.setdefault(value, len(dictionary))
+            for value in values
+        ),
+        dtype=np.int32,
+        count=count,
+    )
+
+
+def _iter_chunks(session: Session, model, columns, chunk_size: int):
+    """Iterate over rows of ``model`` in chunks ordered by id"""
+    last_id = 0
+    while True:
+        rows = session.execute(
+            select(model.id, *columns)
+            .where(model.id > last_id)
+            .order_by(model.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def export_snapshot(
+    session: Session, path: str | Path, chunk_size: int = CHUNK_SIZE
+) -> int:
+    """
+    Export raw and rolled up pypi downloads to memory mapped arrays.
+
+    Data is written to a temporary directory that replaces ``path``
+    when the export is finished, so a snapshot is never partially written.
+
+    Parameters
+    ----------
+    session : sqlalchemy.orm.Session
+        session bound to the pypi database
+    path : str | Path
+        directory in which the snapshot is stored
+    chunk_size : int
+        number of rows read from the database at once
+
+    Returns
+    -------
+    int
+        number of exported rows
+    """
+    path = Path(path)
+    raw_count = session.scalar(select(func.count()).select_from(PyPi))
+    rollup_count = session.scalar(select(func.count()).select_from(PyPiRollup))
+    size = raw_count + rollup_count
+
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tmp_path.mkdir(parents=True)
+
+    def _open(name, dtype):
+        return np.lib.format.open_memmap(
+            tmp_path / f"{name}.npy", mode="w+", dtype=dtype, shape=(size,)
+        )
+
+    timestamp = _open("timestamp", np.int64)
+    weight = _open("weight", np.int64)
+    ci = _open("ci", np.bool_)
+    coded = {name: _open(name, np.int32) for name in CODED_COLUMNS}
+    dictionaries = {name: {} for name in CODED_COLUMNS}
+
+    sources = (
+        (PyPi, PyPi.timestamp, None, raw_count),
+        (PyPiRollup, PyPiRollup.date, PyPiRollup.count, rollup_count),
+    )
+    position = 0
+    for model, time_column, count_column, total in sources:
+        columns = [
+            time_column,
+            model.ci_install,
+            *(getattr(model, name) for name in CODED_COLUMNS),
+        ]
+        if count_column is not None:
+            columns.append(count_column)
+        with tqdm(total=total, desc=f"Export {model.__tablename__}") as pbar:
+            for rows in _iter_chunks(session, model, columns, chunk_size):
+                end = position + len(rows)
+                values = list(zip(*rows))
+                # timezone is dropped as timestamps are stored in UTC
+                timestamp[position:end] = np.array(
+                    [
+                        x
+                        if isinstance(x, datetime.datetime)
+                        else datetime.datetime.combine(x, datetime.time())
+                        for x in values[1]
+                    ],
+                    dtype="datetime64[s]",
+                ).astype(np.int64)
+                ci[position:end] = [x is True for x in values[2]]
+                for i, name in enumerate(CODED_COLUMNS, start=3):
+                    coded[name][position:end] = _encode(
+                        values[i], dictionaries[name], len(rows)
+                    )
+                weight[position:end] = (
+                    1 if count_column is None else values[-1]
+                )
+                position = end
+                pbar.update(len(rows))
+
+    for array in (timestamp, weight, ci, *coded.values()):
+        array.flush()
+    del timestamp, weight, ci, coded
+
+    with (tmp_path / METADATA_FILE).open("w") as f_p:
+        json.dump(
+            {
+                "rows": position,
+                "created": datetime.datetime.now().isoformat(),
+                "dictionaries": {
+                    name: list(dictionary)
+                    for name, dictionary in dictionaries.items()
+                },
+            },
+            f_p,
+        )
+    shutil.rmtree(path, ignore_errors=True)
+    tmp_path.rename(path)
+    logger.info("Exported %s pypi download rows to %s", position, path)
+    return position
+
+
+def _to_epoch(value: datetime.date) -> int:
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time())
+    return int(np.datetime64(value.replace(tzinfo=None), "s").astype(np.int64))
+
+
+class DownloadColumns:
+    """
+    Read only, memory mapped view of a pypi downloads snapshot.
+
+    Filters return boolean masks that can be combined with ``&``
+    and passed to ``total`` and ``count_by``.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        with (self.path / METADATA_FILE).open() as f_p:
+            metadata = json.load(f_p)
+        self.created = datetime.datetime.fromisoformat(metadata["created"])
+        self.dictionaries: dict[str, list[str]] = metadata["dictionaries"]
+        self._codes = {
+            name: {x: i for i, x in enumerate(values)}
+            for name, values in self.dictionaries.items()
+        }
+        self.columns: dict[str, np.ndarray] = {
+            name: np.load(self.path / f"{name}.npy", mmap_mode="r")[
+                : metadata["rows"]
+            ]
+            for name in ("timestamp", "weight", "ci", *CODED_COLUMNS)
+        }
+
+    def __len__(self) -> int:
+        return len(self.columns["timestamp"])
+
+    def equal(self, column: str, value: str | None) -> np.ndarray:
+        """Mask of rows in which ``column`` is equal to ``value``"""
+        if value is None:
+            return self.columns[column] == -1
+        code = self._codes[column].get(value)
+        if code is None:
+            return np.zeros(len(self), dtype=np.bool_)
+        return self.columns[column] == code
+
+    def isin(self, column: str, values: Iterable[str]) -> np.ndarray:
+        """Mask of rows in which ``column`` is one of ``values``"""
+        codes = [
+            self._codes[column][x] for x in values if x in self._codes[column]
+        ]
+        return np.isin(self.columns[column], codes)
+
+    def mask(
+        self,
+        project: str | None = None,
+        since: datetime.date | None = None,
+        until: datetime.date | None = None,
+        exclude_ci: bool = True,
+    ) -> np.ndarray:
+        """
+        Mask of rows matching common filters.
+
+        Parameters
+        ----------
+        project : str | None
+            name of the package
+        since : datetime.date | None
+            include only downloads at or after this time
+        until : datetime.date | None
+            include only downloads before this time
+        exclude_ci : bool
+            if True, downloads from CI are excluded
+        """
+        mask = np.ones(len(self), dtype=np.bool_)
+        if project is not None:
+            mask &= self.equal("project", project)
+        if since is not None:
+            mask &= self.columns["timestamp"] >= _to_epoch(since)
+        if until is not None:
+            mask &= self.columns["timestamp"] < _to_epoch(until)
+        if exclude_ci:
+            mask &= ~self.columns["ci"]
+        return mask
+
+    def total(self, mask: np.ndarray | None = None) -> int:
+        """Number of downloads in rows selected by mask"""
+        weight = self.columns["weight"]
+        if mask is None:
+            return int(weight.sum())
+        return int(weight[mask].sum())
+
+    def count_by(
+        self, column: str, mask: np.ndarray | None = None
+    ) -> dict[str | None, int]:
+        """
+        Number of downloads for each value of a dictionary coded column.
+
+        Values without downloads are omitted, ``None`` is used as
+        a key for missing values.
+        """
+        codes = self.columns[column]
+        weight = self.columns["weight"]
+        if mask is not None:
+            codes = codes[mask]
+            weight = weight[mask]
+        # shift by one, so missing values (-1) are counted in the first bin
+        counts = np.bincount(
+            codes + 1,
+            weights=weight,
+            minlength=len(self.dictionaries[column]) + 1,
+        )
+        values = [None, *self.dictionaries[column]]
+        return {values[i]: int(counts[i]) for i in np.flatnonzero(counts)}
+
+
+def main(args: Sequence[str] | None = None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "db_path",
+        help="Path to the main database, pypi database is found next to it",
+        type=Path,
+        default=Path(DB_PATH),
+        nargs="?",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="Directory for the snapshot, by default next to the database",
+    )
+    args = parser.parse_args(args)
+
+    output = args.output or snapshot_path(args.db_path)
+    engine = create_source_engine(args.db_path, PYPI)
+    with Session(engine) as session:
+        rows = export_snapshot(session, output)
+    engine.dispose()
+    print(f"Exported {rows} rows to {output}")
+
+
+if __name__ == "__main__":
+    main()